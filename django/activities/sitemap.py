@@ -9,10 +9,11 @@ from core.sitemap import SailtrailSitemap
 class ActivitySitemap(SailtrailSitemap):
     """Sitemap settings for activity entries"""
     changefreq = "weekly"
+    paged = True
 
     def items(self) -> QuerySet:
         """Get items to appear in this sitemap section"""
-        return get_public_activities()
+        return self.page_items(get_public_activities())
 
     @staticmethod
     def lastmod(activity: Activity) -> Activity:
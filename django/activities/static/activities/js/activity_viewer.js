@@ -1,13 +1,15 @@
 'use strict';
 
-var d3 = require('d3'),
-    $ = require('jquery');
+var $ = require('jquery'),
+    _ = require('lodash');
 
 var speed_viewer = require('./speed_viewer'),
     track_viewer = require('./track_viewer'),
-    polar_viewer = require('./polar_viewer');
+    polar_viewer = require('./polar_viewer'),
+    track_decoder = require('./track_decoder');
 
-var activity_viewer;
+var OVERVIEW_POINTS = 3600,  // trackpoints behind the sliders and polars
+    activity_viewer;
 
 require('seiyria-bootstrap-slider');
 
@@ -48,13 +50,17 @@ activity_viewer = {
             this.do_trim_slider = config.do_trim_slider !== undefined ? config.do_trim_slider : true;
         }
 
-        d3.json(urls.json, this.setup.bind(this));
+        track_decoder.fetch(urls.json + '?' + $.param({max_points: OVERVIEW_POINTS}),
+                            this.setup.bind(this));
     },
 
     /**
      * Create the individual pieces (plots/maps/sliders) after
      * the data has been fetched
      *
+     * The data is an overview of at most OVERVIEW_POINTS evenly spaced
+     * trackpoints.  The map and speed plot fetch their own detail.
+     *
      * @param {Object} error
      * @param {Object} data The data response from the async server fetch
      */
@@ -66,22 +72,42 @@ activity_viewer = {
             this.setup_slider();
         }
         if (this.do_trim_slider) {
-            this.config.trim_start_index = data.time.indexOf(this.config.trim_start);
-            this.config.trim_end_index = data.time.indexOf(this.config.trim_end);
+            // The trim may fall between the trackpoints of the overview
+            this.config.trim_start_index = this.overview_index(this.config.trim_start);
+            this.config.trim_end_index = this.overview_index(this.config.trim_end);
             this.trim_slider = $('#trim-slider');
             this.setup_trim_slider();
         }
         if (this.do_track) {
-            track_viewer.draw_map(this.data, this.max_speed, this.time_slider, this.trim_slider, this.config);
+            track_viewer.draw_map(this.urls.json, this.data, this.max_speed,
+                                  this.time_slider, this.trim_slider, this.config);
+
+            // The map only needs the detail that shows at its zoom, within
+            // its view
+            if (!this.do_trim_slider) {
+                track_viewer.follow_view();
+            }
         }
-        if (this.do_speed) {
-            speed_viewer.draw_plot(this.data, this.max_speed, this.units, this.time_slider, this.trim_slider, this.config);
+        if (this.do_speed && this.urls.speed_chart) {
+            speed_viewer.draw_plot(this.urls.speed_chart, this.data, this.max_speed, this.units,
+                                   this.time_slider, this.trim_slider, this.config);
         }
         if (this.do_polars) {
             polar_viewer.draw_plot(this.data, this.wind_direction, this.time_slider, this.urls.winddir);
         }
     },
 
+    /**
+     * Get the index of the overview trackpoint at, or just after, a time
+     *
+     * @param {String} time Formatted like the times of the track
+     * @returns {Number} The index, within the overview
+     */
+    overview_index: function(time) {
+        // The times share a format, so sort as strings
+        return Math.min(_.sortedIndex(this.data.time, time), this.data.time.length - 1);
+    },
+
     /**
      * Setup the timepoint slider
      */
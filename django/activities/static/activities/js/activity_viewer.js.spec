@@ -27,25 +27,55 @@ describe('activity_viewer', function() {
     describe('setup', function() {
 
         before(function() {
-            activity_viewer.urls = {winddir: 'dummy'};
+            activity_viewer.urls = {winddir: 'dummy', json: 'track.json', speed_chart: 'chart.json'};
         });
 
         it('should call track_viewer.draw_map', sinonTest(function() {
             this.stub(track_viewer, 'draw_map');
+            this.stub(track_viewer, 'follow_view');
             this.stub(speed_viewer, 'draw_plot');
             this.stub(polar_viewer, 'draw_plot');
             activity_viewer.setup(null, pos, units);
             track_viewer.draw_map.should.have.been.called;
         }));
 
+        it('should fetch the map view of the track', sinonTest(function() {
+            this.stub(track_viewer, 'draw_map');
+            this.stub(track_viewer, 'follow_view');
+            this.stub(speed_viewer, 'draw_plot');
+            this.stub(polar_viewer, 'draw_plot');
+            activity_viewer.setup(null, pos, units);
+            track_viewer.draw_map.should.have.been.calledWith('track.json', pos);
+            track_viewer.follow_view.should.have.been.called;
+        }));
+
         it('should call speed_viewer.draw_plot', sinonTest(function() {
             this.stub(track_viewer, 'draw_map');
+            this.stub(track_viewer, 'follow_view');
             this.stub(speed_viewer, 'draw_plot');
             activity_viewer.setup(null, pos, units);
-            speed_viewer.draw_plot.should.have.been.called;
+            speed_viewer.draw_plot.should.have.been.calledWith('chart.json', pos);
         }));
     });
 
+    describe('overview_index', function() {
+        before(function() {
+            activity_viewer.data = pos;
+        });
+
+        it('should find a time in the overview', function() {
+            activity_viewer.overview_index('2014-07-15T22:37:55+00:00').should.equal(1);
+        });
+
+        it('should round a time between trackpoints up', function() {
+            activity_viewer.overview_index('2014-07-15T22:37:55.5+00:00').should.equal(2);
+        });
+
+        it('should stop at the last trackpoint', function() {
+            activity_viewer.overview_index('2014-07-15T23:00:00+00:00').should.equal(3);
+        });
+    });
+
     describe('setup_slider', function() {
         it('should respond', function() {
             activity_viewer.should.respondTo('setup_slider');
@@ -4,9 +4,16 @@ var $ = require('jquery'),
     _ = require('lodash'),
     d3 = require('d3');
 
+var CHART_METHOD = 'minmax',  // see api.views.SpeedChartMixin
+    ZOOM_DELAY = 250,  // ms to wait after zooming or panning to fetch
+    time_format = d3.time.format('%Y-%m-%dT%X+0000');
+
 module.exports = {
     speeds: [],
     times: [],
+    chart: [],
+    url: undefined,
+    method: CHART_METHOD,
     plot: undefined,
     marker: undefined,
     x: undefined,
@@ -21,14 +28,20 @@ module.exports = {
     /**
      * Main function to initialize plot
      *
+     * The lines are drawn from the speed chart url, downsampled to the width
+     * of the plot, and fetched again for the window shown after zooming or
+     * panning.  The track data only places the marker and the trim.
+     *
+     * @param {String} url The speed chart url of the activity or track
      * @param {Object} data Object containing arrays with time and speed info
      * @param {Number} max_speed Precomputed max speed, used for axis max
      * @param {Object} units Object holding the current unit details
      * @param {Element} time_slider The time-slider to use, if present
      * @param {Element} trim_slider The trim-slider to use, if present
-     * @param {Object} config The extra config details, if present
+     * @param {Object} config The extra config details, if present, its
+     *     chart_method picks the downsampling of the chart
      */
-    draw_plot: function(data, max_speed, units, time_slider, trim_slider, config) {
+    draw_plot: function(url, data, max_speed, units, time_slider, trim_slider, config) {
         var width = $('#speed-plot').width(),
             height = $('#speed-plot').height(),
             margins = [40, 40, 10, 10],
@@ -38,13 +51,15 @@ module.exports = {
             mr = margins[3],
             w = width - (ml + mr),
             h = height - (mb + mt),
-            time_format = d3.time.format('%Y-%m-%dT%X+0000'),
             svg,
-            xAxis,
             yAxis,
             self = this;
 
         this.units = units;
+        this.url = url;
+        this.method = (config && config.chart_method) || CHART_METHOD;
+        this.chart = [];
+        this.marker = undefined;
 
         this.lower_marker = 0;
         this.upper_marker = data.time.length - 1;
@@ -56,7 +71,7 @@ module.exports = {
 
         this.x = d3.time.scale().range([0, w])
                      .domain([this.times[0], this.times[this.times.length - 1]]);
-        xAxis = d3.svg.axis().scale(this.x).ticks(6).orient('bottom');
+        this.x_axis = d3.svg.axis().scale(this.x).ticks(6).orient('bottom');
         this.y = d3.scale.linear().range([h, 0]).domain([0, max_speed]);
         yAxis = d3.svg.axis().scale(this.y).ticks(4).orient('left');
 
@@ -71,7 +86,7 @@ module.exports = {
         this.plot.append('g')
             .attr('class', 'x axis')
             .attr('transform', 'translate(0,' + h + ')')
-            .call(xAxis);
+            .call(this.x_axis);
 
         this.plot.append('text')
             .attr('class', 'x label')
@@ -113,23 +128,44 @@ module.exports = {
                     .attr('offset', function get_offset(d) { return d.offset; })
                     .attr('stop-color', function get_color(d) { return d.color; });
 
+        // Keep the zoomed lines within the axes
+        this.plot.append('clipPath')
+            .attr('id', 'speed-plot-clip')
+            .append('rect')
+                .attr('width', w)
+                .attr('height', h);
+
         this.base_line = this.plot.append('svg:path')
             .attr('id', 'speed-plot-base-line')
-            .attr('d', this.line_factory(_.zip(this.times, this.speeds)))
+            .attr('clip-path', 'url(#speed-plot-clip)')
             .style('stroke', '#BBB')
             .style('fill', 'none')
             .style('stroke-width', 1);
 
         this.colored_line = this.plot.append('svg:path')
             .attr('id', 'speed-plot-colored-line')
-            .attr('d', this.line_factory(_.zip(this.times, this.speeds)))
+            .attr('clip-path', 'url(#speed-plot-clip)')
             .style('stroke', 'url(#speed-gradient)')
             .style('fill', 'none')
             .style('stroke-width', 3);
 
+        // Zoom and pan along the time axis, drawing the chart already
+        // fetched until the chart of the new window arrives
+        this.fetch_chart_later = _.debounce(this.fetch_chart.bind(this), ZOOM_DELAY);
+        this.zoom = d3.behavior.zoom()
+            .x(this.x)
+            .scaleExtent([1, Infinity])
+            .on('zoom', function zoom_chart() {
+                self.plot.select('.x.axis').call(self.x_axis);
+                self.update_plot();
+                self.fetch_chart_later();
+            });
+        svg.call(this.zoom);
+
         // Register with slider to update positional marker
         if (time_slider) {
             this.marker = this.plot.append('svg:circle')
+                .attr('clip-path', 'url(#speed-plot-clip)')
                 .attr('r', 5)
                 .attr('cx', this.x(this.times[this.marker_pos]))
                 .attr('cy', this.y(this.speeds[this.marker_pos]))
@@ -170,12 +206,69 @@ module.exports = {
 
         // Register with track-only-last-minute checkbox to optionally filter track
         this.filter_track = false;
-        this.filter_state_changed = false;
         $('#track-only-last-minute').on('change', function(e) {
             self.filter_track = !!e.target.checked;
-            self.filter_state_changed = true;
             self.update_plot();
         });
+
+        this.fetch_chart();
+    },
+
+    /**
+     * Get the url of the chart in the current window of the plot
+     *
+     * @returns {String} The url, with the plot width, and once zoomed or
+     *     panned, the start and end of the window
+     */
+    chart_url: function() {
+        var domain = this.x.domain(),
+            params = {
+                width: Math.round(this.x.range()[1]),
+                method: this.method,
+            };
+
+        if (this.zoom.scale() !== 1 || this.zoom.translate()[0] !== 0) {
+            params.start = time_format(domain[0]);
+            params.end = time_format(domain[1]);
+        }
+        return this.url + (this.url.indexOf('?') < 0 ? '?' : '&') + $.param(params);
+    },
+
+    /**
+     * Fetch the chart in the current window of the plot, and draw it
+     */
+    fetch_chart: function() {
+        var self = this,
+            request = {};
+
+        this.chart_request = request;
+        d3.json(this.chart_url(), function(error, chart) {
+            // Skip failures, and windows the plot has already left
+            if (error || request !== self.chart_request) {
+                return;
+            }
+            self.chart = self.chart_points(chart);
+            self.update_plot();
+        });
+    },
+
+    /**
+     * Get the points to draw from a chart response
+     *
+     * @param {Object} chart Arrays of time, and speed or min and max
+     * @returns {Array} [time, speed] points, in time order
+     */
+    chart_points: function(chart) {
+        var times = chart.time.map(function get_parsed_time(d) { return time_format.parse(d); });
+
+        if (chart.speed) {
+            return _.zip(times, chart.speed);
+        }
+        // Go from the min to the max within each pixel, so the line covers
+        // every speed, however many trackpoints share the pixel
+        return _.flatten(times.map(function get_range(time, i) {
+            return [[time, chart.min[i]], [time, chart.max[i]]];
+        }));
     },
 
     /**
@@ -185,33 +278,37 @@ module.exports = {
      */
     move_marker: function(i) {
         this.marker_pos = (i < 0) ? 0 : (i >= this.speeds.length) ? this.speeds.length - 1 : i;
-        this.marker
-            .attr('cx', this.x(this.times[this.marker_pos]))
-            .attr('cy', this.y(this.speeds[this.marker_pos]));
         this.update_plot();
     },
 
     /**
-     * Filter plot, based on current marker position
+     * Redraw the lines and marker, coloring only the trimmed, or recent,
+     * part of the chart
      */
     update_plot: function() {
-        var self = this,
-            data;
+        var chart = this.chart,
+            lower,
+            upper;
 
-        if (this.trim_track || this.filter_track) {
-            if (this.filter_track) {
-                this.upper_marker = self.marker_pos;
-                this.lower_marker = self.marker_pos - 60;
-            }
-            data = _.zip(this.times, this.speeds);
-            data = data.filter(function(d, i) {
-                return (i <= self.upper_marker) && (i >= self.lower_marker);
+        if (this.filter_track) {
+            upper = this.times[this.marker_pos];
+            lower = d3.time.minute.offset(upper, -1);
+        } else if (this.trim_track) {
+            lower = this.times[this.lower_marker];
+            upper = this.times[this.upper_marker];
+        }
+        if (lower !== undefined) {
+            chart = chart.filter(function(d) {
+                return d[0] >= lower && d[0] <= upper;
             });
+        }
 
-            this.colored_line.attr('d', this.line_factory(data));
-        } else if (this.filter_state_changed) {
-            this.colored_line.attr('d', this.line_factory(_.zip(this.times, this.speeds)));
-            this.filter_state_changed = false;
+        this.base_line.attr('d', this.line_factory(this.chart));
+        this.colored_line.attr('d', this.line_factory(chart));
+        if (this.marker) {
+            this.marker
+                .attr('cx', this.x(this.times[this.marker_pos]))
+                .attr('cy', this.y(this.speeds[this.marker_pos]));
         }
     },
 };
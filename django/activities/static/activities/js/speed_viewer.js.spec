@@ -6,7 +6,13 @@ describe('speed_viewer', function() {
 
     var pos = {
             'speed': [4.47084233261339, 4.2570194384449245],
-            'time': ['20:25:51', '20:25:52'],
+            'time': ['2013-02-05T20:25:51+0000', '2013-02-05T20:25:52+0000'],
+        },
+        chart = {
+            time: ['2013-02-05T20:25:51+0000', '2013-02-05T20:25:52+0000'],
+            min: [4.1, 4.2],
+            max: [4.4, 4.3],
+            mean: [4.2, 4.25],
         },
         units = {'speed': 'knots', 'dist': 'nmi'},
         element;
@@ -31,15 +37,51 @@ describe('speed_viewer', function() {
         it('should create an svg element', function() {
             var svg;
 
-            speed_viewer.draw_plot(pos, null, units);
+            speed_viewer.draw_plot('/chart.json', pos, null, units);
             svg = document.getElementById('speed-plot-svg');
             should.exist(svg);
         });
     });
 
+    describe('chart_url', function() {
+        beforeEach(function() {
+            speed_viewer.draw_plot('/chart.json', pos, null, units);
+        });
+
+        afterEach(function() {
+            var el = document.getElementById('speed-plot-svg');
+
+            el.parentNode.removeChild(el);
+        });
+
+        it('should ask for the whole chart before zooming', function() {
+            speed_viewer.chart_url().should.match(/^\/chart\.json\?width=\d+&method=minmax$/);
+        });
+
+        it('should ask for the window shown after zooming', function() {
+            speed_viewer.zoom.scale(2);
+            speed_viewer.chart_url().should.match(/&method=minmax&start=.+&end=.+$/);
+        });
+    });
+
+    describe('chart_points', function() {
+        it('should draw each bucket from its min to its max', function() {
+            var points = speed_viewer.chart_points(chart);
+
+            points.map(function(d) { return d[1]; }).should.deep.equal([4.1, 4.4, 4.2, 4.3]);
+            points[0][0].should.equal(points[1][0]);
+        });
+
+        it('should draw one point per pixel for lttb', function() {
+            var points = speed_viewer.chart_points({time: chart.time, speed: [1, 2]});
+
+            points.map(function(d) { return d[1]; }).should.deep.equal([1, 2]);
+        });
+    });
+
     describe('move_marker', function() {
         beforeEach(function() {
-            speed_viewer.draw_plot(pos, null, units, {on: function() {}});
+            speed_viewer.draw_plot('/chart.json', pos, null, units, {on: function() {}});
         });
 
         afterEach(function() {
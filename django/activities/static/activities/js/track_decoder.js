@@ -0,0 +1,111 @@
+'use strict';
+
+var d3 = require('d3');
+
+var CONTENT_TYPE = 'application/vnd.sailtrail.track',
+    MAGIC = 'STRK',
+    VERSION = 1,
+    HAS_UTC_OFFSET = 0x01,
+    HEADER_SIZE = 12,
+    POSITION_SCALE = 1e7,
+    SPEED_SCALE = 100;
+
+var pad = function(value) {
+    return (value < 10 ? '0' : '') + value;
+};
+
+/**
+ * Decoder for the binary track encoding served by the track JSON views
+ *
+ * See analysis/track_encoding.py for the layout.  Decodes to the same
+ * object of arrays as the JSON.
+ */
+module.exports = {
+    content_type: CONTENT_TYPE,
+
+    /**
+     * Fetch and decode a track, asking for the binary encoding
+     *
+     * @param {String} url The track JSON url
+     * @param {Function} callback Called with (error, data)
+     */
+    fetch: function(url, callback) {
+        var self = this;
+
+        d3.xhr(url, CONTENT_TYPE)
+            .responseType('arraybuffer')
+            .response(function(request) {
+                return self.decode(request.response);
+            })
+            .get(callback);
+    },
+
+    /**
+     * Decode the binary encoding of a track
+     *
+     * @param {ArrayBuffer} buffer The encoded track
+     * @returns {Object} Arrays of bearing, time, speed, lat and lon
+     */
+    decode: function(buffer) {
+        var view = new DataView(buffer),
+            magic = String.fromCharCode(view.getUint8(0), view.getUint8(1),
+                                        view.getUint8(2), view.getUint8(3)),
+            flags = view.getUint8(5),
+            offset = view.getInt16(6, true),
+            count = view.getUint32(8, true),
+            data = {bearing: [], time: [], speed: [], lat: [], lon: []},
+            position = HEADER_SIZE,
+            suffix = '',
+            lat = 0,
+            lon = 0,
+            seconds = 0,
+            i;
+
+        if (magic !== MAGIC || view.getUint8(4) !== VERSION) {
+            throw new Error('Not an encoded track');
+        }
+
+        if (flags & HAS_UTC_OFFSET) {
+            suffix = (offset < 0 ? '-' : '+') +
+                pad(Math.floor(Math.abs(offset) / 60)) + pad(Math.abs(offset) % 60);
+        }
+
+        // Positions are int32 deltas, which wrap around like the encoder
+        for (i = 0; i < count; i++) {
+            lat = (lat + view.getInt32(position + i * 4, true)) | 0;
+            data.lat.push(lat / POSITION_SCALE);
+        }
+        position += count * 4;
+        for (i = 0; i < count; i++) {
+            lon = (lon + view.getInt32(position + i * 4, true)) | 0;
+            data.lon.push(lon / POSITION_SCALE);
+        }
+        position += count * 4;
+        for (i = 0; i < count; i++) {
+            data.speed.push(view.getUint16(position + i * 2, true) / SPEED_SCALE);
+        }
+        position += count * 2;
+        for (i = 0; i < count; i++) {
+            data.bearing.push(view.getUint16(position + i * 2, true));
+        }
+        position += count * 2;
+
+        // Times are zigzag varint deltas, which can be larger than
+        // bitwise operators handle, so stick to arithmetic
+        for (i = 0; i < count; i++) {
+            var value = 0,
+                scale = 1,
+                byte;
+            do {
+                byte = view.getUint8(position++);
+                value += (byte & 0x7f) * scale;
+                scale *= 128;
+            } while (byte & 0x80);
+
+            seconds += value % 2 ? -(value + 1) / 2 : value / 2;
+            data.time.push(new Date(seconds * 1000).toISOString().slice(0, 19) + suffix);
+        }
+
+        return data;
+    },
+};
@@ -0,0 +1,48 @@
+'use strict';
+
+var track_decoder = require('./track_decoder');
+
+describe('track_decoder', function() {
+
+    // Two trackpoints, as encoded by analysis.track_encoding.encode_track
+    var encoded = [
+            83, 84, 82, 75, 1, 1, 0, 0, 2, 0, 0, 0,
+            139, 163, 174, 25, 247, 255, 255, 255,
+            219, 61, 184, 202, 112, 254, 255, 255,
+            93, 2, 124, 2,
+            10, 0, 103, 1,
+            132, 181, 173, 188, 10, 4,
+        ],
+        buffer = new Uint8Array(encoded).buffer;
+
+    describe('fetch', function() {
+        it('should respond', function() {
+            track_decoder.should.respondTo('fetch');
+        });
+    });
+
+    describe('decode', function() {
+        it('should decode positions', function() {
+            var data = track_decoder.decode(buffer);
+            data.lat.should.deep.equal([43.0875531, 43.0875522]);
+            data.lon.should.deep.equal([-89.3895205, -89.3895605]);
+        });
+
+        it('should decode speeds and bearings', function() {
+            var data = track_decoder.decode(buffer);
+            data.speed.should.deep.equal([6.05, 6.36]);
+            data.bearing.should.deep.equal([10, 359]);
+        });
+
+        it('should decode times with their utc offset', function() {
+            var data = track_decoder.decode(buffer);
+            data.time.should.deep.equal(['2014-07-15T22:37:54+0000', '2014-07-15T22:37:56+0000']);
+        });
+
+        it('should throw on other data', function() {
+            (function() {
+                track_decoder.decode(new Uint8Array(12).buffer);
+            }).should.throw(Error);
+        });
+    });
+});
@@ -1,11 +1,20 @@
 'use strict';
 
 var L = require('leaflet'),
+    _ = require('lodash'),
     d3 = require('d3'),
     $ = require('jquery');
 
+var track_decoder = require('./track_decoder');
+
+var VIEW_PADDING = 0.5,  // of the map view, on each side
+    RECENT_DELAY = 100,  // ms between fetches of the recent track
+    time_format = d3.time.format('%Y-%m-%dT%X+0000');
+
 module.exports = {
+    url: undefined,
     latlng: [],
+    times: [],
     map: null,
     marker: null,
     marker_pos: 0,
@@ -43,45 +52,30 @@ module.exports = {
     /**
      * Main function to initialize leaflet map with track
      *
+     * The track data places the map, the marker and the trim, the colored
+     * track is fetched from the url for the map view, see follow_view.
+     *
+     * @param {String} url The track JSON url
      * @param {Object} data Arrays of track info
      * @param {Number} max_speed Precomputed max speed, used for axis max
      * @param {Element} time_slider Time-slider element
      * @param {Element} trim_slider Trim-slider element
      * @param {Object} config Optional config details
      */
-    draw_map: function(data, max_speed, time_slider, trim_slider, config) {
+    draw_map: function(url, data, max_speed, time_slider, trim_slider, config) {
         var i,
             trkpnt,
             self = this;
 
+        this.url = url;
         this.max_speed = max_speed;
-
-        this.geo_json = [];
+        this.times = data.time;
         this.latlng = [];
         for (i = 0; i < data.lat.length; i++) {
             trkpnt = new L.latLng(data.lat[i], data.lon[i]);
 
             trkpnt.speed = data.speed[i];
             this.latlng.push(trkpnt);
-
-            // Create a temporary geo_json formatted array to use for leaflet
-            // The activity JSON endpoint should be updated to return geoJSON
-            if (i < (data.lat.length - 1)) {
-                this.geo_json.push({
-                    type: 'Feature',
-                    properties: {
-                        id: i,
-                        speed: data.speed[i],
-                    },
-                    geometry: {
-                        type: 'LineString',
-                        coordinates: [
-                            [data.lon[i], data.lat[i]],
-                            [data.lon[i + 1], data.lat[i + 1]],
-                        ],
-                    },
-                });
-            }
         }
 
         if (this.source === 'mapquest') {
@@ -124,11 +118,11 @@ module.exports = {
         });
 
         if (!trim_slider) {
-            this.full_track = this.create_geo_json_layer(this.geo_json).addTo(this.map);
+            this.full_track = this.create_geo_json_layer([]).addTo(this.map);
         }
 
-        this.filtered_track = this.create_geo_json_layer(
-            this.geo_json.filter(this.filter_recent_timepoints.bind(this)));
+        this.filtered_track = this.create_geo_json_layer([]);
+        this.fetch_recent_later = _.throttle(this.fetch_recent.bind(this), RECENT_DELAY);
 
         this.marker = L.circleMarker(this.latlng[this.marker_pos], {
             radius: 6,
@@ -185,14 +179,153 @@ module.exports = {
     },
 
     /**
-     * Filter recent timepoints, based on current marker position
-     * @param data The individual timepoint to filter
-     * @returns boolean
+     * Split a track into geo_json segments, colored by speed
+     *
+     * @param {Object} data Arrays of track info
+     * @returns {Array} One feature per segment
+     */
+    make_geo_json: function(data) {
+        var i,
+            geo_json = [];
+
+        // Create a temporary geo_json formatted array to use for leaflet
+        // The activity JSON endpoint should be updated to return geoJSON
+        for (i = 0; i < data.lat.length - 1; i++) {
+            geo_json.push({
+                type: 'Feature',
+                properties: {
+                    id: i,
+                    speed: data.speed[i],
+                },
+                geometry: {
+                    type: 'LineString',
+                    coordinates: [
+                        [data.lon[i], data.lat[i]],
+                        [data.lon[i + 1], data.lat[i + 1]],
+                    ],
+                },
+            });
+        }
+        return geo_json;
+    },
+
+    /**
+     * Draw the full track with the level of detail for the map view,
+     * fetching it again whenever the map is zoomed or moved
+     */
+    follow_view: function() {
+        var self = this;
+
+        // Leaflet fires moveend after zooming too (after zoomend), so this
+        // covers both without fetching twice
+        this.map.on('moveend', function() {
+            self.fetch_view(self.url);
+        });
+        this.fetch_view(this.url);
+    },
+
+    /**
+     * Get the url of the track in the current map view
+     *
+     * @param {String} url The track JSON url
+     * @returns {String} The url, with the map zoom and padded bbox
+     */
+    view_url: function(url) {
+        // Pad the bbox, so segments leaving the view are still drawn
+        var bounds = this.map.getBounds().pad(VIEW_PADDING);
+
+        return url + (url.indexOf('?') < 0 ? '?' : '&') + $.param({
+            zoom: this.map.getZoom(),
+            bbox: [bounds.getWest(), bounds.getSouth(),
+                bounds.getEast(), bounds.getNorth()].join(','),
+        });
+    },
+
+    /**
+     * Fetch the track in the current map view, and draw it
+     *
+     * @param {String} url The track JSON url
+     */
+    fetch_view: function(url) {
+        var self = this,
+            request = {};
+
+        this.view_request = request;
+        track_decoder.fetch(this.view_url(url), function(error, data) {
+            // Skip failures, and views the map has already left
+            if (error || request !== self.view_request) {
+                return;
+            }
+            self.draw_view(data);
+        });
+    },
+
+    /**
+     * Replace the full track with the track fetched for the map view
+     *
+     * @param {Object} data Arrays of track info in the view
+     */
+    draw_view: function(data) {
+        var view_track = this.create_geo_json_layer(this.make_geo_json(data));
+
+        // Leave the layers alone while only the recent track is shown
+        if (this.map.hasLayer(this.full_track)) {
+            this.map.removeLayer(this.full_track);
+            this.map.addLayer(view_track);
+            if (this.map.hasLayer(this.marker)) {
+                this.marker.bringToFront();
+            }
+        }
+        this.full_track = view_track;
+    },
+
+    /**
+     * Get the url of the track in the minute up to the marker
+     *
+     * @returns {String} The url, with the start and end of the minute
      */
-    filter_recent_timepoints: function(data) {
-        this.lower_marker = this.marker_pos - 60;
-        this.upper_marker = this.marker_pos;
-        return (data.properties.id <= this.upper_marker) && (data.properties.id > (this.lower_marker));
+    recent_url: function() {
+        var end = this.times[this.marker_pos];
+
+        return this.url + (this.url.indexOf('?') < 0 ? '?' : '&') + $.param({
+            start: time_format(d3.time.minute.offset(time_format.parse(end), -1)),
+            end: end,
+        });
+    },
+
+    /**
+     * Fetch the track in the minute up to the marker, and draw it
+     */
+    fetch_recent: function() {
+        var self = this,
+            request = {};
+
+        this.recent_request = request;
+        track_decoder.fetch(this.recent_url(), function(error, data) {
+            // Skip failures, and minutes the marker has already left
+            if (error || request !== self.recent_request) {
+                return;
+            }
+            self.draw_recent(data);
+        });
+    },
+
+    /**
+     * Replace the recent track with the track fetched for the marker
+     *
+     * @param {Object} data Arrays of track info in the minute
+     */
+    draw_recent: function(data) {
+        var recent_track = this.create_geo_json_layer(this.make_geo_json(data));
+
+        if (this.map.hasLayer(this.filtered_track)) {
+            this.map.removeLayer(this.filtered_track);
+            this.map.addLayer(recent_track);
+            if (this.map.hasLayer(this.marker)) {
+                this.marker.bringToFront();
+            }
+        }
+        this.filtered_track = recent_track;
     },
 
     /**
@@ -220,24 +353,17 @@ module.exports = {
 
         if (this.filter_track) {
             if (this.filter_state_changed) {
-                // On initial change to filtered, remove full layer, add base
+                // On initial change to filtered, swap the full layer for the
+                // base and recent layers
                 this.map.removeLayer(this.full_track);
                 this.map.addLayer(this.base_track);
+                this.map.addLayer(this.filtered_track);
+                this.map.removeLayer(this.marker);
+                this.map.addLayer(this.marker);
                 this.filter_state_changed = false;
             }
 
-            // Remove old layers
-            this.map.removeLayer(this.marker);
-            this.map.removeLayer(this.filtered_track);
-
-            // Create new filtered layer
-            this.filtered_track = this.create_geo_json_layer(
-                this.geo_json.filter(
-                    this.filter_recent_timepoints.bind(this)));
-
-            // Add filtered track and layers
-            this.map.addLayer(this.filtered_track);
-            this.map.addLayer(this.marker);
+            this.fetch_recent_later();
         } else if (this.trim_track) {
             this.full_track.setLatLngs(this.latlng.filter(function(d, i) {
                 return i >= self.lower_marker && i <= self.upper_marker;
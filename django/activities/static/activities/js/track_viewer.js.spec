@@ -34,14 +34,76 @@ describe('track_viewer', function() {
 
         it('should populate latlng', function() {
             track_viewer.latlng.should.have.length(0);
-            track_viewer.draw_map(pos);
+            track_viewer.draw_map('/track.json', pos);
             track_viewer.latlng.should.have.length(2);
         });
     });
 
+    describe('make_geo_json', function() {
+
+        it('should make a segment between each pair of points', function() {
+            var geo_json = track_viewer.make_geo_json(pos);
+
+            geo_json.should.have.length(1);
+            geo_json[0].properties.speed.should.equal(10);
+            geo_json[0].geometry.coordinates.should.deep.equal([[-90, 45], [-91, 46]]);
+        });
+    });
+
+    describe('view_url', function() {
+        beforeEach(function() {
+            track_viewer.draw_map('/track.json', pos);
+        });
+
+        afterEach(function() {
+            // Remove map
+            var el = document.getElementById('map');
+
+            while (el.firstChild) {
+                el.removeChild(el.firstChild);
+            }
+        });
+
+        it('should ask for the map zoom and bbox', function() {
+            var url = track_viewer.view_url('/track.json');
+
+            url.should.match(/^\/track\.json\?zoom=\d+&bbox=/);
+        });
+
+        it('should add to existing query parameters', function() {
+            var url = track_viewer.view_url('/track.json?format=binary');
+
+            url.should.match(/^\/track\.json\?format=binary&zoom=/);
+        });
+    });
+
+    describe('recent_url', function() {
+        beforeEach(function() {
+            track_viewer.draw_map('/track.json', pos);
+        });
+
+        afterEach(function() {
+            // Remove map
+            var el = document.getElementById('map');
+
+            while (el.firstChild) {
+                el.removeChild(el.firstChild);
+            }
+        });
+
+        it('should ask for the minute up to the marker', function() {
+            var url;
+
+            track_viewer.move_marker(1);
+            url = decodeURIComponent(track_viewer.recent_url());
+
+            url.should.equal('/track.json?start=2013-02-05T20:00:14+0000&end=2013-02-05T20:01:14+0000');
+        });
+    });
+
     describe('move_marker', function() {
         beforeEach(function() {
-            track_viewer.draw_map(pos);
+            track_viewer.draw_map('/track.json', pos);
         });
 
         afterEach(function() {
@@ -19,6 +19,20 @@ class TestSitemap:
         # Then the sentinel will be returned
         assert items == sentinel.activities
 
+    @patch('activities.sitemap.get_public_activities')
+    def test_items_of_a_page(self, helper_mock: MagicMock):
+        # Given a sitemap of the second page of activities
+        sitemap = ActivitySitemap(page=1)
+
+        # When getting the sitemap items
+        items = sitemap.items()
+
+        # Then only the activities in the pk range of the page are returned
+        helper_mock.return_value.filter.assert_called_once_with(
+            pk__gt=5000, pk__lte=10000)
+        assert items == \
+            helper_mock.return_value.filter.return_value.order_by.return_value
+
     def test_lastmod_returns_activity_modified_date(self):
         # Given a mock activity with a sentinel date
         activity = Mock(spec=Activity, modified=sentinel.date)
@@ -363,6 +363,41 @@ class TestActivityTrackTrimView:
         assert context['start_time'] == "2015-01-01T00:00:00+0000"
         assert context['end_time'] == "2016-01-01T00:00:00+0000"
 
+    @patch('activities.views.ActivityTrackView.get_context_data')
+    def test_get_context_uses_suggested_trim_if_untrimmed(self, super_mock):
+        super_mock.return_value = {}
+
+        track = Mock()
+        track.trimmed = False
+        track.trim_start = datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        track.trim_end = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+        track.suggested_trim_start = datetime(2015, 2, 1, tzinfo=pytz.UTC)
+        track.suggested_trim_end = datetime(2015, 3, 1, tzinfo=pytz.UTC)
+
+        view = ActivityTrackTrimView()
+        view.get_object = Mock(return_value=track)
+
+        context = view.get_context_data()
+        assert context['suggested'] is True
+        assert context['start_time'] == "2015-02-01T00:00:00+0000"
+        assert context['end_time'] == "2015-03-01T00:00:00+0000"
+
+    @patch('activities.views.ActivityTrackView.get_context_data')
+    def test_get_context_ignores_suggestion_once_trimmed(self, super_mock):
+        super_mock.return_value = {}
+
+        track = Mock()
+        track.trimmed = True
+        track.trim_start = datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        track.trim_end = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+
+        view = ActivityTrackTrimView()
+        view.get_object = Mock(return_value=track)
+
+        context = view.get_context_data()
+        assert context['suggested'] is False
+        assert context['start_time'] == "2015-01-01T00:00:00+0000"
+
 
 class TestActivityTrackDownloadView:
 
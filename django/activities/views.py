@@ -4,13 +4,16 @@ from django.db.models import QuerySet
 from django.http import HttpRequest, HttpResponseRedirect, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views.generic import DetailView, UpdateView, View
 
 from activities.forms import ActivityDetailsForm
-from api.helper import (create_new_activity_for_user, get_activity_by_id,
+from api.helper import (activity_page_namespace,
+                        create_new_activity_for_user, get_activity_by_id,
                         verify_private_owner)
 from api.models import Activity, ActivityTrack
 from core import UNIT_SETTING, DATETIME_FORMAT_STR
+from core.page_cache import cache_anonymous_page
 from core.views import UploadFormMixin
 from core.forms import (UploadFileForm,
                         ERROR_NO_UPLOAD_FILE_SELECTED,
@@ -82,8 +85,18 @@ class DetailsView(UpdateView):
         return context
 
 
+def _activity_page_version(request: HttpRequest, pk: str) -> str:
+    """Get the version of an activity's page, None if it doesn't exist"""
+    modified = Activity.objects.filter(pk=pk).values_list(
+        'modified', flat=True).first()
+    return None if modified is None else modified.isoformat()
+
+
+@method_decorator(cache_anonymous_page(
+    lambda request, pk: activity_page_namespace(pk),
+    version=_activity_page_version), name='dispatch')
 class ActivityView(UploadFormMixin, DetailView):
-    """Activity view"""
+    """Activity view, cached for anonymous visitors"""
     model = Activity
     template_name = 'activity.html'
     context_object_name = 'activity'
@@ -137,8 +150,18 @@ class ActivityTrackTrimView(ActivityTrackView):
         """Add additional content to the user page"""
         context = super(ActivityTrackTrimView, self).get_context_data(**kwargs)
         track = self.get_object()
-        context['start_time'] = track.trim_start.strftime(DATETIME_FORMAT_STR)
-        context['end_time'] = track.trim_end.strftime(DATETIME_FORMAT_STR)
+        start, end = track.trim_start, track.trim_end
+
+        # Open untrimmed tracks with the trim suggested at upload
+        context['suggested'] = (not track.trimmed and
+                                track.suggested_trim_start is not None and
+                                track.suggested_trim_end is not None)
+        if context['suggested']:
+            start = track.suggested_trim_start
+            end = track.suggested_trim_end
+
+        context['start_time'] = start.strftime(DATETIME_FORMAT_STR)
+        context['end_time'] = end.strftime(DATETIME_FORMAT_STR)
         return context
 
 
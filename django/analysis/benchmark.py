@@ -0,0 +1,112 @@
+"""Benchmarks for the track analysis helpers
+
+Run from the django directory with:
+
+    python -m analysis.benchmark
+"""
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from analysis.simplify import simplify, simplify_to_specific_length
+from analysis.stats import Stats
+from analysis.track_analysis import make_json_from_trackpoints
+from gps import sirf
+from tests.assets import get_test_file_path
+
+DISTANCE_METHODS = ['EquirecApprox', 'Haversine', 'SphLawCos', 'Adaptive',
+                    'Vincenty']
+
+
+def load_sbn_trackpoints(filename):
+    """Load one of the test SBN files as a list of trackpoint dicts"""
+    packets = sirf.read_sbn(get_test_file_path(filename)).pktq
+    return [dict(lat=x['latitude'],
+                 lon=x['longitude'],
+                 sog=x['sog'],
+                 timepoint=datetime.strptime(
+                     '{} {}'.format(x['time'], x['date']),
+                     '%H:%M:%S %Y/%m/%d').replace(tzinfo=pytz.UTC))
+            for x in packets if x is not None and x['fixtype'] != 'none']
+
+
+def make_passage(count=5000, seed=0):
+    """Build a synthetic long passage, with ~10km between trackpoints"""
+    rng = np.random.RandomState(seed)
+    lats = np.clip(np.cumsum(rng.uniform(-0.09, 0.09, count)), -80, 80)
+    lons = (np.cumsum(rng.uniform(-0.09, 0.09, count)) + 180) % 360 - 180
+    return [dict(lat=lat, lon=lon, sog=0) for lat, lon in zip(lats, lons)]
+
+
+def time_call(func, repeat=5, number=10):
+    """Best time in ms for a single call of func"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / \
+        number * 1000
+
+
+def benchmark_distances(name, trackpoints):
+    """Report the speed and accuracy of each distance method"""
+    stats = Stats(trackpoints)
+    reference = stats.distances('Vincenty').magnitude
+
+    print('\n{} ({} trackpoints)'.format(name, len(trackpoints)))
+    print('{:>14} {:>10} {:>14} {:>14}'.format(
+        'method', 'ms/call', 'max err (m)', 'total err (m)'))
+    for method in DISTANCE_METHODS:
+        # SphLawCos gives NaN for repeated points, so ignore those
+        with np.errstate(invalid='ignore'):
+            dist = stats.distances(method).magnitude
+            elapsed = time_call(lambda m=method: stats.distances(m))
+        print('{:>14} {:>10.3f} {:>14.4f} {:>14.4f}'.format(
+            method, elapsed, np.nanmax(np.abs(dist - reference)),
+            np.nansum(dist) - np.sum(reference)))
+
+
+def benchmark_make_json(name, trackpoints, repeat=10):
+    """Report the time to serialize trackpoints for the JSON views"""
+    trackpoints = trackpoints * repeat
+    elapsed = time_call(lambda: make_json_from_trackpoints(trackpoints),
+                        number=1)
+    print('\n{} JSON ({} trackpoints): {:.1f} ms'.format(
+        name, len(trackpoints), elapsed))
+
+
+def tolerance_search_simplify(points, desired_point_count=100):
+    """The original simplify_to_specific_length, for comparison
+
+    Reruns the simplification with increasing tolerance until few enough
+    points are left."""
+    current_point_count = len(points)
+    tolerance = 1/100000
+    line = points
+    while current_point_count > desired_point_count:
+        line = simplify(points, tolerance=tolerance)
+        tolerance += 1/100000
+        current_point_count = len(line)
+    return line
+
+
+def benchmark_simplify(name, trackpoints, count=100):
+    """Report the time to simplify a track to a specific length"""
+    print('\n{} simplify to {} ({} trackpoints)'.format(
+        name, count, len(trackpoints)))
+    for method in [tolerance_search_simplify, simplify_to_specific_length]:
+        elapsed = time_call(lambda m=method: m(trackpoints, count),
+                            repeat=1, number=1)
+        print('{:>28} {:>10.1f} ms {:>6} points'.format(
+            method.__name__, elapsed, len(method(trackpoints, count))))
+
+
+def main():
+    """Run all benchmarks"""
+    kite_session = load_sbn_trackpoints('kite-session1.sbn')
+    benchmark_distances('Kite session', kite_session)
+    benchmark_distances('Long passage', make_passage())
+    benchmark_make_json('Kite session', kite_session)
+    benchmark_simplify('Kite session', kite_session)
+
+
+if __name__ == '__main__':
+    main()
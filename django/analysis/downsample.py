@@ -0,0 +1,94 @@
+"""
+Helper module to downsample a time series for plotting
+
+A chart can't show more than one value per pixel, so there is no point in
+sending it more.  Both methods here keep the visual shape of the series:
+Largest-Triangle-Three-Buckets picks the most prominent point of each
+bucket, while the bucket aggregates keep the full range of each bucket.
+"""
+from typing import Sequence
+
+import numpy as np
+
+
+def lttb(x_vals: Sequence[float], y_vals: Sequence[float],
+         count: int) -> np.ndarray:
+    """Downsample with Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept.  The rest are split into
+    equal sized buckets, and the point kept from each bucket is the one
+    forming the largest triangle with the point kept from the previous
+    bucket and the average of the next bucket.
+
+    Parameters
+    ----------
+    x_vals, y_vals : sequence of float
+        The series, in increasing x order
+    count : int
+        The number of points to keep
+
+    Returns
+    -------
+    ndarray
+        Indices of the points kept
+    """
+    x_vals = np.asarray(x_vals, dtype=float)
+    y_vals = np.asarray(y_vals, dtype=float)
+    length = len(x_vals)
+    if count >= length or count < 3:
+        return np.arange(length)
+
+    # Start of each bucket, ending with the (single point) final bucket
+    edges = np.append(
+        np.floor(np.arange(count - 2) * (length - 2) / (count - 2)) + 1,
+        [length - 1, length]).astype(int)
+
+    kept = np.empty(count, dtype=int)
+    kept[0] = 0
+    kept[-1] = length - 1
+    prev = 0
+    for i in range(count - 2):
+        start, stop, next_stop = edges[i], edges[i + 1], edges[i + 2]
+        avg_x = x_vals[stop:next_stop].mean()
+        avg_y = y_vals[stop:next_stop].mean()
+        # Twice the triangle areas, the factor doesn't affect the max
+        areas = np.abs(
+            (x_vals[prev] - avg_x) * (y_vals[start:stop] - y_vals[prev]) -
+            (x_vals[prev] - x_vals[start:stop]) * (avg_y - y_vals[prev]))
+        prev = start + int(np.argmax(areas))
+        kept[i + 1] = prev
+    return kept
+
+
+def bucket_aggregates(x_vals: Sequence[float], y_vals: Sequence[float],
+                      count: int) -> dict:
+    """Downsample to the min, max and mean of equal width x buckets
+
+    Parameters
+    ----------
+    x_vals, y_vals : sequence of float
+        The series, in increasing x order
+    count : int
+        The number of buckets to split the x range into.  Empty buckets are
+        left out.
+
+    Returns
+    -------
+    dict
+        The index of the first point, and the min, max and mean of y, for
+        each non-empty bucket, as arrays
+    """
+    x_vals = np.asarray(x_vals, dtype=float)
+    y_vals = np.asarray(y_vals, dtype=float)
+    if not len(x_vals):
+        empty = np.zeros(0)
+        return dict(index=np.zeros(0, dtype=int), min=empty, max=empty,
+                    mean=empty)
+
+    edges = np.linspace(x_vals[0], x_vals[-1], count + 1)[:-1]
+    starts = np.unique(np.searchsorted(x_vals, edges, side='left'))
+    sizes = np.diff(np.append(starts, len(x_vals)))
+    return dict(index=starts,
+                min=np.minimum.reduceat(y_vals, starts),
+                max=np.maximum.reduceat(y_vals, starts),
+                mean=np.add.reduceat(y_vals, starts) / sizes)
@@ -0,0 +1,168 @@
+"""
+Helper module to flag implausible fixes in a GPS track
+
+Cheap loggers occasionally report positions that jump hundreds of meters, or
+speed over ground values that spike for a single sample.  The functions here
+flag those fixes so they can be kept in storage, but masked out of any stats.
+All of the checks operate on whole columns of the track at once.
+"""
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from analysis.stats import EARTHS_RADIUS_IN_KM
+
+MAX_SPEED = 60.0  # m/s, comfortably above any iceboat
+MAX_ACCELERATION = 10.0  # m/s^2
+MAX_SPEED_DEVIATION = 10.0  # m/s, away from rolling median
+MEDIAN_WINDOW = 5  # trackpoints
+
+
+def seconds_since_start(timepoints: Sequence) -> np.ndarray:
+    """Convert a sequence of datetimes into seconds since the first"""
+    if not timepoints:
+        return np.zeros(0)
+    start = timepoints[0]
+    return np.asarray([(x - start).total_seconds() for x in timepoints])
+
+
+def rolling_median(values: np.ndarray, window: int) -> np.ndarray:
+    """Centered rolling median, padding the ends with the edge values
+
+    Parameters
+    ----------
+    values : ndarray
+        The values to take the rolling median of
+    window : int
+        The number of values in each window, rounded up to an odd number
+    """
+    values = np.asarray(values, dtype=float)
+    half = window // 2
+    padded = np.pad(values, half, mode='edge')
+    step = padded.strides[0]
+    windows = as_strided(padded, shape=(len(values), 2 * half + 1),
+                         strides=(step, step))
+    return np.median(windows, axis=1)
+
+
+def segment_speeds(lats: np.ndarray, lons: np.ndarray,
+                   seconds: np.ndarray) -> np.ndarray:
+    """Get the speed (m/s) implied by each consecutive pair of positions
+
+    Pairs with no elapsed time are reported as infinitely fast if they
+    moved at all, and stationary otherwise."""
+    lats = np.radians(lats)
+    lons = np.radians(lons)
+    x_vals = np.diff(lons) * np.cos((lats[:-1] + lats[1:]) / 2)
+    y_vals = np.diff(lats)
+    dist = np.sqrt(x_vals**2 + y_vals**2) * EARTHS_RADIUS_IN_KM * 1000
+    elapsed = np.diff(seconds)
+
+    speeds = np.where(dist > 0, np.inf, 0.0)
+    moving = elapsed > 0
+    speeds[moving] = dist[moving] / elapsed[moving]
+    return speeds
+
+
+def _both_sides(segments: np.ndarray) -> np.ndarray:
+    """Flag points whose incoming and outgoing segments are both flagged
+
+    The first and last points only have a single segment, so they are
+    flagged if that segment is flagged and their neighbor was not."""
+    count = len(segments) + 1
+    flags = np.zeros(count, dtype=bool)
+    if count < 2:
+        return flags
+    flags[1:-1] = segments[:-1] & segments[1:]
+    flags[0] = segments[0] and not flags[1]
+    flags[-1] = segments[-1] and not flags[-2]
+    return flags
+
+
+def flag_outliers(lats: Sequence[float],
+                  lons: Sequence[float],
+                  sogs: Sequence[float],
+                  seconds: Sequence[float],
+                  max_speed: float = MAX_SPEED,
+                  max_acceleration: float = MAX_ACCELERATION,
+                  max_speed_deviation: float = MAX_SPEED_DEVIATION,
+                  median_window: int = MEDIAN_WINDOW) -> np.ndarray:
+    """Flag the implausible fixes in a time ordered track
+
+    Parameters
+    ----------
+    lats, lons : sequence of float
+        Position of each fix, in degrees
+    sogs : sequence of float
+        Reported speed over ground of each fix, in m/s
+    seconds : sequence of float
+        Time of each fix, in seconds from any fixed reference
+    max_speed : float
+        Any fix reporting, or implying, a faster speed (m/s) is flagged
+    max_acceleration : float
+        Fixes whose speed changes faster than this (m/s^2) both into and
+        out of the fix are flagged
+    max_speed_deviation : float
+        Fixes whose speed differs from the rolling median by more than this
+        (m/s) are flagged
+    median_window : int
+        Number of fixes in the rolling median window
+
+    Returns
+    -------
+    ndarray
+        Boolean array, True for each fix that should be ignored
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    sogs = np.asarray(sogs, dtype=float)
+    seconds = np.asarray(seconds, dtype=float)
+
+    if len(sogs) < 2:
+        return ~np.isfinite(sogs) | (sogs > max_speed)
+
+    # Missing values show up as NaN, which are always flagged, so don't
+    # warn about comparisons against them
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Instantaneous speed that is simply not believable
+        flags = ~np.isfinite(sogs) | (sogs > max_speed)
+
+        # Single sample speed spikes, both from the local median and from
+        # the acceleration required to get into and back out of them
+        median = rolling_median(sogs, median_window)
+        flags |= np.abs(sogs - median) > max_speed_deviation
+
+        elapsed = np.diff(seconds)
+        accel = np.abs(np.diff(sogs)) / elapsed
+        accel[elapsed <= 0] = 0
+        flags |= _both_sides(accel > max_acceleration)
+
+        # Position jumps, where the speed implied by the move to a fix, and
+        # back again, is much faster than the reported speed over ground
+        derived = segment_speeds(lats, lons, seconds)
+        reported = np.maximum(sogs[:-1], sogs[1:])
+        jumps = ((derived > max_speed) |
+                 (derived > reported + max_speed_deviation))
+        flags |= _both_sides(jumps)
+
+    return flags
+
+
+def pack_mask(mask: np.ndarray) -> bytes:
+    """Pack a boolean mask into a compact bit string for storage"""
+    return np.packbits(np.asarray(mask, dtype=bool)).tobytes()
+
+
+def unpack_mask(packed: bytes, count: int) -> np.ndarray:
+    """Unpack a mask stored by `pack_mask`
+
+    Parameters
+    ----------
+    packed : bytes
+        The packed mask
+    count : int
+        The number of entries in the original mask
+    """
+    bits = np.unpackbits(np.frombuffer(bytes(packed), dtype=np.uint8))
+    return bits[:count].astype(bool)
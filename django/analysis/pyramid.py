@@ -0,0 +1,79 @@
+"""
+Helper module to build multi-resolution levels of detail for a track
+
+Each trackpoint is given a detail level, the number of the simplification
+tolerances that keep it.  Trackpoints kept at a coarse tolerance are also
+counted as kept at all finer ones, so the levels nest, and any single level
+of detail is just the trackpoints with at least that detail level.
+"""
+from typing import Sequence
+
+import numpy as np
+
+from analysis.simplify import (simplify_douglas_peucker_indices,
+                               simplify_visvalingam_whyatt_indices)
+
+DETAIL_TOLERANCES = (10.0, 50.0, 250.0)  # m
+EQUATOR_METERS_PER_PIXEL = 156543.03  # at zoom level 0, for 256px tiles
+
+
+def detail_levels(lats: Sequence[float],
+                  lons: Sequence[float],
+                  mask: Sequence[bool] = None,
+                  tolerances: Sequence[float] = DETAIL_TOLERANCES,
+                  method: str = 'douglas_peucker') -> np.ndarray:
+    """Get the detail level of each trackpoint
+
+    Parameters
+    ----------
+    lats, lons : sequence of float
+        Position of each trackpoint, in degrees
+    mask : sequence of bool
+        Optional outlier flags, flagged trackpoints are only included at
+        full resolution (detail level 0)
+    tolerances : sequence of float
+        Increasing simplification tolerances (m) of each level
+    method : str
+        The simplification method, 'douglas_peucker', or
+        'visvalingam_whyatt' which removes points making triangles smaller
+        than the square of the tolerance
+
+    Returns
+    -------
+    ndarray
+        The number of tolerances that keep each trackpoint
+    """
+    levels = np.zeros(len(lats), dtype=int)
+    valid = np.arange(len(lats))
+    if mask is not None:
+        valid = valid[~np.asarray(mask, dtype=bool)]
+    if not len(valid):
+        return levels
+
+    lats = np.asarray(lats, dtype=float)[valid]
+    lons = np.asarray(lons, dtype=float)[valid]
+
+    kept = np.zeros(len(levels), dtype=bool)
+    for tolerance in reversed(tolerances):
+        if method == 'douglas_peucker':
+            indices = simplify_douglas_peucker_indices(lats, lons, tolerance)
+        elif method == 'visvalingam_whyatt':
+            indices = simplify_visvalingam_whyatt_indices(
+                lats, lons, area=tolerance * tolerance)
+        else:
+            raise ValueError('Unknown simplify method: {}'.format(method))
+        kept[valid[indices]] = True
+        levels[kept] += 1
+    return levels
+
+
+def detail_for_tolerance(tolerance: float,
+                         tolerances: Sequence[float] = DETAIL_TOLERANCES) -> \
+        int:
+    """Get the coarsest detail level within the given tolerance (m)"""
+    return int(np.searchsorted(tolerances, tolerance, side='right'))
+
+
+def zoom_to_tolerance(zoom: float, lat: float = 0.0) -> float:
+    """Get the size (m) of a map pixel at the given zoom level and latitude"""
+    return EQUATOR_METERS_PER_PIXEL * np.cos(np.radians(lat)) / 2**zoom
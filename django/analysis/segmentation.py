@@ -0,0 +1,149 @@
+"""
+Helper module to split a GPS track into moving and idle periods
+
+Most tracks start with the walk down to the beach and rigging, and end with
+derigging, none of which is interesting.  The functions here classify each
+trackpoint as moving or idle, from its speed over ground and how spread out
+the nearby positions are, so a trim can be suggested when the track is
+uploaded.  All of the rolling windows are computed on whole columns at once.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analysis.stats import EARTHS_RADIUS_IN_KM
+
+MIN_MOVING_SPEED = 1.5  # m/s, faster than walking pace
+MIN_DISPERSION = 10.0  # m, rms distance of the window from its centroid
+SEGMENT_WINDOW = 15  # trackpoints
+MIN_SEGMENT_DURATION = 60.0  # s
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Centered rolling mean, shrinking the window at the ends
+
+    Parameters
+    ----------
+    values : ndarray
+        The values to take the rolling mean of
+    window : int
+        The number of values in each window, rounded up to an odd number
+    """
+    values = np.asarray(values, dtype=float)
+    half = window // 2
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    index = np.arange(len(values))
+    lower = np.maximum(index - half, 0)
+    upper = np.minimum(index + half + 1, len(values))
+    return (cumsum[upper] - cumsum[lower]) / (upper - lower)
+
+
+def rolling_dispersion(lats: np.ndarray, lons: np.ndarray,
+                       window: int) -> np.ndarray:
+    """Rolling rms distance (m) of the positions from their centroid"""
+    lats = np.radians(lats)
+    lons = np.radians(lons)
+    radius = EARTHS_RADIUS_IN_KM * 1000
+    x_vals = (lons - lons[0]) * np.cos(lats[0]) * radius
+    y_vals = (lats - lats[0]) * radius
+
+    variance = (rolling_mean(x_vals**2, window) -
+                rolling_mean(x_vals, window)**2 +
+                rolling_mean(y_vals**2, window) -
+                rolling_mean(y_vals, window)**2)
+    # Rounding can leave tiny negative variances for stationary windows
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def classify_moving(lats: Sequence[float],
+                    lons: Sequence[float],
+                    sogs: Sequence[float],
+                    window: int = SEGMENT_WINDOW,
+                    min_speed: float = MIN_MOVING_SPEED,
+                    min_dispersion: float = MIN_DISPERSION) -> np.ndarray:
+    """Flag the trackpoints that are part of a moving period
+
+    A trackpoint is moving if both the mean speed over ground, and the
+    spread of the positions, in the window around it are large enough.
+    Speed alone is fooled by GPS noise while sitting still, and dispersion
+    alone by walking around the parking lot.
+
+    Parameters
+    ----------
+    lats, lons : sequence of float
+        Position of each trackpoint, in degrees
+    sogs : sequence of float
+        Speed over ground of each trackpoint, in m/s
+    window : int
+        Number of trackpoints in each rolling window
+    min_speed : float
+        Minimum mean speed (m/s) of a moving window
+    min_dispersion : float
+        Minimum rms distance (m) from the centroid of a moving window
+
+    Returns
+    -------
+    ndarray
+        Boolean array, True for each moving trackpoint
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    sogs = np.nan_to_num(np.asarray(sogs, dtype=float))
+    if not len(sogs):
+        return np.zeros(0, dtype=bool)
+
+    speed = rolling_mean(sogs, window)
+    dispersion = rolling_dispersion(lats, lons, window)
+    return (speed >= min_speed) & (dispersion >= min_dispersion)
+
+
+def moving_segments(moving: np.ndarray, seconds: np.ndarray,
+                    min_duration: float = MIN_SEGMENT_DURATION) -> \
+        List[Tuple[int, int]]:
+    """Get the (first, last) indices of each sustained moving period
+
+    Parameters
+    ----------
+    moving : ndarray
+        Boolean array, True for each moving trackpoint
+    seconds : ndarray
+        Time of each trackpoint, in seconds from any fixed reference
+    min_duration : float
+        Shorter moving periods (s) are ignored
+    """
+    edges = np.diff(np.concatenate(([0], np.asarray(moving, dtype=int),
+                                    [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    seconds = np.asarray(seconds, dtype=float)
+    keep = seconds[ends] - seconds[starts] >= min_duration
+    return list(zip(starts[keep].tolist(), ends[keep].tolist()))
+
+
+def find_trim_limits(lats: Sequence[float],
+                     lons: Sequence[float],
+                     sogs: Sequence[float],
+                     seconds: Sequence[float],
+                     window: int = SEGMENT_WINDOW,
+                     min_speed: float = MIN_MOVING_SPEED,
+                     min_dispersion: float = MIN_DISPERSION,
+                     min_duration: float = MIN_SEGMENT_DURATION) -> \
+        Optional[Tuple[int, int]]:
+    """Suggest the indices to trim a time ordered track to
+
+    The suggestion runs from the start of the first sustained moving period
+    to the end of the last, so idle periods mid-session are kept.  See
+    `classify_moving` and `moving_segments` for the parameters.
+
+    Returns
+    -------
+    tuple of int or None
+        The (first, last) index to keep, or None if nothing is moving
+    """
+    moving = classify_moving(lats, lons, sogs, window=window,
+                             min_speed=min_speed,
+                             min_dispersion=min_dispersion)
+    segments = moving_segments(moving, seconds, min_duration=min_duration)
+    if not segments:
+        return None
+    return segments[0][0], segments[-1][1]
@@ -31,6 +31,11 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 # pylint: disable=invalid-name
+import heapq
+
+import numpy as np
+
+from analysis.stats import EARTHS_RADIUS_IN_KM
 
 
 def get_square_distance(point1, point2):
@@ -153,15 +158,196 @@ def simplify(points, tolerance=0.1, highest_quality=True):
     return points
 
 
-def simplify_to_specific_length(points, desired_point_count=100):
-    """Simpilfy a line, to a specific number of points"""
-    current_point_count = len(points)
-    iterations = 0
-    tolerance = 1/100000
-    line = points
-    while current_point_count > desired_point_count:
-        iterations += 1
-        line = simplify(points, tolerance=tolerance)
-        tolerance += 1/100000
-        current_point_count = len(line)
-    return line
+def get_square_segment_distances(x, y, first, last):
+    """Square distances of the points between first and last to the segment
+
+    Vectorized version of `get_square_segment_distance`, for the points
+    first + 1 to last - 1 of the coordinate arrays."""
+    dx = x[last] - x[first]
+    dy = y[last] - y[first]
+    px = x[first + 1:last] - x[first]
+    py = y[first + 1:last] - y[first]
+
+    if dx != 0 or dy != 0:
+        t = np.clip((px * dx + py * dy) / (dx * dx + dy * dy), 0, 1)
+        px = px - dx * t
+        py = py - dy * t
+
+    return px * px + py * py
+
+
+def project_to_plane(lats, lons):
+    """Project positions (degrees) to a local plane, in meters"""
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    radius = EARTHS_RADIUS_IN_KM * 1000
+    x = (lons - lons[0]) * np.cos(np.mean(lats)) * radius
+    y = (lats - lats[0]) * radius
+    return x, y
+
+
+def simplify_douglas_peucker_indices(lats, lons, tolerance):
+    """Simplify positions using Douglas Peucker method
+
+    Works on arrays of lat and lon (degrees), projected to a local plane, so
+    the tolerance is in meters.  Returns the indices of the points kept."""
+    length = len(lats)
+    if length < 3:
+        return np.arange(length)
+
+    x, y = project_to_plane(lats, lons)
+    squared_tolerance = tolerance * tolerance
+    markers = np.zeros(length, dtype=bool)
+    markers[[0, -1]] = True
+
+    stack = [(0, length - 1)]
+    while stack:
+        first, last = stack.pop()
+        sqdists = get_square_segment_distances(x, y, first, last)
+        index = int(np.argmax(sqdists))
+
+        if sqdists[index] > squared_tolerance:
+            index += first + 1
+            markers[index] = True
+            if index - first > 1:
+                stack.append((first, index))
+            if last - index > 1:
+                stack.append((index, last))
+
+    return np.flatnonzero(markers)
+
+
+def get_douglas_peucker_significance(points):
+    """Square tolerance at which Douglas Peucker would remove each point
+
+    Runs a single Douglas Peucker pass down to every point.  A point is
+    kept at a tolerance when it, and every point that split the segments
+    above it, are further than the tolerance from their segment, so the
+    significance of a point is the smallest of those square distances.  The
+    end points are always kept, so have infinite significance."""
+    length = len(points)
+    x = np.array([point['lat'] for point in points], dtype=float)
+    y = np.array([point['lon'] for point in points], dtype=float)
+    significance = np.full(length, np.inf)
+
+    stack = [(0, length - 1, np.inf)] if length > 2 else []
+    while stack:
+        first, last, limit = stack.pop()
+        sqdists = get_square_segment_distances(x, y, first, last)
+        index = first + 1 + int(np.argmax(sqdists))
+        significance[index] = min(sqdists[index - first - 1], limit)
+
+        if index - first > 1:
+            stack.append((first, index, significance[index]))
+        if last - index > 1:
+            stack.append((index, last, significance[index]))
+
+    return significance
+
+
+def get_triangle_areas(x, y, before, middle, after):
+    """Areas of the triangles made by the points at the given indices"""
+    return abs((x[middle] - x[before]) * (y[after] - y[before]) -
+               (x[after] - x[before]) * (y[middle] - y[before])) / 2
+
+
+def get_visvalingam_whyatt_significance(x, y):
+    """Effective area at which Visvalingam Whyatt would remove each point
+
+    Repeatedly removes the point making the smallest triangle with its
+    neighbours, using a heap of areas.  The areas of the neighbours change
+    on each removal, so they are pushed again, and the stale heap entries
+    are skipped when popped.  The effective area of a point is at least
+    that of the points removed before it, so the simplifications at each
+    area threshold nest.  The end points are always kept, so have infinite
+    significance."""
+    length = len(x)
+    if length < 3:
+        return np.full(length, np.inf)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    middle = np.arange(1, length - 1)
+    areas = [np.inf] + get_triangle_areas(
+        x, y, middle - 1, middle, middle + 1).tolist() + [np.inf]
+
+    # Removing points one at a time is quicker with lists than arrays
+    x, y = x.tolist(), y.tolist()
+    previous = list(range(-1, length - 1))
+    following = list(range(1, length + 1))
+    significance = [np.inf] * length
+    heap = [(areas[index], index) for index in middle.tolist()]
+    heapq.heapify(heap)
+    largest = 0
+    while heap:
+        area, index = heapq.heappop(heap)
+        if area != areas[index] or significance[index] != np.inf:
+            continue
+
+        largest = max(largest, area)
+        significance[index] = largest
+
+        before, after = previous[index], following[index]
+        following[before] = after
+        previous[after] = before
+        for neighbour in (before, after):
+            if 0 < neighbour < length - 1:
+                areas[neighbour] = get_triangle_areas(
+                    x, y, previous[neighbour], neighbour,
+                    following[neighbour])
+                heapq.heappush(heap, (areas[neighbour], neighbour))
+
+    return np.array(significance)
+
+
+def get_most_significant(significance, count):
+    """Sorted indices of the count most significant points"""
+    # Break ties in significance by position along the line
+    order = np.lexsort((np.arange(len(significance)), -significance))
+    return np.sort(order[:count])
+
+
+def simplify_visvalingam_whyatt_indices(lats, lons, area=None, count=None):
+    """Simplify positions using Visvalingam Whyatt method
+
+    Works on arrays of lat and lon (degrees), projected to a local plane.
+    Keeps either the points with an effective area over the given area
+    (square meters), or the given count of points with the largest
+    effective areas.  Returns the indices of the points kept."""
+    if (area is None) == (count is None):
+        raise ValueError('Give exactly one of area or count')
+
+    length = len(lats)
+    if length < 3:
+        return np.arange(length)
+
+    significance = get_visvalingam_whyatt_significance(
+        *project_to_plane(lats, lons))
+    if count is not None:
+        return get_most_significant(significance, count)
+    return np.flatnonzero(significance > area)
+
+
+def simplify_to_specific_length(points, desired_point_count=100,
+                                method='douglas_peucker'):
+    """Simplify a line, to a specific number of points
+
+    Keeps the desired number of most significant points from a single
+    Douglas Peucker pass, which is the same as the Douglas Peucker
+    simplification at the tolerance that leaves that many points.  With
+    method 'visvalingam_whyatt', the points with the largest effective
+    areas are kept instead, which avoids spikes on zig-zagging lines."""
+    if len(points) <= desired_point_count:
+        return list(points)
+
+    if method == 'douglas_peucker':
+        significance = get_douglas_peucker_significance(points)
+    elif method == 'visvalingam_whyatt':
+        significance = get_visvalingam_whyatt_significance(
+            *project_to_plane([point['lat'] for point in points],
+                              [point['lon'] for point in points]))
+    else:
+        raise ValueError('Unknown simplify method: {}'.format(method))
+
+    return [points[i]
+            for i in get_most_significant(significance, desired_point_count)]
@@ -8,6 +8,183 @@ from pint import UnitRegistry
 
 EARTHS_RADIUS_IN_KM = 6371.0  # in km
 
+WGS84_A = 6378137.0  # semi-major axis, in m
+WGS84_F = 1 / 298.257223563  # flattening
+WGS84_B = WGS84_A * (1 - WGS84_F)  # semi-minor axis, in m
+
+ADAPTIVE_THRESHOLD_IN_KM = 1.0  # longest segment to approximate
+
+SPEED_HISTOGRAM_BINS = np.arange(0, 61, 1.0)  # m/s
+MAX_SUMMARY_POINTS = 5000
+SUSTAINED_SPEED_WINDOW = 10.0  # s
+
+
+def local_ellipsoid_distances(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Flat approximation of distances (m) using local WGS-84 radii
+
+    Uses the meridional and prime vertical radii of curvature at the
+    midpoint of each pair, which is very accurate over short distances.
+    All inputs in radians."""
+    mid_lat = (lat1 + lat2) / 2
+    ecc_sq = WGS84_F * (2 - WGS84_F)
+    denom = 1 - ecc_sq * np.sin(mid_lat)**2
+    meridional = WGS84_A * (1 - ecc_sq) / denom**1.5
+    prime_vertical = WGS84_A / np.sqrt(denom)
+    x_vals = (lon2 - lon1) * np.cos(mid_lat) * prime_vertical
+    y_vals = (lat2 - lat1) * meridional
+    return np.sqrt(x_vals**2 + y_vals**2)
+
+
+def vincenty_distances(lat1, lon1, lat2, lon2, tolerance=1e-12,
+                       max_iterations=200) -> np.ndarray:
+    """Distances (m) on the WGS-84 ellipsoid using Vincenty's inverse method
+
+    All pairs are iterated together, each pair stops being updated once it
+    has converged.  Nearly antipodal pairs, where the method does not
+    converge, fall back to a great circle distance on a sphere with the
+    mean radius.  All inputs in radians."""
+    shape = np.broadcast(lat1, lon1, lat2, lon2).shape
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype=float))
+          for x in (lat1, lon1, lat2, lon2)])
+
+    big_l = lon2 - lon1
+    u_1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    u_2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+    sin_u1, cos_u1 = np.sin(u_1), np.cos(u_1)
+    sin_u2, cos_u2 = np.sin(u_2), np.cos(u_2)
+
+    lam = big_l.copy()
+    sin_sigma = np.zeros_like(big_l)
+    cos_sigma = np.ones_like(big_l)
+    sigma = np.zeros_like(big_l)
+    cos_sq_alpha = np.ones_like(big_l)
+    cos_2sigma_m = np.zeros_like(big_l)
+    active = np.ones(big_l.shape, dtype=bool)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        sin_lam, cos_lam = np.sin(lam[idx]), np.cos(lam[idx])
+        su1, cu1, su2, cu2 = sin_u1[idx], cos_u1[idx], sin_u2[idx], cos_u2[idx]
+
+        sin_s = np.sqrt((cu2 * sin_lam)**2 +
+                        (cu1 * su2 - su1 * cu2 * cos_lam)**2)
+        cos_s = su1 * su2 + cu1 * cu2 * cos_lam
+        sig = np.arctan2(sin_s, cos_s)
+
+        # Coincident points have no defined azimuth, and zero distance
+        same = sin_s == 0
+        safe_sin_s = np.where(same, 1.0, sin_s)
+        sin_alpha = cu1 * cu2 * sin_lam / safe_sin_s
+        cos_sq_a = 1 - sin_alpha**2
+        # Equatorial lines have cos_sq_alpha of zero
+        safe_cos_sq_a = np.where(cos_sq_a == 0, 1.0, cos_sq_a)
+        cos_2sm = np.where(cos_sq_a == 0, 0.0,
+                           cos_s - 2 * su1 * su2 / safe_cos_sq_a)
+        c_val = WGS84_F / 16 * cos_sq_a * (4 + WGS84_F * (4 - 3 * cos_sq_a))
+        new_lam = big_l[idx] + (1 - c_val) * WGS84_F * sin_alpha * (
+            sig + c_val * sin_s * (
+                cos_2sm + c_val * cos_s * (-1 + 2 * cos_2sm**2)))
+
+        sin_sigma[idx] = sin_s
+        cos_sigma[idx] = cos_s
+        sigma[idx] = sig
+        cos_sq_alpha[idx] = cos_sq_a
+        cos_2sigma_m[idx] = cos_2sm
+
+        done = same | (np.abs(new_lam - lam[idx]) < tolerance)
+        lam[idx] = new_lam
+        active[idx[done]] = False
+
+    u_sq = cos_sq_alpha * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    a_val = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (
+        320 - 175 * u_sq)))
+    b_val = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = b_val * sin_sigma * (cos_2sigma_m + b_val / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m**2) -
+        b_val / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma**2) *
+        (-3 + 4 * cos_2sigma_m**2)))
+    dist = WGS84_B * a_val * (sigma - delta_sigma)
+
+    if active.any():
+        # Failed to converge, so nearly antipodal, use the sphere instead
+        a_hav = (np.sin((lat2[active] - lat1[active]) / 2)**2 +
+                 np.cos(lat1[active]) * np.cos(lat2[active]) *
+                 np.sin((lon2[active] - lon1[active]) / 2)**2)
+        mean_radius = (2 * WGS84_A + WGS84_B) / 3
+        dist[active] = mean_radius * 2 * np.arctan2(np.sqrt(a_hav),
+                                                    np.sqrt(1 - a_hav))
+    return dist.reshape(shape)
+
+
+def bearings(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Initial bearing (degrees) from each position to the next
+
+    Parameters
+    ----------
+    lats, lons : ndarray
+        Position of each trackpoint, in degrees
+    """
+    lats = np.deg2rad(lats)
+    lons = np.deg2rad(lons)
+
+    lat1 = lats[0:-1]
+    lat2 = lats[1:]
+    dlon = lons[1:] - lons[0:-1]
+
+    x_vals = (np.cos(lat1) * np.sin(lat2)) \
+        - (np.sin(lat1) * np.cos(lat2) * np.cos(dlon))
+    y_vals = np.sin(dlon) * np.cos(lat2)
+    brn = np.rad2deg(np.arctan2(y_vals, x_vals))
+    return np.mod(brn+360, 360)
+
+
+def max_sustained_speed(seconds, sogs,
+                        window: float = SUSTAINED_SPEED_WINDOW) -> float:
+    """Highest mean speed over any stretch of at least window seconds
+
+    Each stretch ends at a trackpoint, and starts at the latest trackpoint
+    at least window seconds before it.
+
+    Parameters
+    ----------
+    seconds : ndarray
+        Time of each trackpoint, in increasing seconds
+    sogs : ndarray
+        Speed over ground of each trackpoint, in m/s
+    window : float
+        Shortest stretch to average over, in seconds
+
+    Returns
+    -------
+    float
+        The speed in m/s, or None if the track is shorter than the window
+    """
+    seconds = np.asarray(seconds, dtype=float)
+    totals = np.append(0, np.cumsum(np.asarray(sogs, dtype=float)))
+    ends = np.arange(len(seconds))
+    starts = np.searchsorted(seconds, seconds - window, side='right') - 1
+    valid = starts >= 0
+    if not valid.any():
+        return None
+    starts, ends = starts[valid], ends[valid]
+    means = (totals[ends + 1] - totals[starts]) / (ends - starts + 1)
+    return float(np.max(means))
+
+
+def decimate(points: list, max_points: int = MAX_SUMMARY_POINTS) -> list:
+    """Keep every n-th point, for the smallest power of two n that leaves
+    at most max_points
+
+    Gives the same points as the decimated copy of the track kept by
+    `StatsAccumulator`, so summary images made from either match."""
+    stride = 1
+    while -(-len(points) // stride) > max_points:
+        stride *= 2
+    return list(points[::stride])
+
 
 class Stats(object):
     """ Stats object to compute common statistics for a GPS track"""
@@ -58,6 +235,17 @@ class Stats(object):
         """Get the max instantaneous speed during the track"""
         return max(self.speeds)
 
+    def sustained_speed(self, window: float = SUSTAINED_SPEED_WINDOW):
+        """Get the max speed held for window seconds, or None if shorter"""
+        seconds = [(x['timepoint'] - self.full_start_time).total_seconds()
+                   for x in self.trackpoints]
+        speed = max_sustained_speed(seconds,
+                                    [x['sog'] for x in self.trackpoints],
+                                    window)
+        if speed is None:
+            return None
+        return speed * (self.units.m / self.units.s)
+
     def distances(self, method='EquirecApprox') -> list:
         """Get the trackpoint to trackpoint distances across the track
 
@@ -73,6 +261,14 @@ class Stats(object):
             'Haversine' is more accurate, but slower.
 
             'SphLawCos' is more accurate, but slower.
+
+            'Vincenty' uses the WGS-84 ellipsoid rather than a sphere. Most
+            accurate, but slowest.
+
+            'Adaptive' uses the WGS-84 ellipsoid too, but only solves
+            Vincenty's method for segments longer than
+            ADAPTIVE_THRESHOLD_IN_KM, approximating shorter segments with
+            the local radii of the ellipsoid.
         """
 
         lats = np.radians(np.asarray([x['lat'] for x in self.trackpoints]))
@@ -96,6 +292,18 @@ class Stats(object):
             dist = (np.arccos((np.sin(lat1) * np.sin(lat2)) +
                               (np.cos(lat1) * np.cos(lat2) * np.cos(dlon))) *
                     EARTHS_RADIUS_IN_KM)
+
+        elif method == 'Vincenty':
+            dist = vincenty_distances(lat1, lon1, lat2, lon2) / 1000
+
+        elif method == 'Adaptive':
+            dist = local_ellipsoid_distances(lat1, lon1, lat2, lon2) / 1000
+            long_segments = dist > ADAPTIVE_THRESHOLD_IN_KM
+            if long_segments.any():
+                dist[long_segments] = vincenty_distances(
+                    lat1[long_segments], lon1[long_segments],
+                    lat2[long_segments], lon2[long_segments]) / 1000
+
         else:
             x_vals = (lon2-lon1) * np.cos((lat1+lat2)/2)
             y_vals = (lat2-lat1)
@@ -117,16 +325,142 @@ class Stats(object):
 
     def bearing(self) -> list:
         """Calculate the instantaneous bearing between each trackpoint pair"""
+        return bearings(np.asarray([x['lat'] for x in self.trackpoints]),
+                        np.asarray([x['lon'] for x in self.trackpoints]))
 
-        lats = np.deg2rad(np.asarray([x['lat'] for x in self.trackpoints]))
-        lons = np.deg2rad(np.asarray([x['lon'] for x in self.trackpoints]))
 
-        lat1 = lats[0:-1]
-        lat2 = lats[1:]
-        dlon = lons[1:] - lons[0:-1]
+class StatsAccumulator(object):
+    """Single pass accumulator for the common statistics of a GPS track
+
+    Consumes trackpoints, one at a time or as column chunks, as they are
+    produced, so stats are available without holding (or re-reading) the
+    whole track.  Memory use is bounded regardless of the track length,
+    only a decimated copy of the track is kept, for summary images.
+
+    Distances use the same equirectangular approximation as the default
+    method of `Stats.distances()`.
+    """
+
+    def __init__(self, speed_bins: np.ndarray = SPEED_HISTOGRAM_BINS,
+                 max_points: int = MAX_SUMMARY_POINTS,
+                 sustained_window: float = SUSTAINED_SPEED_WINDOW):
+        self.count = 0
+        self.distance = 0.0  # m
+        self.max_speed = None  # m/s
+        self.sustained_speed = None  # m/s
+        self.sustained_window = sustained_window  # s
+        self.start = None
+        self.end = None
+        self.bbox = None  # [max_lat, max_lon, min_lat, min_lon]
+        self.speed_bins = np.asarray(speed_bins, dtype=float)
+        self.speed_histogram = np.zeros(len(self.speed_bins) - 1, dtype=int)
+        self.points = []
+        self.max_points = max_points
+        self._stride = 1
+        self._prev = None  # (lat, lon) of last valid point, in radians
+        # Seconds since start and speeds of the last valid points, enough
+        # to finish any sustained speed window started in a prior chunk
+        self._tail = (np.zeros(0), np.zeros(0))
+
+    def add(self, lat: float, lon: float, sog: float,
+            timepoint: datetime.datetime, flagged: bool = False) -> None:
+        """Add a single trackpoint
+
+        Flagged trackpoints only count towards the start and end times"""
+        self.add_chunk([lat], [lon], [sog], [timepoint], [flagged])
+
+    def add_chunk(self, lats, lons, sogs, timepoints, flagged=None) -> None:
+        """Add a time ordered chunk of trackpoints, as columns
+
+        Parameters
+        ----------
+        lats, lons : sequence of float
+            Position of each trackpoint, in degrees
+        sogs : sequence of float
+            Speed over ground of each trackpoint, in m/s
+        timepoints : sequence of datetime
+            Time of each trackpoint
+        flagged : sequence of bool
+            Optional outlier flags, flagged trackpoints only count towards
+            the start and end times
+        """
+        if not len(timepoints):
+            return
+        if self.start is None:
+            self.start = timepoints[0]
+        self.end = timepoints[-1]
+
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        sogs = np.asarray(sogs, dtype=float)
+        if flagged is not None:
+            valid = ~np.asarray(flagged, dtype=bool)
+            lats, lons, sogs = lats[valid], lons[valid], sogs[valid]
+            timepoints = [x for x, keep in zip(timepoints, valid) if keep]
+        if not len(lats):
+            return
+
+        self._add_distance(np.radians(lats), np.radians(lons))
+        self._add_speeds(sogs)
+        self._add_sustained_speed(timepoints, sogs)
+        self._add_bbox(lats, lons)
+        self._add_points(lats, lons, sogs, timepoints)
+        self.count += len(lats)
+
+    def _add_distance(self, lats, lons):
+        """Add the distances, carrying over the last point of prior chunk"""
+        if self._prev is not None:
+            lats = np.insert(lats, 0, self._prev[0])
+            lons = np.insert(lons, 0, self._prev[1])
+        x_vals = np.diff(lons) * np.cos((lats[:-1] + lats[1:]) / 2)
+        y_vals = np.diff(lats)
+        self.distance += float(np.sum(np.sqrt(x_vals**2 + y_vals**2)) *
+                               EARTHS_RADIUS_IN_KM * 1000)
+        self._prev = (lats[-1], lons[-1])
+
+    def _add_speeds(self, sogs):
+        """Track the max speed, and histogram of speeds"""
+        chunk_max = float(np.max(sogs))
+        if self.max_speed is None or chunk_max > self.max_speed:
+            self.max_speed = chunk_max
+        # Anything outside the bins is counted in the first or last bin
+        clipped = np.clip(sogs, self.speed_bins[0], self.speed_bins[-1])
+        self.speed_histogram += np.histogram(clipped, self.speed_bins)[0]
+
+    def _add_sustained_speed(self, timepoints, sogs):
+        """Track the max sustained speed, carrying over the prior tail"""
+        seconds = [x - self.start for x in timepoints]
+        seconds = [x.total_seconds() if isinstance(x, datetime.timedelta)
+                   else float(x) for x in seconds]
+        seconds = np.append(self._tail[0], seconds)
+        sogs = np.append(self._tail[1], sogs)
+
+        speed = max_sustained_speed(seconds, sogs, self.sustained_window)
+        if speed is not None and (self.sustained_speed is None or
+                                  speed > self.sustained_speed):
+            self.sustained_speed = speed
+
+        keep = np.searchsorted(seconds, seconds[-1] - self.sustained_window,
+                               side='right') - 1
+        keep = max(int(keep), 0)
+        self._tail = (seconds[keep:], sogs[keep:])
+
+    def _add_bbox(self, lats, lons):
+        """Expand the bounding box to cover the chunk"""
+        bbox = [np.max(lats), np.max(lons), np.min(lats), np.min(lons)]
+        if self.bbox is not None:
+            bbox = [max(bbox[0], self.bbox[0]), max(bbox[1], self.bbox[1]),
+                    min(bbox[2], self.bbox[2]), min(bbox[3], self.bbox[3])]
+        self.bbox = [float(x) for x in bbox]
+
+    def _add_points(self, lats, lons, sogs, timepoints):
+        """Keep every n-th point, doubling n whenever the buffer fills
 
-        x_vals = (np.cos(lat1) * np.sin(lat2)) \
-            - (np.sin(lat1) * np.cos(lat2) * np.cos(dlon))
-        y_vals = np.sin(dlon) * np.cos(lat2)
-        brn = np.rad2deg(np.arctan2(y_vals, x_vals))
-        return np.mod(brn+360, 360)
+        Matches `decimate` of all the valid points added"""
+        keep = np.flatnonzero((np.arange(len(lats)) + self.count) %
+                              self._stride == 0)
+        self.points.extend(dict(lat=lats[i], lon=lons[i], sog=sogs[i],
+                                timepoint=timepoints[i]) for i in keep)
+        while len(self.points) > self.max_points:
+            self._stride *= 2
+            self.points = self.points[::2]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from analysis.downsample import lttb, bucket_aggregates
+
+
+class TestLTTB:
+
+    def test_keeps_everything_if_count_is_large(self):
+        assert lttb([0, 1, 2], [0, 1, 0], 5).tolist() == [0, 1, 2]
+
+    def test_keeps_ends_and_spikes(self):
+        x_vals = np.arange(100)
+        y_vals = np.zeros(100)
+        y_vals[30] = 10
+        y_vals[71] = -10
+
+        kept = lttb(x_vals, y_vals, 10)
+
+        assert len(kept) == 10
+        assert kept[0] == 0
+        assert kept[-1] == 99
+        assert 30 in kept
+        assert 71 in kept
+        assert (np.diff(kept) > 0).all()
+
+    def test_one_point_per_bucket(self):
+        x_vals = np.arange(1000)
+        y_vals = np.sin(x_vals / 10)
+
+        kept = lttb(x_vals, y_vals, 100)
+
+        # Buckets of ~10 points, one point kept from each
+        assert len(kept) == 100
+        assert (np.diff(kept[1:-1]) < 20).all()
+
+
+class TestBucketAggregates:
+
+    def test_aggregates_each_bucket(self):
+        x_vals = [0, 1, 2, 3, 4, 5]
+        y_vals = [1, 3, 2, 6, 4, 5]
+
+        buckets = bucket_aggregates(x_vals, y_vals, 2)
+
+        assert buckets['index'].tolist() == [0, 3]
+        assert buckets['min'].tolist() == [1, 4]
+        assert buckets['max'].tolist() == [3, 6]
+        assert buckets['mean'].tolist() == [2, 5]
+
+    def test_leaves_out_empty_buckets(self):
+        x_vals = [0, 1, 9, 10]
+        y_vals = [1, 2, 3, 4]
+
+        buckets = bucket_aggregates(x_vals, y_vals, 5)
+
+        assert buckets['index'].tolist() == [0, 2]
+        assert buckets['max'].tolist() == [2, 4]
+
+    def test_empty_series(self):
+        buckets = bucket_aggregates([], [], 5)
+
+        assert len(buckets['index']) == 0
+        assert len(buckets['mean']) == 0
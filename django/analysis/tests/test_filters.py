@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analysis.filters import (flag_outliers, pack_mask, unpack_mask,
+                              rolling_median, segment_speeds,
+                              seconds_since_start)
+
+
+def straight_track(count=10, speed=5.0):
+    """Build a track heading north at a constant speed, one fix a second"""
+    seconds = np.arange(count, dtype=float)
+    # 1 degree of latitude is ~111.2km on the sphere used for stats
+    lats = 45 + seconds * speed / 111194.9
+    lons = np.full(count, -90.0)
+    sogs = np.full(count, speed)
+    return lats, lons, sogs, seconds
+
+
+class TestFilters:
+
+    def test_seconds_since_start(self):
+        start = datetime(2016, 1, 1)
+        times = [start, start + timedelta(seconds=1),
+                 start + timedelta(seconds=2.5)]
+
+        assert seconds_since_start(times).tolist() == [0, 1, 2.5]
+        assert len(seconds_since_start([])) == 0
+
+    def test_rolling_median_removes_single_spike(self):
+        values = np.asarray([1, 1, 9, 1, 1, 2])
+
+        assert rolling_median(values, 3).tolist() == [1, 1, 1, 1, 1, 2]
+
+    def test_segment_speeds(self):
+        lats, lons, _, seconds = straight_track(3)
+
+        speeds = segment_speeds(lats, lons, seconds)
+
+        assert np.allclose(speeds, [5, 5])
+
+    def test_segment_speeds_with_no_elapsed_time(self):
+        speeds = segment_speeds(np.asarray([45, 45, 46]),
+                                np.asarray([-90, -90, -90]),
+                                np.asarray([0, 0, 0]))
+
+        assert speeds.tolist() == [0, np.inf]
+
+    def test_flag_outliers_leaves_clean_track_alone(self):
+        mask = flag_outliers(*straight_track())
+
+        assert not mask.any()
+
+    def test_flag_outliers_flags_speed_spike(self):
+        lats, lons, sogs, seconds = straight_track()
+        sogs[4] = 40
+
+        mask = flag_outliers(lats, lons, sogs, seconds)
+
+        assert np.flatnonzero(mask).tolist() == [4]
+
+    def test_flag_outliers_flags_impossible_speed(self):
+        lats, lons, sogs, seconds = straight_track()
+        sogs[6] = 100
+
+        mask = flag_outliers(lats, lons, sogs, seconds,
+                             max_speed_deviation=1000)
+
+        assert np.flatnonzero(mask).tolist() == [6]
+
+    def test_flag_outliers_flags_position_jump(self):
+        lats, lons, sogs, seconds = straight_track()
+        lons[5] += 0.01  # ~800m sideways, and back again
+
+        mask = flag_outliers(lats, lons, sogs, seconds)
+
+        assert np.flatnonzero(mask).tolist() == [5]
+
+    def test_flag_outliers_flags_jump_at_end_of_track(self):
+        lats, lons, sogs, seconds = straight_track()
+        lats[-1] += 0.01
+
+        mask = flag_outliers(lats, lons, sogs, seconds)
+
+        assert np.flatnonzero(mask).tolist() == [9]
+
+    def test_flag_outliers_with_single_point(self):
+        assert flag_outliers([1], [1], [100], [0]).tolist() == [True]
+        assert flag_outliers([1], [1], [1], [0]).tolist() == [False]
+
+    def test_pack_mask_round_trips(self):
+        mask = np.asarray([True, False, False, True, False, False, False,
+                           False, False, True])
+
+        packed = pack_mask(mask)
+
+        assert len(packed) == 2
+        assert unpack_mask(packed, len(mask)).tolist() == mask.tolist()
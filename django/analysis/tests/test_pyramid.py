@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from analysis.pyramid import (detail_levels, detail_for_tolerance,
+                              zoom_to_tolerance)
+
+METERS_PER_DEGREE = 111194.9  # of latitude, on the sphere used for stats
+
+
+def zig_zag(amplitude, count=21, spacing=100.0):
+    """Build a track heading east, weaving north and south"""
+    x_vals = np.arange(count) * spacing
+    y_vals = np.where(np.arange(count) % 2, amplitude, 0.0)
+    return 45 + y_vals / METERS_PER_DEGREE, x_vals / METERS_PER_DEGREE
+
+
+class TestPyramid:
+
+    def test_straight_track_keeps_only_ends(self):
+        lats, lons = zig_zag(0)
+
+        levels = detail_levels(lats, lons)
+
+        assert levels[0] == levels[-1] == 3
+        assert not levels[1:-1].any()
+
+    def test_weave_is_kept_at_finer_tolerances_only(self):
+        lats, lons = zig_zag(30)
+
+        levels = detail_levels(lats, lons)
+
+        assert (levels[1:-1] == 1).all()
+
+    def test_visvalingam_whyatt_levels(self):
+        lats, lons = zig_zag(30)
+
+        levels = detail_levels(lats, lons, method='visvalingam_whyatt')
+
+        assert levels[0] == levels[-1] == 3
+        assert (levels[1:-1] >= 1).all()
+        assert (levels[1:-1] < 3).all()
+
+    def test_unknown_method(self):
+        lats, lons = zig_zag(30)
+
+        with pytest.raises(ValueError):
+            detail_levels(lats, lons, method='unknown')
+
+    def test_levels_nest(self):
+        rng = np.random.RandomState(0)
+        lats = 45 + np.cumsum(rng.normal(0, 50, 200)) / METERS_PER_DEGREE
+        lons = np.cumsum(rng.normal(0, 50, 200)) / METERS_PER_DEGREE
+
+        levels = detail_levels(lats, lons)
+
+        # Each level of detail contains every coarser level, and always
+        # includes the ends
+        assert np.bincount(levels).tolist()[0] < 200
+        assert levels[0] == levels[-1] == 3
+        for level in range(1, 4):
+            coarse = set(np.flatnonzero(levels >= level + 1))
+            assert coarse <= set(np.flatnonzero(levels >= level))
+
+    def test_flagged_trackpoints_are_full_resolution_only(self):
+        lats, lons = zig_zag(30)
+
+        levels = detail_levels(lats, lons, mask=np.arange(21) == 5)
+
+        assert levels[5] == 0
+        assert levels[4] == 1
+
+    def test_all_flagged(self):
+        levels = detail_levels([1, 2], [1, 2], mask=[True, True])
+
+        assert levels.tolist() == [0, 0]
+
+    def test_detail_for_tolerance(self):
+        assert detail_for_tolerance(5) == 0
+        assert detail_for_tolerance(10) == 1
+        assert detail_for_tolerance(100) == 2
+        assert detail_for_tolerance(1000) == 3
+
+    def test_zoom_to_tolerance(self):
+        assert round(zoom_to_tolerance(0)) == 156543
+        assert round(zoom_to_tolerance(1, lat=60)) == round(156543.03 / 4)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from analysis.segmentation import (rolling_mean, rolling_dispersion,
+                                   classify_moving, moving_segments,
+                                   find_trim_limits)
+
+
+def rig_sail_derig(idle=100, sailing=200, speed=5.0):
+    """Build a track idle on the beach, sailing north, then idle again"""
+    sogs = np.concatenate((np.full(idle, 0.2), np.full(sailing, speed),
+                           np.full(idle, 0.2)))
+    # 1 degree of latitude is ~111.2km on the sphere used for stats
+    lats = 45 + np.cumsum(sogs) / 111194.9
+    # A little GPS noise while standing still
+    lats[:idle] += np.tile([0, 2e-5], idle // 2)
+    lons = np.full(len(sogs), -90.0)
+    seconds = np.arange(len(sogs), dtype=float)
+    return lats, lons, sogs, seconds
+
+
+class TestSegmentation:
+
+    def test_rolling_mean_shrinks_window_at_ends(self):
+        values = np.asarray([1, 2, 3, 4, 5])
+
+        assert rolling_mean(values, 3).tolist() == [1.5, 2, 3, 4, 4.5]
+
+    def test_rolling_dispersion_of_stationary_track_is_zero(self):
+        lats = np.full(10, 45.0)
+        lons = np.full(10, -90.0)
+
+        assert not rolling_dispersion(lats, lons, 5).any()
+
+    def test_rolling_dispersion_of_moving_track(self):
+        lats = 45 + np.arange(10) / 111194.9  # 1m apart
+
+        dispersion = rolling_dispersion(lats, np.full(10, -90.0), 3)
+
+        assert np.allclose(dispersion[1:-1], np.sqrt(2 / 3))
+
+    def test_classify_moving(self):
+        lats, lons, sogs, _ = rig_sail_derig()
+
+        moving = classify_moving(lats, lons, sogs)
+
+        assert not moving[:90].any()
+        assert moving[110:290].all()
+        assert not moving[310:].any()
+
+    def test_classify_moving_ignores_noisy_speed_while_stationary(self):
+        lats, lons, sogs, _ = rig_sail_derig()
+        sogs[:100] = 3
+
+        moving = classify_moving(lats, lons, sogs)
+
+        assert not moving[:90].any()
+
+    def test_classify_moving_with_empty_track(self):
+        assert len(classify_moving([], [], [])) == 0
+
+    def test_moving_segments_drops_short_segments(self):
+        moving = np.asarray([True, True, False, True, False, True, True])
+
+        segments = moving_segments(moving, np.arange(7) * 60.0)
+
+        assert segments == [(0, 1), (5, 6)]
+
+    def test_find_trim_limits(self):
+        start, end = find_trim_limits(*rig_sail_derig())
+
+        assert 90 < start < 110
+        assert 290 < end < 310
+
+    def test_find_trim_limits_keeps_idle_time_mid_session(self):
+        lats, lons, sogs, seconds = rig_sail_derig(sailing=400)
+        sogs[200:250] = 0
+        lats[200:250] = lats[199]
+
+        start, end = find_trim_limits(lats, lons, sogs, seconds)
+
+        assert 90 < start < 110
+        assert 490 < end < 510
+
+    def test_find_trim_limits_with_nothing_moving(self):
+        lats, lons, sogs, seconds = rig_sail_derig(sailing=0)
+
+        assert find_trim_limits(lats, lons, sogs, seconds) is None
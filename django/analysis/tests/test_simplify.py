@@ -0,0 +1,201 @@
+import numpy as np
+import pytest
+
+from analysis.simplify import (get_douglas_peucker_significance,
+                               get_square_segment_distance,
+                               get_square_segment_distances,
+                               get_visvalingam_whyatt_significance,
+                               project_to_plane, simplify,
+                               simplify_douglas_peucker,
+                               simplify_douglas_peucker_indices,
+                               simplify_to_specific_length,
+                               simplify_visvalingam_whyatt_indices)
+
+METERS_PER_DEGREE = 111194.9  # of latitude, on the sphere used for stats
+
+
+def make_points(lats, lons):
+    return [dict(lat=lat, lon=lon) for lat, lon in zip(lats, lons)]
+
+
+def naive_visvalingam_whyatt(x, y):
+    """Effective areas, found by rescanning for the smallest triangle"""
+    remaining = list(range(len(x)))
+    significance = np.full(len(x), np.inf)
+    largest = 0
+    while len(remaining) > 2:
+        areas = [abs((x[b] - x[a]) * (y[c] - y[a]) -
+                     (x[c] - x[a]) * (y[b] - y[a])) / 2
+                 for a, b, c in zip(remaining, remaining[1:],
+                                    remaining[2:])]
+        smallest = int(np.argmin(areas))
+        largest = max(largest, areas[smallest])
+        significance[remaining.pop(smallest + 1)] = largest
+    return significance
+
+
+def random_walk(count=300, seed=0):
+    rng = np.random.RandomState(seed)
+    return make_points(np.cumsum(rng.normal(size=count)),
+                       np.cumsum(rng.normal(size=count)))
+
+
+class TestSimplify:
+
+    def test_segment_distances_match_single_point_version(self):
+        points = random_walk(20)
+        x = np.array([p['lat'] for p in points])
+        y = np.array([p['lon'] for p in points])
+
+        sqdists = get_square_segment_distances(x, y, 2, 15)
+
+        expected = [get_square_segment_distance(p, points[2], points[15])
+                    for p in points[3:15]]
+        assert np.allclose(sqdists, expected)
+
+    def test_project_to_plane(self):
+        x, y = project_to_plane([0, 0, 1], [0, 1, 1])
+
+        assert np.allclose(x, [0, METERS_PER_DEGREE, METERS_PER_DEGREE],
+                           rtol=1e-4)
+        assert np.allclose(y, [0, 0, METERS_PER_DEGREE])
+
+    def test_indices_tolerance_is_in_meters(self):
+        # 30m bump in the middle of a 2km line heading east
+        lats = 45 + np.array([0, 0, 30, 0, 0]) / METERS_PER_DEGREE
+        lons = np.arange(5) * 500 / METERS_PER_DEGREE
+
+        assert simplify_douglas_peucker_indices(lats, lons, 20).tolist() == \
+            [0, 2, 4]
+        assert simplify_douglas_peucker_indices(lats, lons, 40).tolist() == \
+            [0, 4]
+
+    def test_indices_match_dict_version(self):
+        points = random_walk()
+        lats = np.array([p['lat'] for p in points]) / 1000
+        lons = np.array([p['lon'] for p in points]) / 1000
+        x, y = project_to_plane(lats, lons)
+        projected = make_points(x, y)
+
+        for tolerance in [10, 50, 200]:
+            indices = simplify_douglas_peucker_indices(lats, lons, tolerance)
+            expected = simplify_douglas_peucker(projected,
+                                                tolerance * tolerance)
+            assert [projected[i] for i in indices] == expected
+
+    def test_indices_of_short_lines(self):
+        assert simplify_douglas_peucker_indices([], [], 10).tolist() == []
+        assert simplify_douglas_peucker_indices([1, 2], [1, 2],
+                                                10).tolist() == [0, 1]
+
+    def test_significance_of_simple_line(self):
+        points = make_points([0, 1, 0, 0, 0], [0, 1, 2, 3, 4])
+
+        significance = get_douglas_peucker_significance(points)
+
+        assert np.isinf(significance[0]) and np.isinf(significance[-1])
+        assert significance[1] == 1
+        assert significance[2] < significance[1]
+        assert significance[3] == 0
+
+    def test_significance_is_capped_by_splitting_point(self):
+        # The middle point is further from its segment than the point that
+        # split the line, so would be removed along with it
+        points = make_points([0, 1, -5, 2, 0], [0, 1, 2, 3, 4])
+
+        significance = get_douglas_peucker_significance(points)
+
+        split = int(np.argmax(significance[1:-1])) + 1
+        assert (significance[1:-1] <= significance[split]).all()
+
+    def test_significance_matches_douglas_peucker(self):
+        points = random_walk()
+        significance = get_douglas_peucker_significance(points)
+
+        for tolerance in [0.5, 1, 2, 5]:
+            expected = simplify(points, tolerance=tolerance)
+            kept = [p for p, s in zip(points, significance)
+                    if s > tolerance * tolerance]
+            assert kept == expected
+
+    def test_simplify_to_specific_length_returns_exact_count(self):
+        points = random_walk()
+
+        for count in [2, 10, 100, 299]:
+            line = simplify_to_specific_length(points, count)
+
+            assert len(line) == count
+            assert line[0] is points[0] and line[-1] is points[-1]
+
+    def test_simplify_to_specific_length_keeps_order(self):
+        points = random_walk()
+
+        line = simplify_to_specific_length(points, 50)
+
+        indices = [points.index(p) for p in line]
+        assert indices == sorted(indices)
+
+    def test_simplify_to_specific_length_short_line(self):
+        points = random_walk(10)
+
+        assert simplify_to_specific_length(points) == points
+
+    def test_simplify_to_specific_length_on_straight_line(self):
+        points = make_points(np.zeros(200), np.arange(200))
+
+        line = simplify_to_specific_length(points, 100)
+
+        assert len(line) == 100
+
+    def test_visvalingam_whyatt_significance_of_simple_line(self):
+        x = np.array([0, 1, 2, 3, 4], dtype=float)
+        y = np.array([0, 0, 3, 0, 0], dtype=float)
+
+        significance = get_visvalingam_whyatt_significance(x, y)
+
+        assert np.isinf(significance[0]) and np.isinf(significance[-1])
+        # The flat points go first, leaving the 4 x 3 triangle
+        assert significance.tolist()[1:-1] == [1.5, 6, 1.5]
+
+    def test_visvalingam_whyatt_matches_naive_version(self):
+        points = random_walk()
+        x = np.array([p['lat'] for p in points])
+        y = np.array([p['lon'] for p in points])
+
+        assert np.allclose(get_visvalingam_whyatt_significance(x, y),
+                           naive_visvalingam_whyatt(x, y))
+
+    def test_visvalingam_whyatt_by_area_and_count(self):
+        points = random_walk()
+        lats = np.array([p['lat'] for p in points]) / 1000
+        lons = np.array([p['lon'] for p in points]) / 1000
+
+        by_count = simplify_visvalingam_whyatt_indices(lats, lons, count=50)
+        significance = get_visvalingam_whyatt_significance(
+            *project_to_plane(lats, lons))
+        area = np.sort(significance)[-50]
+        by_area = simplify_visvalingam_whyatt_indices(lats, lons,
+                                                      area=area * 0.999)
+
+        assert len(by_count) == 50
+        assert by_count.tolist() == by_area.tolist()
+
+    def test_visvalingam_whyatt_needs_area_or_count(self):
+        with pytest.raises(ValueError):
+            simplify_visvalingam_whyatt_indices([1, 2, 3], [1, 2, 3])
+        with pytest.raises(ValueError):
+            simplify_visvalingam_whyatt_indices([1, 2, 3], [1, 2, 3],
+                                                area=1, count=2)
+
+    def test_simplify_to_specific_length_visvalingam_whyatt(self):
+        points = random_walk()
+
+        line = simplify_to_specific_length(points, 50,
+                                           method='visvalingam_whyatt')
+
+        assert len(line) == 50
+        assert line[0] is points[0] and line[-1] is points[-1]
+
+    def test_simplify_to_specific_length_unknown_method(self):
+        with pytest.raises(ValueError):
+            simplify_to_specific_length(random_walk(), 50, method='unknown')
@@ -3,7 +3,11 @@ from datetime import date, time, timedelta, datetime
 import pytest
 import pytz
 
-from analysis.stats import Stats
+import numpy as np
+
+from analysis.stats import (Stats, StatsAccumulator, decimate,
+                            vincenty_distances, local_ellipsoid_distances,
+                            max_sustained_speed)
 from gps import sirf
 from tests.assets import get_test_file_path
 
@@ -51,6 +55,15 @@ class TestStats:
     def test_get_max_speed(self, stats):
         assert '2.53 m / s' == '{:~}'.format(stats.max_speed)
 
+    def test_get_sustained_speed(self, stats):
+        speed = stats.sustained_speed()
+        assert stats.sustained_speed(window=0.5) <= stats.max_speed
+        assert speed < stats.max_speed
+        assert '2.23 m / s' == '{:.2f~}'.format(speed)
+
+    def test_sustained_speed_of_short_track_is_none(self, stats):
+        assert stats.sustained_speed(window=60) is None
+
     def test_get_distance_haversine_method(self, stats):
         assert 59.125 == my_round(stats.distance(method='Haversine').magnitude)
 
@@ -60,8 +73,177 @@ class TestStats:
     def test_get_distance_equirect_method(self, stats):
         assert 59.125 == my_round(stats.distance(method='Equirect').magnitude)
 
+    def test_get_distance_vincenty_method(self, stats):
+        assert 59.25 == my_round(stats.distance(method='Vincenty').magnitude)
+
+    def test_get_distance_adaptive_method(self, stats):
+        assert 59.25 == my_round(stats.distance(method='Adaptive').magnitude)
+
     def test_get_bearing(self, stats):
         bearings = stats.bearing()
         assert 27 == len(bearings)
         assert 240.084 == my_round(bearings[0])
         assert 249.443 == my_round(bearings[26])
+
+
+class TestEllipsoidDistances:
+
+    # Flinders Peak to Buninyong, from Vincenty's original paper
+    flinders = np.radians([-(37 + 57 / 60 + 3.72030 / 3600),
+                           144 + 25 / 60 + 29.52440 / 3600])
+    buninyong = np.radians([-(37 + 39 / 60 + 10.15610 / 3600),
+                            143 + 55 / 60 + 35.38390 / 3600])
+
+    def test_vincenty_matches_reference_distance(self):
+        dist = vincenty_distances(self.flinders[0], self.flinders[1],
+                                  self.buninyong[0], self.buninyong[1])
+        assert 54972.271 == my_round(dist)
+
+    def test_vincenty_handles_special_cases(self):
+        lat1 = np.radians([0, 10, 0])
+        lon1 = np.radians([0, 10, 0])
+        lat2 = np.radians([0, 10, 0.5])
+        lon2 = np.radians([90, 10, 179.7])
+
+        dist = vincenty_distances(lat1, lon1, lat2, lon2)
+
+        # Along the equator, coincident, and nearly antipodal points
+        assert 10018754.171 == my_round(dist[0])
+        assert 0 == dist[1]
+        assert 19950000 < dist[2] < 19960000
+
+    def test_local_ellipsoid_close_to_vincenty_for_short_distances(self):
+        lat1, lon1 = np.radians([45, -90])
+        lat2, lon2 = np.radians([45.001, -90.001])
+
+        approx = local_ellipsoid_distances(lat1, lon1, lat2, lon2)
+        exact = vincenty_distances(lat1, lon1, lat2, lon2)
+
+        assert abs(approx - exact) < 0.001
+
+
+def add_in_chunks(accumulator, points, size):
+    for first in range(0, len(points), size):
+        chunk = points[first:first + size]
+        accumulator.add_chunk([x['lat'] for x in chunk],
+                              [x['lon'] for x in chunk],
+                              [x['sog'] for x in chunk],
+                              [x['timepoint'] for x in chunk])
+
+
+class TestMaxSustainedSpeed:
+
+    def test_best_window_is_found(self):
+        seconds = np.arange(8)
+        sogs = [1, 1, 5, 5, 5, 1, 1, 1]
+
+        assert max_sustained_speed(seconds, sogs, window=2) == 5
+        assert max_sustained_speed(seconds, sogs, window=3) == 4
+
+    def test_windows_span_gaps(self):
+        # Sparse points still make a stretch, as long as it spans the window
+        assert max_sustained_speed([0, 10], [2, 4], window=5) == 3
+
+    def test_track_shorter_than_window(self):
+        assert max_sustained_speed([0, 1, 2], [1, 2, 3], window=5) is None
+        assert max_sustained_speed([], [], window=5) is None
+
+
+class TestStatsAccumulator:
+
+    def test_single_pass_matches_stats(self, stats):
+        summary = StatsAccumulator()
+        for x in trackpoints:
+            summary.add(x['lat'], x['lon'], x['sog'], x['timepoint'])
+
+        assert summary.count == len(trackpoints)
+        assert my_round(summary.distance) == \
+            my_round(stats.distance().to('m').magnitude)
+        assert summary.max_speed == stats.max_speed.magnitude
+        assert summary.start == trackpoints[0]['timepoint']
+        assert summary.end == trackpoints[-1]['timepoint']
+
+    def test_chunked_matches_single_pass(self):
+        single = StatsAccumulator()
+        add_in_chunks(single, trackpoints, len(trackpoints))
+        chunked = StatsAccumulator()
+        add_in_chunks(chunked, trackpoints, 4)
+
+        assert chunked.count == single.count
+        assert my_round(chunked.distance) == my_round(single.distance)
+        assert chunked.bbox == single.bbox
+        assert chunked.speed_histogram.tolist() == \
+            single.speed_histogram.tolist()
+        assert chunked.points == single.points
+        assert chunked.sustained_speed == single.sustained_speed
+
+    def test_sustained_speed_matches_stats(self, stats):
+        summary = StatsAccumulator()
+        add_in_chunks(summary, trackpoints, 3)
+
+        assert summary.sustained_speed == \
+            pytest.approx(stats.sustained_speed().magnitude)
+
+    def test_sustained_speed_spans_chunks(self):
+        summary = StatsAccumulator(sustained_window=3)
+
+        summary.add_chunk([0] * 3, [0] * 3, [1, 1, 6], range(3))
+        assert summary.sustained_speed is None
+        summary.add_chunk([0] * 3, [0] * 3, [6, 6, 1], range(3, 6))
+
+        assert summary.sustained_speed == pytest.approx(19 / 4)
+
+    def test_flagged_points_only_count_towards_times(self):
+        summary = StatsAccumulator()
+
+        summary.add_chunk([0, 0, 0], [0, 10, 0.001], [1, 50, 2],
+                          [1, 2, 3], flagged=[False, True, False])
+
+        assert summary.count == 2
+        assert summary.max_speed == 2
+        assert summary.bbox == [0, 0.001, 0, 0]
+        assert 111 < summary.distance < 112
+        assert (summary.start, summary.end) == (1, 3)
+
+    def test_flagged_chunk_carries_distance_to_next_chunk(self):
+        summary = StatsAccumulator()
+
+        summary.add_chunk([0], [0], [1], [1])
+        summary.add_chunk([0], [10], [1], [2], flagged=[True])
+        summary.add_chunk([0], [0.001], [1], [3])
+
+        assert 111 < summary.distance < 112
+        assert summary.end == 3
+
+    def test_speed_histogram(self):
+        summary = StatsAccumulator(speed_bins=[0, 1, 2])
+
+        summary.add_chunk([0] * 4, [0] * 4, [0.5, 1.5, 1.7, 9], range(4))
+
+        assert summary.speed_histogram.tolist() == [1, 3]
+
+    def test_points_are_decimated(self):
+        summary = StatsAccumulator(max_points=10)
+
+        summary.add_chunk([0] * 25, np.arange(25), [0] * 25, range(25))
+
+        assert len(summary.points) <= 10
+        assert [x['lon'] for x in summary.points] == list(range(0, 25, 4))
+
+    @pytest.mark.parametrize('size', [1, 7, 100])
+    def test_points_match_decimate(self, size):
+        summary = StatsAccumulator(max_points=100)
+
+        add_in_chunks(summary, trackpoints, size)
+
+        assert summary.points == decimate(trackpoints, max_points=100)
+
+
+class TestDecimate:
+
+    def test_short_tracks_are_kept(self):
+        assert decimate([1, 2, 3], max_points=3) == [1, 2, 3]
+
+    def test_stride_doubles_until_points_fit(self):
+        assert decimate(list(range(25)), max_points=10) == \
+            list(range(0, 25, 4))
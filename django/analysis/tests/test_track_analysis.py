@@ -1,51 +1,58 @@
 import datetime as dt
-from unittest.mock import patch, MagicMock, sentinel
 
-import numpy as np
+import pytz
 
-from analysis.track_analysis import make_json_from_trackpoints
+from analysis.track_analysis import (make_json_from_trackpoints,
+                                     format_timepoints)
+from core import DATETIME_FORMAT_STR
 
 
 class TestMakeJson:
 
-    @patch('analysis.track_analysis.Stats')
-    @patch('analysis.track_analysis.np')
-    def test_make_json_returns_expected_trackpoint_data(self,
-                                                        np_mock: MagicMock,
-                                                        stat_mock: MagicMock):
+    def test_make_json_returns_expected_trackpoint_data(self):
         # Given some fake position data
         pos = [{'lat': 1, 'lon': 11, 'sog': 111,
                 'timepoint': dt.datetime(2016, 1, 14, 8, 11, 0)},
-               {'lat': 2, 'lon': 22, 'sog': 222,
+               {'lat': 2, 'lon': 11, 'sog': 222,
                 'timepoint': dt.datetime(2016, 1, 14, 8, 11, 1)},
-               {'lat': 3, 'lon': 33, 'sog': 333,
+               {'lat': 2, 'lon': 12, 'sog': 333,
                 'timepoint': dt.datetime(2016, 1, 14, 8, 11, 2)},
                ]
 
-        # and come mocks setup to return meaningful values
-        stat_mock.return_value.bearing.return_value = [1, 2]
-        np_mock.append.return_value = sentinel.round_me
-        np_mock.round.return_value = np.asarray([1111, 2222, 3333])
-
         # When making json from trackpoints
         json = make_json_from_trackpoints(pos)
 
         # Then the resulting dict has the expected shape
-        assert 'lat' in json
-        assert json['lat'] == [1, 2, 3]
-        assert 'lon' in json
-        assert json['lon'] == [11, 22, 33]
-        assert 'speed' in json
+        assert json['lat'] == [1, 2, 2]
+        assert json['lon'] == [11, 11, 12]
         assert json['speed'] == [215.77, 431.53, 647.3]
-        assert 'bearing' in json
-        assert json['bearing'] == [1111, 2222, 3333]
-        assert 'time' in json
+        # North, then (nearly) east, with the final bearing repeated
+        assert json['bearing'] == [0, 90, 90]
         assert json['time'] == ['2016-01-14T08:11:00',
                                 '2016-01-14T08:11:01',
                                 '2016-01-14T08:11:02']
 
-        # and mocks were called correctly
-        stat_mock.assert_called_once_with(pos)
-        stat_mock.return_value.bearing.assert_called_once_with()
-        np_mock.round.assert_called_once_with(sentinel.round_me)
-        np_mock.append.assert_called_once_with([1, 2], 2)
+    def test_make_json_with_single_trackpoint(self):
+        pos = [{'lat': 1, 'lon': 11, 'sog': 0,
+                'timepoint': dt.datetime(2016, 1, 14, 8, 11, 0)}]
+
+        json = make_json_from_trackpoints(pos)
+
+        assert json['bearing'] == [0]
+        assert json['speed'] == [0]
+
+    def test_make_json_with_no_trackpoints(self):
+        json = make_json_from_trackpoints([])
+
+        assert json == dict(bearing=[], time=[], speed=[], lat=[], lon=[])
+
+    def test_format_timepoints_matches_strftime(self):
+        start = dt.datetime(2016, 1, 14, 23, 59, 58, 600000, tzinfo=pytz.UTC)
+        timepoints = [start + dt.timedelta(seconds=x * 0.7)
+                      for x in range(5)]
+
+        times = format_timepoints(timepoints)
+
+        assert times == [x.strftime(DATETIME_FORMAT_STR)
+                         for x in timepoints]
+        assert times[-1] == '2016-01-15T00:00:01+0000'
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from analysis.track_encoding import (encode_track, decode_track,
+                                     encode_varints, decode_varints)
+
+
+def make_data():
+    return dict(
+        lat=[43.0875531, 43.0875522, 43.0875506],
+        lon=[-89.3895205, -89.3895605, -89.3896015],
+        speed=[6.05, 6.36, 6.53],
+        bearing=[10.0, 359.0, 0.0],
+        time=['2014-07-15T22:37:54+0000', '2014-07-15T22:37:55+0000',
+              '2014-07-15T22:37:57+0000'],
+    )
+
+
+class TestTrackEncoding:
+
+    def test_round_trips(self):
+        data = make_data()
+
+        assert decode_track(encode_track(data)) == data
+
+    def test_is_compact(self):
+        data = make_data()
+
+        # 12 byte header, 12 bytes per trackpoint for the fixed width
+        # columns, and single byte time deltas after the first
+        assert len(encode_track(data)) == 12 + 3 * 12 + 5 + 2
+
+    def test_round_trips_without_utc_offset(self):
+        data = make_data()
+        data['time'] = [x[:19] for x in data['time']]
+
+        assert decode_track(encode_track(data)) == data
+
+    def test_round_trips_negative_utc_offset(self):
+        data = make_data()
+        data['time'] = [x[:19] + '-0130' for x in data['time']]
+
+        assert decode_track(encode_track(data))['time'] == data['time']
+
+    def test_round_trips_across_antimeridian_and_back_in_time(self):
+        data = make_data()
+        data['lon'] = [179.9999999, -179.9999999, 179.5]
+        data['time'].reverse()
+
+        decoded = decode_track(encode_track(data))
+
+        assert decoded['lon'] == data['lon']
+        assert decoded['time'] == data['time']
+
+    def test_round_trips_empty_track(self):
+        data = dict(lat=[], lon=[], speed=[], bearing=[], time=[])
+
+        assert decode_track(encode_track(data)) == data
+
+    def test_decode_raises_on_other_data(self):
+        with pytest.raises(ValueError):
+            decode_track(bytes(12))
+
+    def test_varints(self):
+        values = np.asarray([0, 1, 127, 128, 300, 2**40, 2**64 - 1],
+                            dtype=np.uint64)
+
+        encoded = encode_varints(values)
+
+        assert encoded[:6] == bytes([0, 1, 127, 0x80, 1, 0xac])
+        assert decode_varints(encoded, len(values)).tolist() == \
+            values.tolist()
+
+    def test_decode_varints_raises_if_truncated(self):
+        with pytest.raises(ValueError):
+            decode_varints(bytes([0x80]), 1)
@@ -1,10 +1,33 @@
 """Track analysis module"""
-from typing import Iterable
+from datetime import datetime
+from typing import Iterable, Sequence
 
 import numpy as np
 
-from analysis.stats import Stats
-from core import UNIT_SETTING, UNITS, DATETIME_FORMAT_STR
+from analysis.stats import bearings
+from core import UNIT_SETTING, UNITS
+
+
+def format_timepoints(timepoints: Sequence[datetime]) -> list:
+    """Format timepoints like DATETIME_FORMAT_STR, in a single numpy pass
+
+    All of the timepoints are assumed to share the UTC offset of the first,
+    as they do when read back from the database."""
+    if not timepoints:
+        return []
+    base = timepoints[0]
+    offsets = np.asarray([(x - base).total_seconds() for x in timepoints])
+    offsets = np.floor(offsets + base.microsecond / 1e6).astype(np.int64)
+
+    wall_clock = np.datetime64(base.replace(tzinfo=None, microsecond=0), 's')
+    times = np.datetime_as_string(wall_clock + offsets.astype('m8[s]'),
+                                  unit='s')
+    return np.char.add(times, base.strftime('%z')).tolist()
+
+
+def speed_factor() -> float:
+    """Factor to convert speeds from m/s to the display units"""
+    return (1 * UNITS.m / UNITS.s).to(UNIT_SETTING['speed']).magnitude
 
 
 def make_json_from_trackpoints(pos: Iterable) -> dict:
@@ -14,28 +37,17 @@ def make_json_from_trackpoints(pos: Iterable) -> dict:
     then returns the results as an object with a list for each field,
     rather than as a list of objects.  This was found to be significantly
     smaller over-the-wire."""
+    columns = [(x['lat'], x['lon'], x['sog'], x['timepoint']) for x in pos]
+    if not columns:
+        return dict(bearing=[], time=[], speed=[], lat=[], lon=[])
+    lat, lon, sog, time = zip(*columns)
 
-    stats = Stats(pos)
-    # distances = stats.distances()
-    # distances = np.round(np.append(distances, distances[-1]), 3)
-
-    bearings = stats.bearing()
+    brn = bearings(np.asarray(lat, dtype=float),
+                   np.asarray(lon, dtype=float))
     # hack to get same size arrays (just repeat final element)
-    bearings = np.round(np.append(bearings, bearings[-1]))
-
-    speed = []
-    time = []
-    lat = []
-    lon = []
-
-    for position in pos:
-        lat.append(position['lat'])
-        lon.append(position['lon'])
-        speed.append(round(
-            (position['sog'] * UNITS.m / UNITS.s).to(
-                UNIT_SETTING['speed']).magnitude,
-            2))
-        time.append(position['timepoint'].strftime(DATETIME_FORMAT_STR))
-
-    return dict(bearing=bearings.tolist(), time=time,
-                speed=speed, lat=lat, lon=lon)
+    brn = np.round(np.append(brn, brn[-1] if len(brn) else 0))
+
+    speed = np.round(np.asarray(sog, dtype=float) * speed_factor(), 2)
+
+    return dict(bearing=brn.tolist(), time=format_timepoints(time),
+                speed=speed.tolist(), lat=list(lat), lon=list(lon))
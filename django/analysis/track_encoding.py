@@ -0,0 +1,160 @@
+"""
+Compact binary encoding of the trackpoint data served to the viewers
+
+Encodes the dict returned by `make_json_from_trackpoints`, losslessly apart
+from rounding positions to 1e-7 degrees (~1cm), in roughly a fifth of the
+size of the JSON.  All values are little-endian.
+
+Header (12 bytes)::
+
+    magic       4 bytes   b'STRK'
+    version     uint8     1
+    flags       uint8     bit 0 set if the times have a UTC offset
+    utc_offset  int16     minutes east of UTC, for every time
+    count       uint32    number of trackpoints
+
+Followed by one column per field, each `count` entries long::
+
+    lat         int32     deltas of degrees * 1e7, first from 0, wrapping
+    lon         int32     as lat
+    speed       uint16    speed * 100, in the speed units of the JSON
+    bearing     uint16    whole degrees
+    time        varint    zigzag encoded deltas of seconds since the epoch
+                          in local time, first from 0
+
+The varints are LEB128, seven bits per byte, least significant group
+first, with the high bit set on every byte but the last.
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b'STRK'
+VERSION = 1
+HAS_UTC_OFFSET = 0x01
+HEADER = struct.Struct('<4sBBhI')
+POSITION_SCALE = 1e7  # units per degree
+SPEED_SCALE = 100  # units per speed unit
+CONTENT_TYPE = 'application/vnd.sailtrail.track'
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """Encode unsigned integers as LEB128 varints"""
+    values = np.asarray(values, dtype=np.uint64)
+    # Up to 10 groups of 7 bits are needed for 64 bit values
+    groups = (values[:, np.newaxis] >>
+              (np.arange(10, dtype=np.uint64) * np.uint64(7)))
+    needed = groups != 0
+    needed[:, 0] = True
+    out = (groups & np.uint64(0x7f)).astype(np.uint8)
+    # Set the continuation bit on all but the final byte of each value
+    out[:, :-1] |= (needed[:, 1:] * 0x80).astype(np.uint8)
+    return out[needed].tobytes()
+
+
+def decode_varints(data: bytes, count: int) -> np.ndarray:
+    """Decode `count` unsigned LEB128 varints from the start of data"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError('Truncated varints')
+    if not count:
+        return np.zeros(0, dtype=np.uint64)
+    raw = raw[:ends[-1] + 1]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    which = np.repeat(np.arange(count), ends - starts + 1)
+    shift = (np.arange(len(raw)) - starts[which]) * 7
+    groups = ((raw & 0x7f).astype(np.uint64) <<
+              shift.astype(np.uint64))
+    return np.add.reduceat(groups, starts)
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    """Map signed to unsigned integers, keeping small magnitudes small"""
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    """Reverse `_zigzag`"""
+    values = np.asarray(values, dtype=np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64) ^
+            -(values & np.uint64(1)).astype(np.int64))
+
+
+def _parse_utc_offset(time: str):
+    """Get the UTC offset (minutes) from the end of a formatted time"""
+    if len(time) > 19 and time[19] in '+-':
+        sign = -1 if time[19] == '-' else 1
+        return sign * (int(time[20:22]) * 60 + int(time[22:24]))
+    return None
+
+
+def encode_track(data: dict) -> bytes:
+    """Encode the trackpoint data from `make_json_from_trackpoints`
+
+    Parameters
+    ----------
+    data : dict
+        Lists of bearing, time, speed, lat and lon for each trackpoint, as
+        returned by `make_json_from_trackpoints`
+    """
+    count = len(data['time'])
+    offset = _parse_utc_offset(data['time'][0]) if count else None
+    flags = HAS_UTC_OFFSET if offset is not None else 0
+    header = HEADER.pack(MAGIC, VERSION, flags, offset or 0, count)
+
+    columns = []
+    for field in ('lat', 'lon'):
+        scaled = np.round(np.asarray(data[field], dtype=float) *
+                          POSITION_SCALE).astype(np.int64)
+        # Wrap around deltas too big for an int32, the running sum wraps
+        # around the same way when decoding
+        columns.append(np.diff(np.concatenate(([0], scaled))).astype(
+            np.int32))
+    columns.append(np.round(np.asarray(data['speed'], dtype=float) *
+                            SPEED_SCALE).clip(0, 0xffff).astype(np.uint16))
+    columns.append(np.mod(np.asarray(data['bearing'], dtype=float),
+                          360).astype(np.uint16))
+
+    times = np.asarray([x[:19] for x in data['time']],
+                       dtype='datetime64[s]').astype(np.int64)
+    time_deltas = np.diff(np.concatenate(([0], times)))
+
+    return b''.join([header] +
+                    [x.astype(x.dtype.newbyteorder('<')).tobytes()
+                     for x in columns] +
+                    [encode_varints(_zigzag(time_deltas))])
+
+
+def decode_track(encoded: bytes) -> dict:
+    """Decode data from `encode_track`, back to the same lists"""
+    magic, version, flags, offset, count = HEADER.unpack_from(encoded)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not an encoded track')
+
+    position = HEADER.size
+    columns = {}
+    for field, dtype in (('lat', '<i4'), ('lon', '<i4'),
+                         ('speed', '<u2'), ('bearing', '<u2')):
+        column = np.frombuffer(encoded, dtype=dtype, count=count,
+                               offset=position)
+        position += column.nbytes
+        columns[field] = column
+
+    lat = np.cumsum(columns['lat'], dtype=np.int32) / POSITION_SCALE
+    lon = np.cumsum(columns['lon'], dtype=np.int32) / POSITION_SCALE
+
+    deltas = _unzigzag(decode_varints(encoded[position:], count))
+    times = np.datetime_as_string(
+        np.cumsum(deltas).astype('datetime64[s]'), unit='s')
+    if flags & HAS_UTC_OFFSET:
+        suffix = '{}{:02d}{:02d}'.format('-' if offset < 0 else '+',
+                                         abs(offset) // 60, abs(offset) % 60)
+        times = np.char.add(times, suffix)
+
+    return dict(bearing=columns['bearing'].astype(float).tolist(),
+                time=times.tolist(),
+                speed=(columns['speed'] / SPEED_SCALE).tolist(),
+                lat=lat.tolist(),
+                lon=lon.tolist())
@@ -0,0 +1,10 @@
+"""App config for the api app"""
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    """Connects the signal handlers once the models are loaded"""
+    name = 'api'
+
+    def ready(self):
+        import api.signals  # noqa: F401 pylint: disable=unused-import
@@ -3,14 +3,122 @@
 Should this site ever be split into separate website and
 API layers, this helper can be replaced with services calls
 rather than direct model access"""
-from typing import Dict, List
+import time
+from typing import Any, Callable, Dict, List
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.core.exceptions import PermissionDenied
-from django.db.models import QuerySet, Max, Q, Count, Sum
+from django.db.models import Q, QuerySet
 from django.http import HttpRequest
 
-from api.models import Activity, ActivityTrack, ACTIVITY_CHOICES
+from api.models import Activity, ActivityTrack, ACTIVITY_CHOICES, \
+    FeedEntry, LeaderboardEntry, MAX_SPEED, UserCategorySummary
+from api.periods import ALL_TIME
+
+LEADERBOARD_SIZE = 10  # leaders shown in each category of a leaderboard
+# Fields of the activities from get_activities_for_user to page on
+FEED_KEYSET = ('feed_entry__start', 'feed_entry__pk')
+
+# Namespaces of the versioned cache
+LEADERS = 'leaders'
+ACTIVITY_LIST = 'activity-list'
+
+
+def activity_page_namespace(activity_id: int) -> str:
+    """Get the namespace of the cached pages of an activity"""
+    return 'activity-page:{}'.format(activity_id)
+
+
+class VersionedCache:
+    """Cache of values that go stale together, in versioned namespaces
+
+    Every key of a namespace is stored under the namespace's current
+    version, so bumping the version (when the data behind the values
+    changes) makes all of the old values unreachable at once, without
+    guessing timeouts.  The old values are left for the backend to evict.
+
+    Uses the Django cache with the alias in the VERSIONED_CACHE setting
+    ('default' if unset), so the backend is chosen in CACHES, local memory
+    for development and shared (memcached) in production.  Hits and misses
+    are counted for each namespace, in this process.
+    """
+
+    def __init__(self, alias: str = None, timeout: int = None):
+        self.alias = alias
+        self.timeout = timeout  # s, None to keep until evicted
+        self.hits = {}
+        self.misses = {}
+
+    @property
+    def backend(self):
+        """Get the Django cache holding the values"""
+        return caches[self.alias or
+                      getattr(settings, 'VERSIONED_CACHE', 'default')]
+
+    @staticmethod
+    def _version_key(namespace: str) -> str:
+        return 'cache-version:{}'.format(namespace)
+
+    def version(self, namespace: str) -> int:
+        """Get the current version of the namespace"""
+        key = self._version_key(namespace)
+        version = self.backend.get(key)
+        if version is None:
+            # Start from the time, so a lost version can't bring back
+            # values stored under an earlier one
+            self.backend.add(key, int(time.time() * 1000), None)
+            version = self.backend.get(key)
+        return version
+
+    def bump(self, namespace: str) -> None:
+        """Make every value stored in the namespace stale"""
+        try:
+            self.backend.incr(self._version_key(namespace))
+        except ValueError:
+            # No version yet, so nothing can be stale
+            self.version(namespace)
+
+    def get_or_set(self, namespace: str, key: str, compute: Callable[[], Any],
+                   timeout: float = None) -> Any:
+        """Get the value of key in the namespace, computing it if needed
+
+        The value is kept for timeout s, if shorter than the cache's.
+        Computed values of None aren't kept, so are computed every time."""
+        version = self.version(namespace)
+        key = '{}:{}'.format(namespace, key)
+        value = self.backend.get(key, version=version)
+        if value is not None:
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+            return value
+
+        self.misses[namespace] = self.misses.get(namespace, 0) + 1
+        value = compute()
+        if timeout is None or (self.timeout is not None and
+                               self.timeout < timeout):
+            timeout = self.timeout
+        if value is not None:
+            self.backend.set(key, value, timeout, version=version)
+        return value
+
+    def snapshot(self) -> dict:
+        """Get the hit and miss counts, and hit rate, of each namespace"""
+        counts = {}
+        for namespace in set(self.hits) | set(self.misses):
+            hits = self.hits.get(namespace, 0)
+            misses = self.misses.get(namespace, 0)
+            counts[namespace] = dict(hits=hits, misses=misses,
+                                     hit_rate=hits / (hits + misses))
+        return counts
+
+    def reset(self) -> None:
+        """Zero the hit and miss counts"""
+        self.hits.clear()
+        self.misses.clear()
+
+
+versioned_cache = VersionedCache()
 
 
 def create_new_activity_for_user(user: User) -> Activity:
@@ -24,12 +132,18 @@ def get_activity_by_id(activity_id: int) -> Activity:
 
 
 def get_activities_for_user(cur_user: User) -> QuerySet:
-    """Get activities, include current users private activities"""
-    activities = Activity.objects.exclude(name__isnull=True)
+    """Get activities, include current users private activities
 
-    # Remove private activities for all but the current user
-    return activities.exclude(
-        ~Q(user__username=cur_user.username), private=True)
+    Reads the home feed entries, see FeedEntry, so only finalized
+    activities are included.  Page on FEED_KEYSET and the ranges from
+    get_feed_ranges, to use their index."""
+    return Activity.objects.filter(
+        FeedEntry.visible_to(cur_user)).select_related('user')
+
+
+def get_feed_ranges(cur_user: User) -> List[Q]:
+    """Get the index ranges of get_activities_for_user, to page each on"""
+    return FeedEntry.visible_ranges(cur_user)
 
 
 def get_users_activities(user: User, cur_user: User) -> QuerySet:
@@ -65,30 +179,60 @@ def get_active_users() -> QuerySet:
     return User.objects.filter(is_active=True, is_superuser=False)
 
 
-def get_leaders() -> List[Dict[str, str]]:
-    """Build list of leaders for the leaderboard"""
-    leader_list = _get_activity_leaders()
-
+def get_leaders(period: str = ALL_TIME, key: str = ALL_TIME,
+                metric: str = MAX_SPEED,
+                size: int = None) -> List[Dict[str, str]]:
+    """Build list of leaders for a leaderboard
+
+    Parameters
+    ----------
+    period, key : str
+        The period of the board, see api.periods
+    metric : str
+        The activity field the leaders are ranked by
+    size : int
+        Most leaders to include in each category, all if not given
+    """
+    return versioned_cache.get_or_set(
+        LEADERS, 'leaders:{}:{}:{}:{}'.format(period, key, metric, size),
+        lambda: _build_leaders(period, key, metric, size))
+
+
+def _build_leaders(period: str, key: str, metric: str,
+                   size: int) -> List[Dict[str, str]]:
+    """Build list of leaders for a leaderboard, from the entries"""
     leaders = []
 
-    for key, category in ACTIVITY_CHOICES:
-        values = [x for x in leader_list if x['category'] == key]
+    for code, category in ACTIVITY_CHOICES:
+        values = list(_get_activity_leaders(period, key, metric, code, size))
         if values:
             leaders.append({'category': category, 'leaders': values})
 
     return leaders
 
 
-def _get_activity_leaders() -> QuerySet:
-    """Get the leaders for activities"""
-    return Activity.objects.filter(private=False).values(
-        'user__username', 'category').annotate(
-            max_speed=Max('max_speed')).order_by('-max_speed')
+def _get_activity_leaders(period: str = ALL_TIME, key: str = ALL_TIME,
+                          metric: str = MAX_SPEED, category: str = None,
+                          size: int = None) -> QuerySet:
+    """Get the leaders of a category, from the leaderboard entries
+
+    If limited to a size, only the top of the category is read from the
+    board's index."""
+    leaders = LeaderboardEntry.board(period, key, metric).filter(
+        category=category).values('user__username', 'category', 'value')
+    return leaders if size is None else leaders[:size]
+
 
+def get_category_summaries(user: User, cur_user: User) -> List[dict]:
+    """Get the per category summaries of the user's activities
 
-def summarize_by_category(activities: QuerySet) -> QuerySet:
-    """Summarize activities by category"""
-    return activities.values('category').annotate(
-        count=Count('category'),
-        max_speed=Max('max_speed'),
-        total_dist=Sum('distance')).order_by('-max_speed')
+    Includes private activities if the current user is the user.  Each
+    summary has the category, count, max_speed and total_dist, ordered by
+    max speed."""
+    include_private = cur_user.username == user.username
+    summaries = [x.totals(include_private) for x in
+                 UserCategorySummary.objects.filter(user=user)]
+    summaries = [x for x in summaries if x['count']]
+    summaries.sort(key=lambda x: (x['max_speed'] is None,
+                                  -(x['max_speed'] or 0)))
+    return summaries
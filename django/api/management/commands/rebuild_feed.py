@@ -0,0 +1,17 @@
+"""Rebuild the home feed from the activities"""
+from django.core.management.base import BaseCommand
+
+from api.models import FeedEntry
+
+
+class Command(BaseCommand):
+    """Rebuild every home feed entry
+
+    The entries are kept up to date as activities change, so this is only
+    needed if they get out of step, for example after bulk changes that
+    skip the model signals."""
+    help = 'Rebuild the home feed from the activities'
+
+    def handle(self, *args, **options):
+        count = FeedEntry.rebuild()
+        self.stdout.write('Rebuilt {} feed entries'.format(count))
@@ -0,0 +1,19 @@
+"""Rebuild the leaderboards from the activities"""
+from django.core.management.base import BaseCommand
+
+from api.helper import LEADERS, versioned_cache
+from api.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    """Rebuild every leaderboard entry
+
+    The entries are kept up to date as activities change, so this is only
+    needed if they get out of step, for example after bulk changes that
+    skip the model signals."""
+    help = 'Rebuild the leaderboards from the activities'
+
+    def handle(self, *args, **options):
+        count = LeaderboardEntry.rebuild()
+        versioned_cache.bump(LEADERS)
+        self.stdout.write('Rebuilt {} leaderboard entries'.format(count))
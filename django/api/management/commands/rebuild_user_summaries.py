@@ -0,0 +1,17 @@
+"""Rebuild the user category summaries from the activities"""
+from django.core.management.base import BaseCommand
+
+from api.models import UserCategorySummary
+
+
+class Command(BaseCommand):
+    """Rebuild every user category summary
+
+    The summaries are kept up to date as activities change, so this is only
+    needed if they get out of step, for example after bulk changes that
+    skip the model signals."""
+    help = 'Rebuild the user category summaries from the activities'
+
+    def handle(self, *args, **options):
+        count = UserCategorySummary.rebuild()
+        self.stdout.write('Rebuilt {} user category summaries'.format(count))
@@ -0,0 +1,54 @@
+"""Make summary images for activities left without one"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.models import Activity
+from images.variants import save_variants, variant_names
+
+
+class Command(BaseCommand):
+    """Retry the summary images that couldn't be made
+
+    Activities are left without a summary image when the map provider is
+    unavailable, so run this periodically to fill them in.  With
+    --variants, the variants missing from existing images are made too."""
+    help = 'Make summary images for activities left without one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', action='store_true',
+                            help='Also make missing variants of images')
+
+    def handle(self, *args, **options):
+        missing = Activity.objects.filter(
+            Q(summary_image='') | Q(summary_image__isnull=True)).exclude(
+                start__isnull=True)
+
+        made = 0
+        for activity in missing:
+            activity.generate_summary_image()
+            if activity.summary_image:
+                made += 1
+
+        self.stdout.write('Made {} of {} missing summary images'.format(
+            made, len(missing)))
+
+        if options['variants']:
+            self.make_variants()
+
+    def make_variants(self):
+        """Make the variants of any images not marked as having them"""
+        storage = Activity._meta.get_field('summary_image').storage
+        made = 0
+        for activity in Activity.objects.filter(
+                summary_variants=False).exclude(
+                    Q(summary_image='') | Q(summary_image__isnull=True)):
+            name = activity.summary_image.name
+            if not all(storage.exists(x) for x in variant_names(name)):
+                with activity.summary_image.open('rb') as image:
+                    save_variants(storage, name, image.read())
+                made += 1
+            # Update, so the activity's other signals aren't run again
+            Activity.objects.filter(pk=activity.pk).update(
+                summary_variants=True)
+
+        self.stdout.write('Made variants of {} summary images'.format(made))
@@ -0,0 +1,47 @@
+"""Remove summary images no longer used by any activity"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Activity
+from images.variants import variant_names
+
+SUMMARY_IMAGE_DIR = 'summary_images'
+
+
+class Command(BaseCommand):
+    """Delete stored summary images (and variants) no activity refers to
+
+    Images just written may not be saved on their activity yet, so only
+    images older than --min-age are removed."""
+    help = 'Remove summary images no longer used by any activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=1.0,
+                            help='Only remove images older than this (hours)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List the images, without removing them')
+
+    def handle(self, *args, **options):
+        storage = Activity._meta.get_field('summary_image').storage
+        cutoff = timezone.now() - timedelta(hours=options['min_age'])
+        used = set()
+        for name in Activity.objects.exclude(summary_image='').values_list(
+                'summary_image', flat=True):
+            if name:
+                used.add(name)
+                used.update(variant_names(name))
+
+        removed = 0
+        for filename in storage.listdir(SUMMARY_IMAGE_DIR)[1]:
+            name = '{}/{}'.format(SUMMARY_IMAGE_DIR, filename)
+            if name in used or storage.get_modified_time(name) > cutoff:
+                continue
+            if not options['dry_run']:
+                storage.delete(name)
+            self.stdout.write(name)
+            removed += 1
+
+        self.stdout.write('{} {} summary images'.format(
+            'Found' if options['dry_run'] else 'Removed', removed))
@@ -0,0 +1,21 @@
+"""Rewrite the static sitemap files that are out of date"""
+from django.core.management.base import BaseCommand
+
+from core.sitemap_files import update_sitemaps
+
+
+class Command(BaseCommand):
+    """Rewrite the sitemap files marked stale
+
+    Activities and users mark their sitemap pages stale as they change, so
+    run this periodically (every few minutes) to keep the files current.
+    With --rebuild, every page is rewritten."""
+    help = 'Rewrite the static sitemap files that are out of date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Rewrite every page, not just stale ones')
+
+    def handle(self, *args, **options):
+        count = update_sitemaps(rebuild=options['rebuild'])
+        self.stdout.write('Wrote {} sitemap pages'.format(count))
@@ -0,0 +1,18 @@
+# Generated by Django 2.0.1 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_alter_summary_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitytrack',
+            name='outlier_mask',
+            field=models.BinaryField(default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_activitytrack_outlier_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitytrack',
+            name='suggested_trim_end',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='activitytrack',
+            name='suggested_trim_start',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+    ]
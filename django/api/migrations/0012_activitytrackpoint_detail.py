@@ -0,0 +1,119 @@
+# Generated by Django 2.0.1 on 2026-10-19 13:20
+
+import numpy as np
+from django.db import migrations, models
+
+# The levels as of this migration, copied from analysis.pyramid so later
+# changes to it don't change (or break) the backfill
+DETAIL_TOLERANCES = (10.0, 50.0, 250.0)  # m
+EARTHS_RADIUS = 6371000.0  # m
+
+
+def unpack_mask(packed, count):
+    """Unpack an outlier mask, stored as bits"""
+    bits = np.unpackbits(np.frombuffer(bytes(packed), dtype=np.uint8))
+    return bits[:count].astype(bool)
+
+
+def simplify_indices(x, y, tolerance):
+    """Indices of the points kept by Douglas Peucker, on a plane (m)"""
+    length = len(x)
+    if length < 3:
+        return np.arange(length)
+
+    squared_tolerance = tolerance * tolerance
+    markers = np.zeros(length, dtype=bool)
+    markers[[0, -1]] = True
+
+    stack = [(0, length - 1)]
+    while stack:
+        first, last = stack.pop()
+        dx = x[last] - x[first]
+        dy = y[last] - y[first]
+        px = x[first + 1:last] - x[first]
+        py = y[first + 1:last] - y[first]
+        if dx != 0 or dy != 0:
+            t = np.clip((px * dx + py * dy) / (dx * dx + dy * dy), 0, 1)
+            px = px - dx * t
+            py = py - dy * t
+        sqdists = px * px + py * py
+        index = int(np.argmax(sqdists))
+
+        if sqdists[index] > squared_tolerance:
+            index += first + 1
+            markers[index] = True
+            if index - first > 1:
+                stack.append((first, index))
+            if last - index > 1:
+                stack.append((index, last))
+
+    return np.flatnonzero(markers)
+
+
+def detail_levels(lats, lons, mask=None):
+    """The number of the tolerances that keep each trackpoint
+
+    Flagged trackpoints are only kept at full resolution (level 0)."""
+    levels = np.zeros(len(lats), dtype=int)
+    valid = np.arange(len(lats))
+    if mask is not None:
+        valid = valid[~np.asarray(mask, dtype=bool)]
+    if not len(valid):
+        return levels
+
+    # Project to a local plane, so the tolerances are in meters
+    lats = np.radians(np.asarray(lats, dtype=float)[valid])
+    lons = np.radians(np.asarray(lons, dtype=float)[valid])
+    x = (lons - lons[0]) * np.cos(np.mean(lats)) * EARTHS_RADIUS
+    y = (lats - lats[0]) * EARTHS_RADIUS
+
+    kept = np.zeros(len(levels), dtype=bool)
+    for tolerance in reversed(DETAIL_TOLERANCES):
+        kept[valid[simplify_indices(x, y, tolerance)]] = True
+        levels[kept] += 1
+    return levels
+
+
+def compute_detail_levels(apps, schema_editor):
+    """Compute the detail levels of the trackpoints of existing tracks"""
+    ActivityTrack = apps.get_model('api', 'ActivityTrack')
+    ActivityTrackpoint = apps.get_model('api', 'ActivityTrackpoint')
+
+    for track in ActivityTrack.objects.all():
+        trackpoints = ActivityTrackpoint.objects.filter(track=track)
+        rows = list(trackpoints.order_by('timepoint', 'id').values_list(
+            'id', 'lat', 'lon'))
+        if not rows:
+            continue
+        ids, lats, lons = zip(*rows)
+
+        mask = None
+        if track.outlier_mask is not None:
+            mask = unpack_mask(track.outlier_mask, len(ids))
+
+        levels = detail_levels(lats, lons, mask)
+        for level in set(levels.tolist()) - {0}:
+            trackpoints.filter(
+                id__in=[x for x, y in zip(ids, levels) if y == level]
+            ).update(detail=level)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_activitytrack_suggested_trim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitytrackpoint',
+            name='detail',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='activitytrackpoint',
+            index=models.Index(fields=['track', 'detail', 'timepoint'], name='api_activit_track_i_911099_idx'),
+        ),
+        migrations.RunPython(compute_detail_levels,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.0.1 on 2026-10-19 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_leaderboard(apps, schema_editor):
+    """Create the entries for the existing activities"""
+    Activity = apps.get_model('api', 'Activity')
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+
+    entries = {}
+    for activity in Activity.objects.filter(
+            private=False, max_speed__isnull=False).order_by(
+                'user_id', 'category', '-max_speed'):
+        key = (activity.user_id, activity.category)
+        if key not in entries:
+            entries[key] = LeaderboardEntry(user_id=activity.user_id,
+                                            category=activity.category,
+                                            activity=activity,
+                                            max_speed=activity.max_speed)
+    LeaderboardEntry.objects.bulk_create(entries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0012_activitytrackpoint_detail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('SL', 'Sailing'), ('WS', 'Windsurfing'), ('KB', 'Kite Boarding'), ('SK', 'Snow Kiting'), ('IB', 'Ice Boating')], max_length=2)),
+                ('max_speed', models.FloatField()),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.Activity')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-max_speed'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['category', '-max_speed'], name='api_leaderb_categor_de435f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together={('category', 'user')},
+        ),
+        migrations.RunPython(build_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 2.0.1 on 2026-10-19 15:20
+
+import pytz
+from django.conf import settings
+from django.db import migrations, models
+
+METRICS = ('max_speed', 'sustained_speed', 'distance')
+# The periods as of this migration, copied from api.periods so later
+# changes to it don't change (or break) the backfill
+SEASONS = ('winter', 'spring', 'summer', 'autumn')  # from December
+
+
+def period_keys(start):
+    """Get the key of every period that the start falls in"""
+    if start is None:
+        return {'all': 'all'}
+    start = start.astimezone(pytz.UTC)
+    year, week, _ = start.isocalendar()
+    season_year = start.year + 1 if start.month == 12 else start.year
+    return {'all': 'all',
+            'week': '{}-W{:02d}'.format(year, week),
+            'month': '{}-{:02d}'.format(start.year, start.month),
+            'season': '{}-{}'.format(season_year,
+                                     SEASONS[start.month % 12 // 3])}
+
+
+def build_period_leaderboards(apps, schema_editor):
+    """Create the entries of every board for the existing activities
+
+    Sustained speeds are only set once an activity's stats are computed
+    again, so those boards start empty."""
+    Activity = apps.get_model('api', 'Activity')
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+
+    entries = {}
+    for activity in Activity.objects.filter(private=False):
+        for period, key in period_keys(activity.start).items():
+            for metric in METRICS:
+                value = getattr(activity, metric)
+                board = (period, key, metric, activity.category,
+                         activity.user_id)
+                if value is None or (board in entries and
+                                     entries[board].value >= value):
+                    continue
+                entries[board] = LeaderboardEntry(
+                    period=period, period_key=key, metric=metric,
+                    category=activity.category, user_id=activity.user_id,
+                    activity=activity, value=value)
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardEntry.objects.bulk_create(entries.values())
+
+
+def keep_all_time_max_speeds(apps, schema_editor):
+    """Drop the entries that the old leaderboard can't hold"""
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+    LeaderboardEntry.objects.exclude(period='all', metric='max_speed').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0013_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop,
+                             keep_all_time_max_speeds),
+        migrations.AlterModelOptions(
+            name='leaderboardentry',
+            options={'ordering': ['-value']},
+        ),
+        migrations.RemoveIndex(
+            model_name='leaderboardentry',
+            name='api_leaderb_categor_de435f_idx',
+        ),
+        migrations.RenameField(
+            model_name='leaderboardentry',
+            old_name='max_speed',
+            new_name='value',
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='sustained_speed',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='metric',
+            field=models.CharField(choices=[('max_speed', 'Max Speed'), ('sustained_speed', 'Sustained Speed'), ('distance', 'Distance')], default='max_speed', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='period',
+            field=models.CharField(choices=[('all', 'All Time'), ('week', 'Week'), ('month', 'Month'), ('season', 'Season')], default='all', max_length=6),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='period_key',
+            field=models.CharField(default='all', max_length=16),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardentry',
+            unique_together={('period', 'period_key', 'metric', 'category', 'user')},
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['period', 'period_key', 'metric', 'category', '-value'], name='api_leaderb_period_75bf60_idx'),
+        ),
+        migrations.RunPython(build_period_leaderboards,
+                             migrations.RunPython.noop),
+    ]
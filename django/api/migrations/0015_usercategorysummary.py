@@ -0,0 +1,54 @@
+# Generated by Django 2.0.1 on 2026-10-19 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def build_summaries(apps, schema_editor):
+    """Create the summaries for the existing activities"""
+    Activity = apps.get_model('api', 'Activity')
+    UserCategorySummary = apps.get_model('api', 'UserCategorySummary')
+
+    totals = {}
+    for prefix, private in (('public_', False), ('private_', True)):
+        visible = Q(private=private)
+        totals[prefix + 'count'] = Count('id', filter=visible)
+        totals[prefix + 'max_speed'] = Max('max_speed', filter=visible)
+        totals[prefix + 'distance'] = Coalesce(
+            Sum('distance', filter=visible), 0.0)
+    UserCategorySummary.objects.bulk_create(
+        UserCategorySummary(**x) for x in Activity.objects.values(
+            'user_id', 'category').annotate(**totals).order_by())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0014_leaderboard_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCategorySummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('SL', 'Sailing'), ('WS', 'Windsurfing'), ('KB', 'Kite Boarding'), ('SK', 'Snow Kiting'), ('IB', 'Ice Boating')], max_length=2)),
+                ('public_count', models.PositiveIntegerField(default=0)),
+                ('public_max_speed', models.FloatField(null=True)),
+                ('public_distance', models.FloatField(default=0)),
+                ('private_count', models.PositiveIntegerField(default=0)),
+                ('private_max_speed', models.FloatField(null=True)),
+                ('private_distance', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='usercategorysummary',
+            unique_together={('user', 'category')},
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
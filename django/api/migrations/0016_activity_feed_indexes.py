@@ -0,0 +1,21 @@
+# Generated by Django 2.0.1 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_usercategorysummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['-start', '-id'], name='api_activit_start_1b0bf8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', '-start', '-id'], name='api_activit_user_id_dc84b9_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.0.1 on 2026-10-19 17:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_feed(apps, schema_editor):
+    """Create the entries for the existing finalized activities"""
+    Activity = apps.get_model('api', 'Activity')
+    FeedEntry = apps.get_model('api', 'FeedEntry')
+
+    FeedEntry.objects.bulk_create(
+        FeedEntry(activity_id=pk, start=start,
+                  owner_id=user_id if private else None)
+        for pk, start, user_id, private in Activity.objects.filter(
+            name__isnull=False, start__isnull=False).values_list(
+                'pk', 'start', 'user_id', 'private'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0016_activity_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('activity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='api.Activity')),
+                ('start', models.DateTimeField()),
+                ('owner', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['owner', '-start', '-activity'], name='api_feedent_owner_i_71079f_idx'),
+        ),
+        migrations.RunPython(build_feed, migrations.RunPython.noop),
+    ]
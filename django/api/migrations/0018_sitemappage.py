@@ -0,0 +1,58 @@
+# Generated by Django 2.0.1 on 2026-10-19 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+# As of this migration, copied from core.sitemap so later changes to it
+# don't change (or break) the backfill
+SITEMAP_PAGE_SIZE = 5000  # pks per page
+
+
+def sitemap_page(pk):
+    """Get the page of the sitemap files that lists the object with the pk"""
+    return (pk - 1) // SITEMAP_PAGE_SIZE
+
+
+def mark_sitemap_pages(apps, schema_editor):
+    """Mark a page for every section, for the first update_sitemaps"""
+    Activity = apps.get_model('api', 'Activity')
+    SitemapPage = apps.get_model('api', 'SitemapPage')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    pages = [('leaderboards', 0)]
+    for section, model in (('activities', Activity), ('users', User)):
+        last = model.objects.aggregate(last=Max('pk'))['last']
+        if last is not None:
+            pages += [(section, page)
+                      for page in range(sitemap_page(last) + 1)]
+    SitemapPage.objects.bulk_create(
+        SitemapPage(section=section, page=page) for section, page in pages)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0017_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapPage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=20)),
+                ('page', models.IntegerField()),
+                ('stale', models.BooleanField(default=True)),
+                ('count', models.IntegerField(default=0)),
+                ('lastmod', models.DateTimeField(null=True)),
+                ('written', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='sitemappage',
+            unique_together={('section', 'page')},
+        ),
+        migrations.RunPython(mark_sitemap_pages, migrations.RunPython.noop),
+    ]
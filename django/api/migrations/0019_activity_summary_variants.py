@@ -0,0 +1,18 @@
+# Generated by Django 2.0.1 on 2026-10-20 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_sitemappage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='summary_variants',
+            field=models.BooleanField(default=False),
+        ),
+    ]
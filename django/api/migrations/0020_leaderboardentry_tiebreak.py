@@ -0,0 +1,21 @@
+# Generated by Django 2.0.1 on 2026-10-20 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_activity_summary_variants'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='leaderboardentry',
+            name='api_leaderb_period_75bf60_idx',
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['period', 'period_key', 'metric', 'category', '-value', 'user'], name='api_leaderb_period_659475_idx'),
+        ),
+    ]
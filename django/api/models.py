@@ -2,17 +2,29 @@
 import os.path
 import uuid
 from datetime import datetime as dt, time, date, timedelta
+from functools import reduce
+from operator import attrgetter, or_
+from typing import List
+
+import numpy as np
 
 from django.contrib.auth.models import User
 from django.core.exceptions import SuspiciousOperation
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.db import models
-from django.db.models import QuerySet
+from django.db import models, transaction
+from django.db.models import Count, Max, Q, QuerySet, Sum
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 
-from analysis.stats import Stats
+from analysis.filters import (flag_outliers, pack_mask, unpack_mask,
+                              seconds_since_start)
+from analysis.pyramid import detail_levels
+from analysis.segmentation import find_trim_limits
+from analysis.stats import Stats, StatsAccumulator, decimate
+from api.periods import ALL_TIME, PERIOD_CHOICES, period_keys
 from core import DATETIME_FORMAT_STR
-from images import make_image_for_track
+from images import image_points, make_image_for_track, summary_image_name
+from images.variants import save_variants, variant_names
 from gps import gpx, sirf
 
 SAILING = 'SL'
@@ -28,6 +40,18 @@ ACTIVITY_CHOICES = (
     (ICEBOATING, 'Ice Boating'),
 )
 
+# Activity fields with leaderboards
+MAX_SPEED = 'max_speed'
+SUSTAINED_SPEED = 'sustained_speed'
+DISTANCE = 'distance'
+METRIC_CHOICES = (
+    (MAX_SPEED, 'Max Speed'),
+    (SUSTAINED_SPEED, 'Sustained Speed'),
+    (DISTANCE, 'Distance'),
+)
+
+INGEST_CHUNK_SIZE = 1000  # trackpoints
+
 
 class Activity(models.Model):
     """Activity model"""
@@ -39,8 +63,13 @@ class Activity(models.Model):
                              on_delete=models.CASCADE)
     summary_image = models.ImageField(null=True,
                                       upload_to='summary_images')
+    # Whether the variants of the summary image are stored, see
+    # images.variants, images made before them have none until regenerated
+    summary_variants = models.BooleanField(default=False)
     distance = models.FloatField(null=True)  # m
     max_speed = models.FloatField(null=True)  # m/s
+    # Best mean speed over analysis.stats.SUSTAINED_SPEED_WINDOW
+    sustained_speed = models.FloatField(null=True)  # m/s
     name = models.CharField(max_length=255, null=True)
     description = models.TextField(null=True, blank=True)
     private = models.BooleanField(default=False)
@@ -52,6 +81,9 @@ class Activity(models.Model):
 
     class Meta:
         ordering = ['-start']
+        # For the keyset pagination of the feeds, see core.pagination
+        indexes = [models.Index(fields=['-start', '-id']),
+                   models.Index(fields=['user', '-start', '-id'])]
 
     def get_absolute_url(self) -> str:
         """Get the URL path for this activity"""
@@ -83,26 +115,82 @@ class Activity(models.Model):
         """Get the duration for the activity"""
         return self.end - self.start
 
-    def compute_stats(self) -> None:
-        """Compute the activity stats"""
+    def compute_stats(self, summary: StatsAccumulator = None) -> None:
+        """Compute the activity stats, ignoring any flagged outliers
+
+        Parameters
+        ----------
+        summary : StatsAccumulator
+            Stats accumulated while ingesting the only track of this
+            activity.  If provided, the trackpoints are not read back.
+        """
+        if summary is not None and summary.count:
+            self.generate_summary_image(summary.points, save_model=False)
+            self.distance = summary.distance
+            self.max_speed = summary.max_speed
+            self.sustained_speed = summary.sustained_speed
+            self.start = summary.start
+            self.end = summary.end
+            self.save()
+            return
+
         pos = self.get_trackpoints()
-        stats = Stats(pos)
-        self.generate_summary_image(pos, save_model=False)
+        valid = self.get_valid_trackpoints(pos)
+        stats = Stats(valid)
+        self.generate_summary_image(decimate(valid), save_model=False)
         self.distance = stats.distance().magnitude
         self.max_speed = stats.max_speed.magnitude
+        sustained_speed = stats.sustained_speed()
+        self.sustained_speed = None if sustained_speed is None else \
+            sustained_speed.magnitude
         self.start = pos[0]['timepoint']
         self.end = pos[-1]['timepoint']
         self.save()
 
     def generate_summary_image(self, pos=None, save_model=True):
-        """Call helper to generate summary image for activity"""
-        if self.summary_image is not None:
-            self.summary_image.delete()
+        """Call helper to generate summary image for activity
+
+        Images are stored under the activity id and a hash of what they
+        draw, so generating and storing the image is skipped when it hasn't
+        changed.  The activity id keeps images from being shared, as
+        replaced images are deleted.  Any left behind are removed by the
+        `sweep_summary_images` command.  If the image can't be made, the
+        activity is left without one, for the `regenerate_summary_images`
+        command to retry.  Smaller and WebP variants are stored with the
+        image, and made for reused images missing them.
+
+        Without `pos`, the trackpoints not flagged as outliers are drawn,
+        decimated as while ingesting, so the image matches the one made
+        from the ingest summary."""
         if pos is None:
-            pos = self.get_trackpoints()
-        image = make_image_for_track(pos)
-        if image is not None:
-            self.summary_image.save(image.name, image, save_model)
+            pos = decimate(self.get_valid_trackpoints())
+        points = image_points(pos)
+        name = '{}-{}'.format(self.pk, summary_image_name(points))
+        field = self.summary_image.field
+        path = field.generate_filename(self, name)
+        if self.summary_image.name == path and self.summary_variants:
+            return
+
+        if field.storage.exists(path):
+            self.summary_image.name = path
+            if not all(field.storage.exists(x) for x in variant_names(path)):
+                with field.storage.open(path) as image:
+                    save_variants(field.storage, path, image.read())
+            self.summary_variants = True
+        else:
+            image = make_image_for_track(pos, name=name, points=points)
+            if image is None:
+                # Leave it for regenerate_summary_images to retry
+                self.summary_image = None
+                self.summary_variants = False
+            else:
+                data = image.read()
+                self.summary_image.save(name, image, save=False)
+                save_variants(field.storage, self.summary_image.name, data)
+                self.summary_variants = True
+
+        if save_model:
+            self.save()
 
     def add_track(self, uploaded_file: InMemoryUploadedFile) -> None:
         """Add a new track to the activity"""
@@ -117,15 +205,48 @@ class Activity(models.Model):
         if do_save:
             self.save()
 
-    def get_trackpoints(self) -> list:
-        """Helper to return the trackpoints"""
+    def get_trackpoints(self, **filters) -> list:
+        """Helper to return the trackpoints
+
+        Parameters
+        ----------
+        filters
+            Optional lookups to filter the trackpoints of each track by,
+            e.g. timepoint__gte
+        """
         out = []
         for track in self._get_tracks().all().order_by("trim_start"):
-            out.extend(
-                track.get_trackpoints().values('sog', 'lat',
-                                               'lon', 'timepoint'))
+            trackpoints = track.get_trackpoints()
+            if filters:
+                trackpoints = trackpoints.filter(**filters)
+            out.extend(trackpoints.values('sog', 'lat', 'lon', 'timepoint'))
         return out
 
+    def get_outlier_mask(self) -> np.ndarray:
+        """Helper to return the outlier flags for the trackpoints
+
+        The flags line up with the trackpoints from `get_trackpoints`"""
+        masks = [track.get_outlier_mask()
+                 for track in self._get_tracks().all().order_by("trim_start")]
+        if not masks:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(masks)
+
+    def get_valid_trackpoints(self, trackpoints: list = None) -> list:
+        """Helper to return the trackpoints not flagged as outliers
+
+        All trackpoints are returned if every one of them is flagged.
+
+        Parameters
+        ----------
+        trackpoints : list
+            Trackpoints from `get_trackpoints`, if already read
+        """
+        if trackpoints is None:
+            trackpoints = self.get_trackpoints()
+        return [x for x, flagged in zip(trackpoints, self.get_outlier_mask())
+                if not flagged] or trackpoints
+
 
 class ActivityTrack(models.Model):
     """Activity Track model"""
@@ -134,6 +255,11 @@ class ActivityTrack(models.Model):
     trim_start = models.DateTimeField(null=True, default=None)
     trim_end = models.DateTimeField(null=True, default=None)
     trimmed = models.BooleanField(null=False, default=False)
+    # Trim suggested at upload, from the moving periods of the track
+    suggested_trim_start = models.DateTimeField(null=True, default=None)
+    suggested_trim_end = models.DateTimeField(null=True, default=None)
+    # Bit-packed flags for outlier trackpoints, in timepoint order
+    outlier_mask = models.BinaryField(null=True, default=None)
     activity = models.ForeignKey(Activity, related_name='tracks',
                                  blank=False, null=False,
                                  on_delete=models.CASCADE)
@@ -224,12 +350,27 @@ class ActivityTrack(models.Model):
             self.save()
             self._get_activity().compute_stats()
 
-    def reset_trim(self) -> None:
-        """Reset the track trim"""
-        self.trim_start, self.trim_end = self._get_limits()
+    def reset_trim(self, summary: StatsAccumulator = None) -> None:
+        """Reset the track trim
+
+        Parameters
+        ----------
+        summary : StatsAccumulator
+            Stats accumulated while ingesting this track.  If provided, they
+            are used rather than reading back the trackpoints.
+        """
+        if summary is None:
+            self.trim_start, self.trim_end = self._get_limits()
+        else:
+            self.trim_start, self.trim_end = summary.start, summary.end
         self.trimmed = False
         self.save()
-        self._get_activity().compute_stats()
+
+        activity = self._get_activity()
+        if summary is not None and activity.tracks.count() == 1:
+            activity.compute_stats(summary)
+        else:
+            activity.compute_stats()
 
     def _get_limits(self):
         """Return the start and end timepoints of the original track"""
@@ -242,7 +383,80 @@ class ActivityTrack(models.Model):
         if filtered:
             trackpoints = trackpoints.filter(
                 timepoint__range=(self.trim_start, self.trim_end))
-        return trackpoints.order_by('timepoint')
+        return trackpoints.order_by('timepoint', 'id')
+
+    def filter_outliers(self, columns=None, **thresholds) -> np.ndarray:
+        """Flag implausible trackpoints, storing the flags on the track
+
+        The trackpoints themselves are left untouched, so this can be re-run
+        with different thresholds at any time.  The activity stats are not
+        recomputed, call `compute_stats` on the activity if needed.
+
+        Parameters
+        ----------
+        columns : tuple
+            (lats, lons, sogs, timepoints) of the entire track, in timepoint
+            order.  Fetched from the database if not provided.
+        thresholds
+            Passed through to `analysis.filters.flag_outliers`
+        """
+        if columns is None:
+            trackpoints = self.get_trackpoints(filtered=False)
+            columns = tuple(zip(*trackpoints.values_list('lat', 'lon', 'sog',
+                                                         'timepoint')))
+
+        if columns and len(columns[0]):
+            lats, lons, sogs, timepoints = columns
+            mask = flag_outliers(lats, lons, sogs,
+                                 seconds_since_start(timepoints),
+                                 **thresholds)
+        else:
+            mask = np.zeros(0, dtype=bool)
+
+        self.outlier_mask = pack_mask(mask)
+        self.save()
+        return mask
+
+    def suggest_trim(self, columns: tuple, mask: np.ndarray,
+                     **thresholds) -> None:
+        """Store a suggested trim, covering the moving periods of the track
+
+        Parameters
+        ----------
+        columns : tuple
+            (lats, lons, sogs, timepoints) of the entire track, in timepoint
+            order
+        mask : ndarray
+            Outlier flags for the trackpoints, flagged trackpoints are ignored
+        thresholds
+            Passed through to `analysis.segmentation.find_trim_limits`
+        """
+        valid = [[x for x, flagged in zip(column, mask) if not flagged]
+                 for column in columns]
+        limits = None
+        if valid and valid[0]:
+            lats, lons, sogs, timepoints = valid
+            limits = find_trim_limits(lats, lons, sogs,
+                                      seconds_since_start(timepoints),
+                                      **thresholds)
+
+        if limits is None:
+            self.suggested_trim_start = self.suggested_trim_end = None
+        else:
+            self.suggested_trim_start = timepoints[limits[0]]
+            self.suggested_trim_end = timepoints[limits[1]]
+        self.save()
+
+    def get_outlier_mask(self) -> np.ndarray:
+        """Get the outlier flags for the sorted, trimmed trackpoints"""
+        count = self.get_trackpoints().count()
+        if self.outlier_mask is None:
+            return np.zeros(count, dtype=bool)
+
+        # Stored mask covers the entire track, skip past any trimmed points
+        offset = self._get_trackpoints().filter(
+            timepoint__lt=self.trim_start).count()
+        return unpack_mask(self.outlier_mask, offset + count)[offset:]
 
     @staticmethod
     def create_new(upfile: InMemoryUploadedFile, activity: Activity) -> \
@@ -253,8 +467,8 @@ class ActivityTrack(models.Model):
         ActivityTrackFile.objects.create(track=track,
                                          file=upfile)
         upfile.seek(0)
-        ActivityTrackpoint.create_trackpoints(track, upfile)
-        track.reset_trim()
+        summary = ActivityTrackpoint.create_trackpoints(track, upfile)
+        track.reset_trim(summary)
         return track
 
 
@@ -280,14 +494,21 @@ class ActivityTrackpoint(models.Model):
     lat = models.FloatField()  # degrees
     lon = models.FloatField()  # degrees
     sog = models.FloatField()  # m/s
+    # Number of simplification tolerances that keep this trackpoint, see
+    # analysis.pyramid
+    detail = models.PositiveSmallIntegerField(default=0)
     track = models.ForeignKey(ActivityTrack, related_name='trackpoints',
                               on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [models.Index(fields=['track', 'detail', 'timepoint'])]
+
     @classmethod
     def create_trackpoints(cls,
                            track: ActivityTrack,
-                           uploaded_file: InMemoryUploadedFile):
-        """Create trackpoints from file"""
+                           uploaded_file: InMemoryUploadedFile) -> \
+            StatsAccumulator:
+        """Create trackpoints from file, returning the accumulated stats"""
         file_type = os.path.splitext(uploaded_file.name)[1][1:].upper()
 
         if file_type == 'SBN':
@@ -299,4 +520,316 @@ class ActivityTrackpoint(models.Model):
                 'Unsupported file type ({})'.format(file_type))
 
         trackpoints = create_func(track, uploaded_file, cls)
-        cls.objects.bulk_create(trackpoints)
+
+        # Keep insert order matching timepoint order, so the outlier flags
+        # line up with the stored trackpoints
+        trackpoints.sort(key=attrgetter('timepoint'))
+        columns = tuple(zip(*((x.lat, x.lon, x.sog, x.timepoint)
+                              for x in trackpoints)))
+        mask = track.filter_outliers(columns)
+        track.suggest_trim(columns, mask)
+
+        lats, lons, sogs, timepoints = columns or ((),) * 4
+        levels = detail_levels(lats, lons, mask)
+
+        summary = StatsAccumulator()
+        for first in range(0, len(trackpoints), INGEST_CHUNK_SIZE):
+            chunk = slice(first, first + INGEST_CHUNK_SIZE)
+            batch = trackpoints[chunk]
+            for trackpoint, level in zip(batch, levels[chunk]):
+                trackpoint.detail = int(level)
+            summary.add_chunk(lats[chunk], lons[chunk], sogs[chunk],
+                              timepoints[chunk], mask[chunk])
+            cls.objects.bulk_create(batch)
+        return summary
+
+
+class LeaderboardEntry(models.Model):
+    """Best value of a metric for each user, on each leaderboard
+
+    A leaderboard is the entries of a period, its key, a metric and a
+    category, see api.periods.  Only public activities count.  Each user
+    has a single entry on a board, so updating a board for an activity
+    touches one row, and the top of any board is a single query on the
+    index.  Kept up to date by the signal handlers in api.signals, and
+    rebuilt by the rebuild_leaderboard command."""
+    period = models.CharField(max_length=6, choices=PERIOD_CHOICES,
+                              default=ALL_TIME)
+    period_key = models.CharField(max_length=16, default=ALL_TIME)
+    metric = models.CharField(max_length=16, choices=METRIC_CHOICES,
+                              default=MAX_SPEED)
+    category = models.CharField(max_length=2, choices=ACTIVITY_CHOICES)
+    user = models.ForeignKey(User, related_name='leaderboard_entries',
+                             on_delete=models.CASCADE)
+    activity = models.ForeignKey(Activity, related_name='+',
+                                 on_delete=models.CASCADE)
+    value = models.FloatField()  # m/s or m, for the metric
+
+    class Meta:
+        unique_together = ('period', 'period_key', 'metric', 'category',
+                           'user')
+        indexes = [models.Index(fields=['period', 'period_key', 'metric',
+                                        'category', '-value', 'user'])]
+        ordering = ['-value']
+
+    def __str__(self):
+        return "LeaderboardEntry ({} {}, {}, {}, {}: {})".format(
+            self.period, self.period_key, self.metric, self.category,
+            self.user_id, self.value)
+
+    @staticmethod
+    def _public_activities() -> QuerySet:
+        """Get the values of the activities that can be on the leaderboards"""
+        return Activity.objects.filter(private=False).values_list(
+            'id', 'user_id', 'category', 'start',
+            *(metric for metric, _ in METRIC_CHOICES))
+
+    @classmethod
+    def _best_entries(cls, activities) -> dict:
+        """Get the best entry of each user on each board
+
+        Takes the values from `_public_activities()`, and returns unsaved
+        entries, keyed by (period, period_key, metric, category, user_id).
+        """
+        entries = {}
+        for activity_id, user_id, category, start, *values in activities:
+            for period, key in period_keys(start).items():
+                for (metric, _), value in zip(METRIC_CHOICES, values):
+                    board = (period, key, metric, category, user_id)
+                    if value is None or (board in entries and
+                                         entries[board].value >= value):
+                        continue
+                    entries[board] = cls(
+                        period=period, period_key=key, metric=metric,
+                        category=category, user_id=user_id,
+                        activity_id=activity_id, value=value)
+        return entries
+
+    @classmethod
+    def update_for(cls, user_id: int, category: str) -> None:
+        """Refresh the entries for the user in the category
+
+        Only the entries that changed are written."""
+        best = cls._best_entries(cls._public_activities().filter(
+            user_id=user_id, category=category))
+
+        with transaction.atomic():
+            for entry in cls.objects.filter(user_id=user_id,
+                                            category=category):
+                board = (entry.period, entry.period_key, entry.metric,
+                         entry.category, entry.user_id)
+                new = best.pop(board, None)
+                if new is None:
+                    entry.delete()
+                elif (new.activity_id, new.value) != (entry.activity_id,
+                                                      entry.value):
+                    entry.activity_id, entry.value = new.activity_id, \
+                        new.value
+                    entry.save(update_fields=['activity', 'value'])
+            cls.objects.bulk_create(best.values())
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Rebuild every entry from the activities, returning the count"""
+        entries = cls._best_entries(cls._public_activities())
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(entries.values())
+        return len(entries)
+
+    @classmethod
+    def board(cls, period: str = ALL_TIME, key: str = ALL_TIME,
+              metric: str = MAX_SPEED) -> QuerySet:
+        """Get the entries of a board, for every category, best first
+
+        Ties go to the earliest user, so the top of a board is the same
+        every time it is read."""
+        return cls.objects.filter(period=period, period_key=key,
+                                  metric=metric).order_by('category',
+                                                          '-value', 'user')
+
+    @classmethod
+    def rank(cls, user: User, category: str, period: str = ALL_TIME,
+             key: str = ALL_TIME, metric: str = MAX_SPEED) -> int:
+        """Get the rank (from 1) of the user on a board, or None"""
+        entries = cls.board(period, key, metric).filter(category=category)
+        entry = entries.filter(user=user).first()
+        if entry is None:
+            return None
+        return entries.filter(value__gt=entry.value).count() + 1
+
+
+class UserCategorySummary(models.Model):
+    """Activity count, max speed and distance of a user in a category
+
+    Public and private activities are totalled separately, so both the
+    owner (everything) and visitors (public only) read a single row per
+    category.  Kept up to date by the signal handlers in api.signals."""
+    user = models.ForeignKey(User, related_name='category_summaries',
+                             on_delete=models.CASCADE)
+    category = models.CharField(max_length=2, choices=ACTIVITY_CHOICES)
+    public_count = models.PositiveIntegerField(default=0)
+    public_max_speed = models.FloatField(null=True)  # m/s
+    public_distance = models.FloatField(default=0)  # m
+    private_count = models.PositiveIntegerField(default=0)
+    private_max_speed = models.FloatField(null=True)  # m/s
+    private_distance = models.FloatField(default=0)  # m
+
+    class Meta:
+        unique_together = ('user', 'category')
+
+    def __str__(self):
+        return "UserCategorySummary ({}, {}: {} + {})".format(
+            self.user_id, self.category, self.public_count,
+            self.private_count)
+
+    @staticmethod
+    def _totals(activities: QuerySet) -> QuerySet:
+        """Total the activities, by user and category"""
+        totals = {}
+        for prefix, private in (('public_', False), ('private_', True)):
+            visible = Q(private=private)
+            totals[prefix + 'count'] = Count('id', filter=visible)
+            totals[prefix + 'max_speed'] = Max('max_speed', filter=visible)
+            totals[prefix + 'distance'] = Coalesce(
+                Sum('distance', filter=visible), 0.0)
+        return activities.values('user_id', 'category').annotate(
+            **totals).order_by()
+
+    @classmethod
+    def update_for(cls, user_id: int, category: str) -> None:
+        """Refresh the summary of the user in the category"""
+        with transaction.atomic():
+            # A single group, first() would add the pk to the grouping
+            totals = next(iter(cls._totals(Activity.objects.filter(
+                user_id=user_id, category=category))), None)
+            if totals is None:
+                cls.objects.filter(user_id=user_id,
+                                   category=category).delete()
+            else:
+                cls.objects.update_or_create(
+                    user_id=totals.pop('user_id'),
+                    category=totals.pop('category'), defaults=totals)
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Rebuild every summary from the activities, returning the count"""
+        with transaction.atomic():
+            summaries = [cls(**x) for x in cls._totals(Activity.objects)]
+            cls.objects.all().delete()
+            cls.objects.bulk_create(summaries)
+        return len(summaries)
+
+    def totals(self, include_private: bool) -> dict:
+        """Get the count, max speed and total distance of the activities
+
+        Parameters
+        ----------
+        include_private : bool
+            Whether to include the private activities, for the owner
+        """
+        if not include_private:
+            return dict(category=self.category, count=self.public_count,
+                        max_speed=self.public_max_speed,
+                        total_dist=self.public_distance)
+        speeds = [x for x in (self.public_max_speed, self.private_max_speed)
+                  if x is not None]
+        return dict(category=self.category,
+                    count=self.public_count + self.private_count,
+                    max_speed=max(speeds) if speeds else None,
+                    total_dist=self.public_distance + self.private_distance)
+
+
+class FeedEntry(models.Model):
+    """An activity on the home feed
+
+    Only finalized (named) activities with a start are on the feed.  The
+    owner is only set for private activities, which only their owner sees,
+    so each viewer's feed is a range of the (owner, start, activity) index
+    for the public entries, and one for their own private entries.  Kept
+    up to date by the signal handlers in api.signals."""
+    activity = models.OneToOneField(Activity, primary_key=True,
+                                    related_name='feed_entry',
+                                    on_delete=models.CASCADE)
+    start = models.DateTimeField()
+    owner = models.ForeignKey(User, null=True, related_name='+',
+                              on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [models.Index(fields=['owner', '-start', '-activity'])]
+
+    def __str__(self):
+        return "FeedEntry ({}, {})".format(self.activity_id, self.owner_id)
+
+    @classmethod
+    def update_for(cls, activity: Activity) -> None:
+        """Add, move or remove the entry of the activity"""
+        if activity.name is None or activity.start is None:
+            cls.objects.filter(activity_id=activity.pk).delete()
+        else:
+            cls.objects.update_or_create(
+                activity_id=activity.pk, defaults=dict(
+                    start=activity.start,
+                    owner_id=activity.user_id if activity.private else None))
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Rebuild every entry from the activities, returning the count"""
+        with transaction.atomic():
+            entries = [
+                cls(activity_id=pk, start=start,
+                    owner_id=user_id if private else None)
+                for pk, start, user_id, private in Activity.objects.filter(
+                    name__isnull=False, start__isnull=False).values_list(
+                        'pk', 'start', 'user_id', 'private')]
+            cls.objects.all().delete()
+            cls.objects.bulk_create(entries)
+        return len(entries)
+
+    @staticmethod
+    def visible_ranges(user: User) -> List[Q]:
+        """Get the filters of the ranges of the index on the user's feed
+
+        The public entries, and the user's private ones, are each a range
+        of the (owner, start, activity) index, so are paged separately."""
+        ranges = [Q(feed_entry__owner__isnull=True)]
+        if user.is_authenticated:
+            ranges.append(Q(feed_entry__owner=user))
+        return ranges
+
+    @classmethod
+    def visible_to(cls, user: User) -> Q:
+        """Get the filter of the activities on the feed of the user
+
+        The entry is required explicitly, as the owner test alone would
+        also match activities without one, through the outer join."""
+        return Q(feed_entry__isnull=False) & reduce(
+            or_, cls.visible_ranges(user))
+
+
+class SitemapPage(models.Model):
+    """A static sitemap file, one page of a section of the site's sitemap
+
+    Pages of the paged sections list a pk range of their objects, see
+    core.sitemap.  The signal handlers in api.signals mark the pages stale
+    as their objects change, and the update_sitemaps command rewrites the
+    stale files."""
+    section = models.CharField(max_length=20)
+    page = models.IntegerField()
+    stale = models.BooleanField(default=True)
+    count = models.IntegerField(default=0)  # URLs listed
+    lastmod = models.DateTimeField(null=True)  # of the latest listed object
+    written = models.DateTimeField(null=True)  # when the file last changed
+
+    class Meta:
+        unique_together = ('section', 'page')
+
+    def __str__(self):
+        return "SitemapPage ({}, {})".format(self.section, self.page)
+
+    @classmethod
+    def mark_stale(cls, section: str, page: int = 0) -> None:
+        """Mark the page of the section to be rewritten"""
+        cls.objects.update_or_create(section=section, page=page,
+                                     defaults=dict(stale=True))
@@ -0,0 +1,82 @@
+"""Periods of the leaderboards
+
+Each board covers a period, all time, or an ISO week, calendar month or
+season (meteorological, northern hemisphere), identified by a key such as
+'2017-W03', '2017-01' or '2017-summer'.  December counts towards the
+winter of the following year, so each season is a single key.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+import pytz
+
+ALL_TIME = 'all'
+WEEK = 'week'
+MONTH = 'month'
+SEASON = 'season'
+PERIOD_CHOICES = (
+    (ALL_TIME, 'All Time'),
+    (WEEK, 'Week'),
+    (MONTH, 'Month'),
+    (SEASON, 'Season'),
+)
+SEASONS = ('winter', 'spring', 'summer', 'autumn')  # from December
+
+
+def period_key(period: str, start: datetime) -> str:
+    """Get the key of the period that the start (aware) falls in"""
+    start = start.astimezone(pytz.UTC)
+    if period == ALL_TIME:
+        return ALL_TIME
+    if period == WEEK:
+        year, week, _ = start.isocalendar()
+        return '{}-W{:02d}'.format(year, week)
+    if period == MONTH:
+        return '{}-{:02d}'.format(start.year, start.month)
+    if period == SEASON:
+        year = start.year + 1 if start.month == 12 else start.year
+        return '{}-{}'.format(year, SEASONS[start.month % 12 // 3])
+    raise ValueError('Unknown period: {}'.format(period))
+
+
+def period_keys(start: datetime) -> Dict[str, str]:
+    """Get the key of every period that the start falls in
+
+    An activity without a start is only on the all time boards."""
+    if start is None:
+        return {ALL_TIME: ALL_TIME}
+    return {period: period_key(period, start) for period, _ in PERIOD_CHOICES}
+
+
+def period_range(period: str, key: str) -> Tuple[datetime, datetime]:
+    """Get the UTC start and (exclusive) end of the period with the key
+
+    Raises ValueError for keys that don't match the period."""
+    if period == WEEK:
+        match = re.fullmatch(r'(\d{4})-W(\d{2})', key)
+        if match:
+            first = datetime.strptime('{} {} 1'.format(*match.groups()),
+                                      '%G %V %u')
+            return (pytz.UTC.localize(first),
+                    pytz.UTC.localize(first + timedelta(weeks=1)))
+    elif period == MONTH:
+        match = re.fullmatch(r'(\d{4})-(\d{2})', key)
+        if match and 1 <= int(match.group(2)) <= 12:
+            year, month = int(match.group(1)), int(match.group(2))
+            return _months(year, month, 1)
+    elif period == SEASON:
+        match = re.fullmatch(r'(\d{4})-([a-z]+)', key)
+        if match and match.group(2) in SEASONS:
+            # Winter starts in the December of the prior year
+            year = int(match.group(1))
+            return _months(year, SEASONS.index(match.group(2)) * 3, 3)
+    raise ValueError('Bad {} key: {}'.format(period, key))
+
+
+def _months(year: int, month: int, count: int) -> Tuple[datetime, datetime]:
+    """Get the UTC start and end of count months, month may be 0 to 12"""
+    def first_of(year, month):
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        return datetime(year, month, 1, tzinfo=pytz.UTC)
+    return first_of(year, month), first_of(year, month + count)
@@ -0,0 +1,175 @@
+"""Signal handlers keeping the leaderboards and caches up to date"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from api.helper import (ACTIVITY_LIST, LEADERS, activity_page_namespace,
+                        versioned_cache)
+from api.models import (METRIC_CHOICES, Activity, ActivityTrack, FeedEntry,
+                        LeaderboardEntry, SitemapPage, UserCategorySummary)
+from core.sitemap import sitemap_page
+
+# Activity fields that can change its place on the leaderboards
+LEADERBOARD_FIELDS = ('user_id', 'category', 'private', 'start') + tuple(
+    metric for metric, _ in METRIC_CHOICES)
+# Activity fields totalled in the user category summaries
+SUMMARY_FIELDS = ('user_id', 'category', 'private', 'max_speed', 'distance')
+# Activity fields that decide its place on the home feed
+FEED_FIELDS = ('user_id', 'private', 'name', 'start')
+# User fields that decide their place in the users sitemap
+USER_SITEMAP_FIELDS = ('username', 'is_active', 'is_superuser')
+
+
+def _leaderboard_state(activity: Activity) -> tuple:
+    return tuple(getattr(activity, x) for x in LEADERBOARD_FIELDS)
+
+
+def _summary_state(activity: Activity) -> tuple:
+    return tuple(getattr(activity, x) for x in SUMMARY_FIELDS)
+
+
+def _feed_state(activity: Activity) -> tuple:
+    # Finalized activities are named, only whether the name is set matters
+    user_id, private, name, start = (getattr(activity, x)
+                                     for x in FEED_FIELDS)
+    return user_id, private, name is not None, start
+
+
+@receiver(post_init, sender=Activity)
+def remember_state(sender, instance, **kwargs):
+    """Keep the loaded leaderboard, summary and feed fields, for saves"""
+    instance._leaderboard_state = _leaderboard_state(instance)
+    instance._summary_state = _summary_state(instance)
+    instance._feed_state = _feed_state(instance)
+    instance._sitemap_private = instance.private
+
+
+@receiver(post_save, sender=Activity)
+def update_leaderboard_on_save(sender, instance, created=False, raw=False,
+                               **kwargs):
+    """Refresh the entries the activity was and is counted in, if changed"""
+    old = instance._leaderboard_state
+    new = _leaderboard_state(instance)
+    if raw or (old == new and not created):
+        return
+
+    # Refresh the old user/category too, in case the activity moved
+    for user_id, category in {old[:2], new[:2]}:
+        if user_id is not None:
+            LeaderboardEntry.update_for(user_id, category)
+    instance._leaderboard_state = new
+    versioned_cache.bump(LEADERS)
+
+
+@receiver(post_delete, sender=Activity)
+def update_leaderboard_on_delete(sender, instance, **kwargs):
+    """Refresh the entries the deleted activity may have been counted in"""
+    if not instance.private:
+        LeaderboardEntry.update_for(instance.user_id, instance.category)
+        versioned_cache.bump(LEADERS)
+
+
+@receiver(post_save, sender=Activity)
+def update_summary_on_save(sender, instance, created=False, raw=False,
+                           **kwargs):
+    """Refresh the summaries the activity was and is counted in"""
+    old = instance._summary_state
+    new = _summary_state(instance)
+    if raw or (old == new and not created):
+        return
+
+    for user_id, category in {old[:2], new[:2]}:
+        if user_id is not None:
+            UserCategorySummary.update_for(user_id, category)
+    instance._summary_state = new
+
+
+@receiver(post_delete, sender=Activity)
+def update_summary_on_delete(sender, instance, **kwargs):
+    """Refresh the summary the deleted activity was counted in"""
+    UserCategorySummary.update_for(instance.user_id, instance.category)
+
+
+@receiver(post_save, sender=Activity)
+def update_feed_on_save(sender, instance, created=False, raw=False,
+                        **kwargs):
+    """Add, move or remove the feed entry of the activity, if changed"""
+    new = _feed_state(instance)
+    if raw or (instance._feed_state == new and not created):
+        return
+
+    FeedEntry.update_for(instance)
+    instance._feed_state = new
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def expire_activity_lists(sender, instance, raw=False, **kwargs):
+    """Make the cached activity lists stale, after any change"""
+    if not raw:
+        versioned_cache.bump(ACTIVITY_LIST)
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def expire_activity_page(sender, instance, raw=False, **kwargs):
+    """Purge the cached pages of the activity, after any change"""
+    if not raw:
+        versioned_cache.bump(activity_page_namespace(instance.pk))
+
+
+@receiver(post_save, sender=ActivityTrack)
+@receiver(post_delete, sender=ActivityTrack)
+def expire_track_activity_page(sender, instance, raw=False, **kwargs):
+    """Purge the cached pages of the activity the track is part of"""
+    if not raw:
+        versioned_cache.bump(activity_page_namespace(instance.activity_id))
+
+
+@receiver(post_save, sender=Activity)
+def mark_sitemap_on_save(sender, instance, created=False, raw=False,
+                         **kwargs):
+    """Mark the sitemap page of the activity stale, if it is or was listed
+
+    Any save changes the modified time, the lastmod of listed activities.
+    """
+    if raw or (instance.private and instance._sitemap_private):
+        return
+
+    SitemapPage.mark_stale('activities', sitemap_page(instance.pk))
+    instance._sitemap_private = instance.private
+
+
+@receiver(post_delete, sender=Activity)
+def mark_sitemap_on_delete(sender, instance, **kwargs):
+    """Mark the sitemap page of the deleted activity stale, if listed"""
+    if not instance.private:
+        SitemapPage.mark_stale('activities', sitemap_page(instance.pk))
+
+
+def _user_sitemap_state(user: User) -> tuple:
+    return tuple(getattr(user, x) for x in USER_SITEMAP_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_user_state(sender, instance, **kwargs):
+    """Keep the loaded users sitemap fields, for saves"""
+    instance._sitemap_state = _user_sitemap_state(instance)
+
+
+@receiver(post_save, sender=User)
+def mark_user_sitemap_on_save(sender, instance, created=False, raw=False,
+                              **kwargs):
+    """Mark the sitemap page of the user stale, if their entry changed"""
+    new = _user_sitemap_state(instance)
+    if raw or (instance._sitemap_state == new and not created):
+        return
+
+    SitemapPage.mark_stale('users', sitemap_page(instance.pk))
+    instance._sitemap_state = new
+
+
+@receiver(post_delete, sender=User)
+def mark_user_sitemap_on_delete(sender, instance, **kwargs):
+    """Mark the sitemap page of the deleted user stale"""
+    SitemapPage.mark_stale('users', sitemap_page(instance.pk))
@@ -0,0 +1,222 @@
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from pytz import utc
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.models import Activity, FeedEntry, LeaderboardEntry, SitemapPage, \
+    UserCategorySummary
+from api.tests.factories import ActivityFactory, ActivityTrackFactory, \
+    ActivityTrackpointFactory
+
+
+@pytest.mark.integration
+class TestSweepSummaryImages(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+        self.activity = ActivityFactory.create()
+        self.activity.summary_image.save('1-used.png', ContentFile(b'X'))
+        self.orphan = os.path.join(self.media_root, 'summary_images',
+                                   'orphan.png')
+        with open(self.orphan, 'wb') as orphan:
+            orphan.write(b'Y')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command('sweep_summary_images', *args, stdout=out)
+        return out.getvalue()
+
+    def test_removes_unused_images(self):
+        variant = os.path.join(self.media_root, 'summary_images',
+                               '1-used-small.webp')
+        with open(variant, 'wb') as image:
+            image.write(b'Z')
+
+        output = self.sweep('--min-age', '0')
+
+        assert not os.path.exists(self.orphan)
+        assert os.path.exists(self.activity.summary_image.path)
+        assert os.path.exists(variant)
+        assert 'summary_images/orphan.png' in output
+        assert 'Removed 1 summary images' in output
+
+    def test_keeps_recent_images(self):
+        output = self.sweep()
+
+        assert os.path.exists(self.orphan)
+        assert 'Removed 0 summary images' in output
+
+    def test_dry_run_keeps_images(self):
+        output = self.sweep('--min-age', '0', '--dry-run')
+
+        assert os.path.exists(self.orphan)
+        assert 'Found 1 summary images' in output
+
+
+@pytest.mark.integration
+class TestRegenerateSummaryImages(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root,
+                                          REMOTE_MAP_SOURCE='fake')
+        self.settings.enable()
+
+        start = datetime(2017, 1, 1, tzinfo=utc)
+        self.activity = ActivityFactory.create(start=start)
+        track = ActivityTrackFactory.create(activity=self.activity)
+        for i in range(2):
+            ActivityTrackpointFactory.create(
+                track=track, timepoint=start + timedelta(seconds=i))
+        ActivityFactory.create()  # without any tracks
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_makes_missing_images(self):
+        out = StringIO()
+
+        call_command('regenerate_summary_images', stdout=out)
+
+        self.activity.refresh_from_db()
+        assert self.activity.summary_image
+        assert 'Made 1 of 1 missing summary images' in out.getvalue()
+
+    @patch('api.models.make_image_for_track')
+    def test_leaves_images_that_cant_be_made(self, make_image_mock):
+        make_image_mock.return_value = None
+        out = StringIO()
+
+        call_command('regenerate_summary_images', stdout=out)
+
+        self.activity.refresh_from_db()
+        assert not self.activity.summary_image
+        assert 'Made 0 of 1 missing summary images' in out.getvalue()
+
+    def test_makes_missing_variants(self):
+        call_command('regenerate_summary_images', stdout=StringIO())
+        self.activity.refresh_from_db()
+        small = self.activity.summary_image.path.replace('.png',
+                                                         '-small.webp')
+        os.remove(small)
+        Activity.objects.update(summary_variants=False)
+        out = StringIO()
+
+        call_command('regenerate_summary_images', '--variants', stdout=out)
+
+        assert os.path.exists(small)
+        assert 'Made variants of 1 summary images' in out.getvalue()
+        self.activity.refresh_from_db()
+        assert self.activity.summary_variants
+
+
+@pytest.mark.integration
+class TestRebuildLeaderboard(TestCase):
+
+    def test_rebuilds_entries(self):
+        ActivityFactory.create(max_speed=10)
+        LeaderboardEntry.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_leaderboard', stdout=out)
+
+        assert LeaderboardEntry.objects.get().value == 10
+        assert 'Rebuilt 1 leaderboard entries' in out.getvalue()
+
+
+@pytest.mark.integration
+class TestRebuildUserSummaries(TestCase):
+
+    def test_rebuilds_summaries(self):
+        ActivityFactory.create(distance=100)
+        UserCategorySummary.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_user_summaries', stdout=out)
+
+        assert UserCategorySummary.objects.get().public_distance == 100
+        assert 'Rebuilt 1 user category summaries' in out.getvalue()
+
+
+@pytest.mark.integration
+class TestRebuildFeed(TestCase):
+
+    def test_rebuilds_entries(self):
+        activity = ActivityFactory.create(name='Sail', start=datetime.now(utc))
+        ActivityFactory.create(start=datetime.now(utc))
+        FeedEntry.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_feed', stdout=out)
+
+        assert FeedEntry.objects.get().activity == activity
+        assert 'Rebuilt 1 feed entries' in out.getvalue()
+
+
+@pytest.mark.integration
+class TestUpdateSitemaps(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+        self.activity = ActivityFactory.create(name='Sail')
+        SitemapPage.objects.all().delete()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def update(self, *args):
+        out = StringIO()
+        call_command('update_sitemaps', *args, stdout=out)
+        return out.getvalue()
+
+    def read(self, name):
+        with gzip.open(os.path.join(self.media_root, 'sitemaps',
+                                    name)) as sitemap:
+            return sitemap.read().decode()
+
+    def test_rebuild_writes_every_section(self):
+        out = self.update('--rebuild')
+
+        assert 'Wrote 3 sitemap pages' in out
+        assert '/activities/{}/'.format(self.activity.pk) in \
+            self.read('activities-0.xml.gz')
+        assert '/users/{}'.format(self.activity.user.username) in \
+            self.read('users-0.xml.gz')
+        index = self.read('sitemap.xml.gz')
+        assert '<loc>https://example.com/sitemaps/activities-0.xml.gz</loc>' \
+            in index
+        assert 'leaderboards-0.xml.gz' in index
+
+    def test_only_stale_pages_are_written(self):
+        self.update('--rebuild')
+
+        assert 'Wrote 0 sitemap pages' in self.update()
+
+        self.activity.private = True
+        self.activity.save()
+
+        assert 'Wrote 1 sitemap pages' in self.update()
+        assert not os.path.exists(os.path.join(
+            self.media_root, 'sitemaps', 'activities-0.xml.gz'))
+        assert 'activities-0' not in self.read('sitemap.xml.gz')
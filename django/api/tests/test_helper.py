@@ -5,11 +5,12 @@ import pytest
 from django.core.exceptions import PermissionDenied
 
 from api.helper import (create_new_activity_for_user, get_activity_by_id,
-                        get_activities_for_user, get_users_activities,
+                        get_activities_for_user, get_feed_ranges,
+                        get_users_activities,
                         get_public_activities, verify_private_owner,
-                        get_active_users, summarize_by_category,
-                        _get_activity_leaders, get_leaders)
-from api.models import Activity, ActivityTrack
+                        get_active_users, get_category_summaries,
+                        _get_activity_leaders, get_leaders, VersionedCache)
+from api.models import Activity, ActivityTrack, ACTIVITY_CHOICES
 
 
 class TestHelper(unittest.TestCase):
@@ -42,31 +43,29 @@ class TestHelper(unittest.TestCase):
         assert activity == sentinel.activity
         self.activity_mock.objects.get.assert_called_with(id=sentinel.id)
 
-    @patch('api.helper.Q')
-    def test_get_activities_for_user(self, q_mock):
-        # Given a mock queryset
-        queryset = Mock()
-        queryset.exclude.return_value = sentinel.queryset
-
-        # and a mock method activity that returns the queryset
-        self.activity_mock.objects.exclude.return_value = queryset
-
-        # and a mock
-        q_mock.return_value = 1
-
-        # and a mock user
-        user = Mock(username=sentinel.user)
+    @patch('api.helper.FeedEntry')
+    def test_get_activities_for_user(self, feed_mock):
+        # Given a mock feed filter
+        feed_mock.visible_to.return_value = sentinel.visible
+        filtered = self.activity_mock.objects.filter
+        filtered.return_value.select_related.return_value = \
+            sentinel.queryset
 
         # When getting the activities
-        activities = get_activities_for_user(user)
+        activities = get_activities_for_user(sentinel.user)
 
         # Then the queryset sentinel is returned, via correct mock calls
         assert activities == sentinel.queryset
-        self.activity_mock.objects.exclude.assert_called_with(
-            name__isnull=True
-        )
-        q_mock.assert_called_with(user__username=sentinel.user)
-        queryset.exclude.assert_called_with(-2, private=True)
+        feed_mock.visible_to.assert_called_once_with(sentinel.user)
+        filtered.assert_called_once_with(sentinel.visible)
+        filtered.return_value.select_related.assert_called_once_with('user')
+
+    @patch('api.helper.FeedEntry')
+    def test_get_feed_ranges(self, feed_mock):
+        feed_mock.visible_ranges.return_value = sentinel.ranges
+
+        assert get_feed_ranges(sentinel.user) == sentinel.ranges
+        feed_mock.visible_ranges.assert_called_once_with(sentinel.user)
 
     def test_get_users_activities_for_own_user(self):
         # Given a mock user
@@ -187,12 +186,14 @@ class TestHelper(unittest.TestCase):
 
     @patch('api.helper._get_activity_leaders')
     def test_get_leaders(self, mock_private):
-        # Given a mock private helper that returns mock data, which include
-        # an entry that should not appear in the output (XX)
-        mock_private.return_value = [dict(category='WS', other=sentinel.a),
-                                     dict(category='WS', other=sentinel.b),
-                                     dict(category='SL', other=sentinel.c),
-                                     dict(category='XX', other=sentinel.d)]
+        # Given a mock private helper that returns leaders for two of the
+        # categories
+        boards = dict(WS=[dict(category='WS', other=sentinel.a),
+                          dict(category='WS', other=sentinel.b)],
+                      SL=[dict(category='SL', other=sentinel.c)])
+        mock_private.side_effect = \
+            lambda period, key, metric, category, size: \
+            boards.get(category, [])
 
         # When getting the leaders
         leaders = get_leaders()
@@ -202,59 +203,152 @@ class TestHelper(unittest.TestCase):
         assert leaders[0]['category'] == 'Sailing'
         assert leaders[0]['leaders'] == [dict(category='SL', other=sentinel.c)]
         assert leaders[1]['category'] == 'Windsurfing'
-        assert len(leaders[1]['leaders']) == 2
-        assert leaders[1]['leaders'][0] == dict(category='WS',
-                                                other=sentinel.a)
-        assert leaders[1]['leaders'][1] == dict(category='WS',
-                                                other=sentinel.b)
-
-    @patch('api.helper.Max')
-    def test_private_get_activity_leaders(self, max_mock):
+        assert leaders[1]['leaders'] == boards['WS']
+
+    @patch('api.helper._get_activity_leaders')
+    def test_get_leaders_limits_each_category(self, mock_private):
+        # Given a mock private helper
+        mock_private.return_value = []
+
+        # When getting the leaders of a board
+        get_leaders('week', '2017-W03', 'distance', size=3)
+
+        # Then each category is read up to the board size
+        mock_private.assert_any_call('week', '2017-W03', 'distance', 'SL', 3)
+        assert mock_private.call_count == len(ACTIVITY_CHOICES)
+
+    @patch('api.helper.LeaderboardEntry')
+    def test_private_get_activity_leaders(self, entry_mock):
         # Given a set of mocks for the chained calls
-        activity = self.activity_mock
-        filter = activity.objects.filter
-        values = filter.return_value.values
-        annotate = values.return_value.annotate
-        order_by = annotate.return_value.order_by
-        order_by.return_value = sentinel.queryset
-        max_mock.return_value = sentinel.max
-
-        # When getting the activity leaders
-        leaders = _get_activity_leaders()
-
-        # Then the sentinel is returned, and mocks called correctly
-        assert leaders == sentinel.queryset
-        filter.assert_called_with(private=False)
-        values.assert_called_with('user__username', 'category')
-        annotate.assert_called_with(max_speed=sentinel.max)
-        max_mock.assert_called_with('max_speed')
-        order_by.assert_called_with('-max_speed')
-
-    @patch('api.helper.Count')
-    @patch('api.helper.Max')
-    @patch('api.helper.Sum')
-    def test_summarize_by_category(self, mock_sum, mock_max, mock_count):
-        # Given a values mock returned by the activity mock
-        activities = Mock()
-        activities.values.return_value.annotate\
-            .return_value.order_by.return_value = sentinel.queryset
-        mock_sum.return_value = sentinel.sum
-        mock_max.return_value = sentinel.max
-        mock_count.return_value = sentinel.count
-
-        # When summarizing by category
-        queryset = summarize_by_category(activities)
-
-        # Then the sentinel queryset is returned, and mocks called as expected
-        assert queryset == sentinel.queryset
-        activities.values.assert_called_with('category')
-        mock_sum.assert_called_with('distance')
-        mock_max.assert_called_with('max_speed')
-        mock_count.assert_called_with('category')
-        activities.values.return_value.annotate.assert_called_with(
-            count=sentinel.count,
-            max_speed=sentinel.max,
-            total_dist=sentinel.sum
-        )
-        activities.values.return_value.annotate.return_value.order_by\
-            .assert_called_with('-max_speed')
+        board = entry_mock.board
+        filtered = board.return_value.filter
+        values = filtered.return_value.values
+        values.return_value = [sentinel.a, sentinel.b, sentinel.c]
+
+        # When getting the activity leaders of a category
+        leaders = _get_activity_leaders(category='SL', size=2)
+
+        # Then the top of the category is returned, via the mocks
+        assert leaders == [sentinel.a, sentinel.b]
+        board.assert_called_with('all', 'all', 'max_speed')
+        filtered.assert_called_with(category='SL')
+        values.assert_called_with('user__username', 'category', 'value')
+
+    @patch('api.helper.LeaderboardEntry')
+    def test_private_get_activity_leaders_defaults_to_all(self, entry_mock):
+        values = entry_mock.board.return_value.filter.return_value.values
+        values.return_value = [sentinel.a, sentinel.b, sentinel.c]
+
+        leaders = _get_activity_leaders(category='SL')
+
+        assert leaders == [sentinel.a, sentinel.b, sentinel.c]
+
+    @patch('api.helper.UserCategorySummary')
+    def test_get_category_summaries(self, summary_mock):
+        # Given summaries, one without public activities
+        rows = [Mock(), Mock(), Mock()]
+        rows[0].totals.return_value = dict(count=1, max_speed=None)
+        rows[1].totals.return_value = dict(count=2, max_speed=5)
+        rows[2].totals.return_value = dict(count=0, max_speed=None)
+        summary_mock.objects.filter.return_value = rows
+        user = Mock(username='owner')
+
+        # When a visitor gets the summaries
+        summaries = get_category_summaries(user, Mock(username='visitor'))
+
+        # Then the empty one is dropped, and the rest ordered by speed
+        assert summaries == [dict(count=2, max_speed=5),
+                             dict(count=1, max_speed=None)]
+        summary_mock.objects.filter.assert_called_once_with(user=user)
+        rows[0].totals.assert_called_once_with(False)
+
+    @patch('api.helper.UserCategorySummary')
+    def test_get_category_summaries_includes_private_for_owner(
+            self, summary_mock):
+        row = Mock()
+        row.totals.return_value = dict(count=1, max_speed=None)
+        summary_mock.objects.filter.return_value = [row]
+        user = Mock(username='owner')
+
+        get_category_summaries(user, Mock(username='owner'))
+
+        row.totals.assert_called_once_with(True)
+
+
+class TestVersionedCache:
+
+    @pytest.fixture
+    def cache(self):
+        return VersionedCache()
+
+    def test_values_are_computed_once(self, cache):
+        compute = Mock(return_value='value')
+
+        assert cache.get_or_set('ns', 'key', compute) == 'value'
+        assert cache.get_or_set('ns', 'key', compute) == 'value'
+
+        compute.assert_called_once_with()
+        assert cache.snapshot() == dict(ns=dict(hits=1, misses=1,
+                                                hit_rate=0.5))
+
+    def test_bump_makes_namespace_stale(self, cache):
+        cache.get_or_set('ns', 'key', lambda: 1)
+        cache.get_or_set('other', 'key', lambda: 1)
+        version = cache.version('ns')
+
+        cache.bump('ns')
+
+        assert cache.version('ns') == version + 1
+        assert cache.get_or_set('ns', 'key', lambda: 2) == 2
+        assert cache.get_or_set('other', 'key', lambda: 2) == 1
+
+    def test_bump_without_version(self, cache):
+        cache.bump('new')
+
+        assert cache.get_or_set('new', 'key', lambda: 1) == 1
+
+    def test_empty_values_are_cached(self, cache):
+        compute = Mock(return_value=[])
+
+        cache.get_or_set('ns', 'key', compute)
+        cache.get_or_set('ns', 'key', compute)
+
+        compute.assert_called_once_with()
+
+    def test_none_values_are_not_cached(self, cache):
+        compute = Mock(return_value=None)
+
+        cache.get_or_set('ns', 'key', compute)
+        cache.get_or_set('ns', 'key', compute)
+
+        assert compute.call_count == 2
+
+    @patch('api.helper.caches')
+    def test_timeout_is_capped_by_the_cache(self, caches_mock):
+        backend = caches_mock.__getitem__.return_value
+        backend.get.return_value = None
+        cache = VersionedCache(timeout=60)
+
+        cache.get_or_set('ns', 'a', lambda: 1, timeout=10)
+        cache.get_or_set('ns', 'b', lambda: 1, timeout=100)
+        cache.get_or_set('ns', 'c', lambda: 1)
+
+        timeouts = [args[0][2] for args in backend.set.call_args_list]
+        assert timeouts == [10, 60, 60]
+
+    def test_reset(self, cache):
+        cache.get_or_set('ns', 'key', lambda: 1)
+
+        cache.reset()
+
+        assert cache.snapshot() == {}
+
+    @patch('api.helper._get_activity_leaders')
+    def test_leaders_are_cached(self, mock_private):
+        mock_private.return_value = [dict(category='SL', other='a')]
+
+        get_leaders('month', '2017-01', 'distance')
+        leaders = get_leaders('month', '2017-01', 'distance')
+
+        assert leaders[0]['leaders'] == [dict(category='SL', other='a')]
+        assert mock_private.call_count == len(ACTIVITY_CHOICES)
@@ -1,12 +1,14 @@
 from datetime import timedelta, time, date, datetime
 
 import pytest
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from pytz import timezone
 
+from analysis.track_encoding import decode_track
 from api.models import Activity, ActivityTrack, ActivityTrackpoint
 from api.tests.factories import UserFactory, ActivityTrackpointFactory, \
     ActivityFactory
@@ -62,6 +64,68 @@ class BaseTrackView(TestCase):
         self.end = ActivityTrackpointFactory.create(track=self.track)
 
 
+@pytest.mark.integration
+class TestTrackJSONWindow(BaseTrackView):
+
+    def setUp(self):
+        super(TestTrackJSONWindow, self).setUp()
+        self.client.login(username='test', password='password')
+        self.url = reverse('api:full_track_json',
+                           args=[self.activity.id, self.track.id])
+
+    def get_json(self, **params):
+        response = self.client.get(self.url, params)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_window_returns_points_in_range_with_same_bearings(self):
+        full = self.get_json()
+
+        window = self.get_json(
+            start=self.next.timepoint.strftime(DATETIME_FORMAT_STR),
+            end=self.penultimate.timepoint.strftime(DATETIME_FORMAT_STR))
+
+        assert window['time'] == full['time'][1:3]
+        assert window['bearing'] == full['bearing'][1:3]
+
+    def test_max_points_subsamples(self):
+        full = self.get_json()
+
+        window = self.get_json(max_points=2)
+
+        assert window['time'] == full['time'][::2]
+
+    def test_tolerance_returns_level_of_detail(self):
+        ActivityTrackpoint.objects.filter(
+            id__in=[self.start.id, self.end.id]).update(detail=3)
+        ActivityTrackpoint.objects.filter(id=self.next.id).update(detail=1)
+        full = self.get_json()
+
+        coarse = self.get_json(tolerance=1000)
+        fine = self.get_json(zoom=18)
+
+        assert coarse['time'] == [full['time'][0], full['time'][3]]
+        assert fine['time'] == full['time']
+
+    def test_bad_window_returns_400(self):
+        response = self.client.get(self.url, dict(start='yesterday'))
+
+        assert response.status_code == 400
+
+    def test_binary_encoding_decodes_to_json(self):
+        full = self.get_json()
+
+        response = self.client.get(
+            self.url, HTTP_ACCEPT='application/vnd.sailtrail.track')
+
+        assert response['Content-Type'] == 'application/vnd.sailtrail.track'
+        decoded = decode_track(response.content)
+        assert decoded['time'] == full['time']
+        assert decoded['speed'] == full['speed']
+        assert all(abs(x - y) < 1e-7
+                   for x, y in zip(decoded['lat'], full['lat']))
+
+
 @pytest.mark.integration
 @override_settings(REMOTE_MAP_SOURCE='fake')
 class TestDeleteTrack(BaseTrackView):
@@ -148,6 +212,53 @@ class TestDeleteTrack(BaseTrackView):
         assert self.activity.tracks.first().id == 1
 
 
+@pytest.mark.integration
+@override_settings(REMOTE_MAP_SOURCE='fake')
+class TestSpeedChart(BaseTrackView):
+
+    def setUp(self):
+        super(TestSpeedChart, self).setUp()
+        cache.clear()
+        self.track.reset_trim()
+        self.client.login(username='test', password='password')
+
+    def get_chart(self, name, args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_track_chart_is_recomputed_after_trim(self):
+        args = [self.activity.id, self.track.id]
+        chart = self.get_chart('api:track_speed_chart', args, width=3)
+        assert len(chart['time']) == 3
+        assert chart['time'][0] == \
+            self.start.timepoint.strftime(DATETIME_FORMAT_STR)
+
+        self.track.trim(
+            self.next.timepoint.strftime(DATETIME_FORMAT_STR), None)
+        chart = self.get_chart('api:track_speed_chart', args, width=3)
+
+        assert chart['time'][0] == \
+            self.next.timepoint.strftime(DATETIME_FORMAT_STR)
+
+    def test_full_track_chart_ignores_trim(self):
+        args = [self.activity.id, self.track.id]
+        self.track.trim(
+            self.next.timepoint.strftime(DATETIME_FORMAT_STR), None)
+
+        chart = self.get_chart('api:full_track_speed_chart', args, width=3)
+
+        assert chart['time'][0] == \
+            self.start.timepoint.strftime(DATETIME_FORMAT_STR)
+
+    def test_activity_chart_minmax(self):
+        chart = self.get_chart('api:activity_speed_chart',
+                               [self.activity.id], width=2, method='minmax')
+
+        assert len(chart['time']) == 2
+        assert chart['min'][0] <= chart['mean'][0] <= chart['max'][0]
+
+
 @pytest.mark.integration
 @override_settings(REMOTE_MAP_SOURCE='fake')
 class TestTrimTrack(BaseTrackView):
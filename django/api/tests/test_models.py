@@ -1,6 +1,7 @@
-from datetime import datetime
-from unittest.mock import MagicMock, patch, sentinel, Mock
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch, sentinel, Mock, call
 
+import numpy as np
 import pytest
 import pytz
 from django.core.exceptions import SuspiciousOperation
@@ -78,12 +79,15 @@ class TestActivityModel:
         pos = [{"timepoint": 1}, {"timepoint": 2}]
         activity = Activity()
         activity.get_trackpoints = Mock(return_value=pos)
+        activity.get_outlier_mask = Mock(return_value=[False, False])
         activity.generate_summary_image = Mock()
         activity.save = Mock()
         computed_stats = Mock()
         stats_mock.return_value = computed_stats
         computed_stats.distance.return_value.magnitude = sentinel.dist
         computed_stats.max_speed.magnitude = sentinel.max_speed
+        computed_stats.sustained_speed.return_value.magnitude = \
+            sentinel.sustained_speed
 
         # When computing stats
         activity.compute_stats()
@@ -91,6 +95,7 @@ class TestActivityModel:
         # Then the values were set as expected, after mock calls
         assert activity.distance == sentinel.dist
         assert activity.max_speed == sentinel.max_speed
+        assert activity.sustained_speed == sentinel.sustained_speed
         assert activity.start == 1
         assert activity.end == 2
         stats_mock.assert_called_once_with(pos)
@@ -100,77 +105,182 @@ class TestActivityModel:
         )
         activity.save.assert_called_once_with()
 
+    @staticmethod
+    def make_image_activity(name='summary_images/old.png', exists=False):
+        activity = Activity(id=1)
+        activity.save = Mock()
+        activity.summary_image = Mock(name='summary_image')
+        activity.summary_image.name = name
+        field = activity.summary_image.field
+        field.generate_filename.side_effect = \
+            lambda instance, name: 'summary_images/' + name
+        field.storage.exists.return_value = exists
+        return activity
+
+    @patch('api.models.save_variants')
+    @patch('api.models.image_points')
+    @patch('api.models.summary_image_name')
     @patch('api.models.make_image_for_track')
     def test_generate_summary_image_calls_image_helper_with_pos(self,
-                                                                mock):
+                                                                mock,
+                                                                name_mock,
+                                                                points_mock,
+                                                                variants_mock):
         # Given a new activity with some mocks and fake positions
         pos = [{"timepoint": 1}, {"timepoint": 2}]
-        activity = Activity()
-        activity.summary_image = Mock(name='summary_image')
+        activity = self.make_image_activity()
+        name_mock.return_value = 'abc.png'
 
         # and a mock make_images that returns a sentinel
         image = Mock()
-        image.name = sentinel.name
         mock.return_value = image
 
         # When computing stats
         activity.generate_summary_image(pos)
 
-        # Then the image helper is called to get generate and image
-        mock.assert_called_once_with(pos)
-
-        # and that value is saved in the activity
-        activity.summary_image.delete.assert_called_once_with()
-        activity.summary_image.save.assert_called_once_with(image.name,
+        # Then the image helper is called to get generate and image, from
+        # the track simplified once
+        points_mock.assert_called_once_with(pos)
+        name_mock.assert_called_once_with(points_mock.return_value)
+        mock.assert_called_once_with(pos, name='1-abc.png',
+                                     points=points_mock.return_value)
+
+        # and that value is saved in the activity, leaving the old image
+        # for the sweep
+        activity.summary_image.delete.assert_not_called()
+        activity.summary_image.save.assert_called_once_with('1-abc.png',
                                                             image,
-                                                            True)
+                                                            save=False)
+        activity.save.assert_called_once_with()
+
+        # with its variants
+        variants_mock.assert_called_once_with(
+            activity.summary_image.field.storage, activity.summary_image.name,
+            image.read.return_value)
 
+    @patch('api.models.save_variants')
+    @patch('api.models.image_points')
+    @patch('api.models.summary_image_name')
     @patch('api.models.make_image_for_track')
-    def test_generate_summary_image_calls_image_helper_without_pos(self,
-                                                                   mock):
+    def test_generate_summary_image_calls_image_helper_without_pos(
+            self, mock, name_mock, points_mock, variants_mock):
         # Given a new activity with some mocks and fake positions
         pos = [{"timepoint": 1}, {"timepoint": 2}]
-        activity = Activity()
-        activity.get_trackpoints = Mock(return_value=pos)
-        activity.summary_image = Mock(name='summary_image')
+        activity = self.make_image_activity()
+        activity.get_valid_trackpoints = Mock(return_value=pos)
+        name_mock.return_value = 'abc.png'
 
-        # and a mock make_images that returns a sentinel
-        image = Mock()
-        image.name = sentinel.name
-        mock.return_value = image
-
-        # When computing stats
-        activity.generate_summary_image()
+        # When computing stats, without saving the model
+        activity.generate_summary_image(save_model=False)
 
         # Then the image helper is called to get generate and image
-        mock.assert_called_once_with(pos)
-
-        # and that value is saved in the activity
-        activity.summary_image.save.assert_called_once_with(image.name,
-                                                            image,
-                                                            True)
+        mock.assert_called_once_with(pos, name='1-abc.png',
+                                     points=points_mock.return_value)
+        activity.summary_image.save.assert_called_once_with(
+            '1-abc.png', mock.return_value, save=False)
+        activity.save.assert_not_called()
 
+    @patch('api.models.save_variants')
+    @patch('api.models.image_points')
+    @patch('api.models.decimate')
+    @patch('api.models.summary_image_name')
+    @patch('api.models.make_image_for_track')
+    def test_generate_summary_image_decimates_like_ingest(
+            self, mock, name_mock, decimate_mock, points_mock, variants_mock):
+        # Given a new activity with some valid positions
+        activity = self.make_image_activity()
+        activity.get_valid_trackpoints = Mock(return_value=sentinel.valid)
+        name_mock.return_value = 'abc.png'
+
+        # When generating the image without positions
+        activity.generate_summary_image(save_model=False)
+
+        # Then the valid positions are decimated as while ingesting
+        decimate_mock.assert_called_once_with(sentinel.valid)
+        points_mock.assert_called_once_with(decimate_mock.return_value)
+        mock.assert_called_once_with(decimate_mock.return_value,
+                                     name='1-abc.png',
+                                     points=points_mock.return_value)
+
+    @patch('api.models.image_points')
+    @patch('api.models.summary_image_name')
     @patch('api.models.make_image_for_track')
-    def test_generate_summary_image_skips_image_helper_without_img(self,
-                                                                   mock):
+    def test_generate_summary_image_skips_image_helper_without_img(
+            self, mock, name_mock, points_mock):
         # Given a new activity with some mocks and fake positions
         pos = [{"timepoint": 1}, {"timepoint": 2}]
-        activity = Activity()
-        activity.get_trackpoints = Mock(return_value=pos)
-        activity.summary_image = None
-
-        # and a mock make_images that returns a sentinel
-        image = Mock()
-        image.name = sentinel.name
-        mock.return_value = image
+        activity = self.make_image_activity()
+        activity.get_valid_trackpoints = Mock(return_value=pos)
+        name_mock.return_value = 'abc.png'
 
         mock.return_value = None
 
         # When computing stats
         activity.generate_summary_image()
 
-        # Then the image helper is called to get generate and image
-        mock.assert_called_once_with(pos)
+        # Then the image helper is called, and the activity is left
+        # without an image
+        mock.assert_called_once_with(pos, name='1-abc.png',
+                                     points=points_mock.return_value)
+        assert not activity.summary_image
+        activity.save.assert_called_once_with()
+
+    @patch('api.models.summary_image_name')
+    @patch('api.models.make_image_for_track')
+    def test_generate_summary_image_skips_unchanged_image(self, mock,
+                                                          name_mock):
+        activity = self.make_image_activity(name='summary_images/1-abc.png')
+        activity.summary_variants = True
+        name_mock.return_value = 'abc.png'
+
+        activity.generate_summary_image([{"timepoint": 1}])
+
+        mock.assert_not_called()
+        activity.summary_image.field.storage.exists.assert_not_called()
+        activity.save.assert_not_called()
+
+    @patch('api.models.summary_image_name')
+    @patch('api.models.make_image_for_track')
+    def test_generate_summary_image_reuses_stored_image(self, mock,
+                                                        name_mock):
+        activity = self.make_image_activity(exists=True)
+        name_mock.return_value = 'abc.png'
+
+        activity.generate_summary_image([{"timepoint": 1}])
+
+        mock.assert_not_called()
+        storage = activity.summary_image.field.storage
+        assert storage.exists.call_args_list[0][0] == (
+            'summary_images/1-abc.png',)
+        storage.open.assert_not_called()
+        activity.summary_image.save.assert_not_called()
+        assert activity.summary_image.name == 'summary_images/1-abc.png'
+        assert activity.summary_variants
+        activity.save.assert_called_once_with()
+
+    @patch('api.models.save_variants')
+    @patch('api.models.summary_image_name')
+    @patch('api.models.make_image_for_track')
+    def test_generate_summary_image_makes_missing_variants(self, mock,
+                                                           name_mock,
+                                                           variants_mock):
+        # Given an activity with an image made before the variants
+        activity = self.make_image_activity(name='summary_images/1-abc.png')
+        storage = activity.summary_image.field.storage
+        storage.exists.side_effect = lambda name: name.endswith('abc.png')
+        storage.open = MagicMock()
+        name_mock.return_value = 'abc.png'
+
+        # When generating the unchanged image
+        activity.generate_summary_image([{"timepoint": 1}])
+
+        # Then the variants are made from the stored image
+        mock.assert_not_called()
+        storage.open.assert_called_once_with('summary_images/1-abc.png')
+        variants_mock.assert_called_once_with(
+            storage, 'summary_images/1-abc.png',
+            storage.open.return_value.__enter__.return_value.read.return_value)
+        assert activity.summary_variants
 
     @patch("api.models.ActivityTrack")
     def test_add_track_creates_new_and_populates_start_and_end_if_none(
@@ -276,6 +386,122 @@ class TestActivityModel:
         track2_mock.get_trackpoints.return_value.\
             values.assert_called_once_with('sog', 'lat', 'lon', 'timepoint')
 
+    def test_get_trackpoints_applies_filters_to_each_track(self):
+        tracks_mock = Mock()
+        track_mock = Mock()
+        tracks_mock.return_value.all.return_value.order_by.return_value = [
+            track_mock
+        ]
+        filtered = track_mock.get_trackpoints.return_value.filter.return_value
+        filtered.values.return_value = [1, 2]
+
+        activity = Activity()
+        activity._get_tracks = tracks_mock
+
+        trackpoints = activity.get_trackpoints(timepoint__gte=sentinel.start)
+
+        assert trackpoints == [1, 2]
+        track_mock.get_trackpoints.return_value.filter.\
+            assert_called_once_with(timepoint__gte=sentinel.start)
+
+    def test_get_outlier_mask_joins_track_masks(self):
+        tracks_mock = Mock()
+        track1_mock = Mock()
+        track2_mock = Mock()
+        tracks_mock.return_value.all.return_value.order_by.return_value = [
+            track1_mock, track2_mock
+        ]
+        track1_mock.get_outlier_mask.return_value = np.asarray([True])
+        track2_mock.get_outlier_mask.return_value = np.asarray([False, True])
+
+        activity = Activity()
+        activity._get_tracks = tracks_mock
+
+        mask = activity.get_outlier_mask()
+
+        assert mask.tolist() == [True, False, True]
+
+    def test_get_valid_trackpoints_drops_outliers(self):
+        pos = [{"timepoint": 1}, {"timepoint": 2}, {"timepoint": 3}]
+        activity = Activity()
+        activity.get_trackpoints = Mock(return_value=pos)
+        activity.get_outlier_mask = Mock(return_value=[False, True, False])
+
+        assert activity.get_valid_trackpoints() == [pos[0], pos[2]]
+
+    def test_get_valid_trackpoints_keeps_all_if_all_flagged(self):
+        pos = [{"timepoint": 1}, {"timepoint": 2}]
+        activity = Activity()
+        activity.get_outlier_mask = Mock(return_value=[True, True])
+
+        assert activity.get_valid_trackpoints(pos) == pos
+
+    @patch('api.models.Stats')
+    def test_compute_stats_ignores_outliers(self, stats_mock: MagicMock):
+        pos = [{"timepoint": 1}, {"timepoint": 2}, {"timepoint": 3}]
+        activity = Activity()
+        activity.get_trackpoints = Mock(return_value=pos)
+        activity.get_outlier_mask = Mock(return_value=[False, True, False])
+        activity.generate_summary_image = Mock()
+        activity.save = Mock()
+
+        activity.compute_stats()
+
+        stats_mock.assert_called_once_with([pos[0], pos[2]])
+        activity.generate_summary_image.assert_called_once_with(
+            [pos[0], pos[2]],
+            save_model=False
+        )
+        assert activity.start == 1
+        assert activity.end == 3
+
+    @patch('api.models.decimate')
+    @patch('api.models.Stats')
+    def test_compute_stats_decimates_image_points(self, stats_mock,
+                                                  decimate_mock):
+        pos = [{"timepoint": 1}, {"timepoint": 2}]
+        activity = Activity()
+        activity.get_trackpoints = Mock(return_value=pos)
+        activity.get_outlier_mask = Mock(return_value=[False, False])
+        activity.generate_summary_image = Mock()
+        activity.save = Mock()
+
+        activity.compute_stats()
+
+        stats_mock.assert_called_once_with(pos)
+        decimate_mock.assert_called_once_with(pos)
+        activity.generate_summary_image.assert_called_once_with(
+            decimate_mock.return_value,
+            save_model=False
+        )
+
+    @patch('api.models.Stats')
+    def test_compute_stats_uses_summary_if_given(self, stats_mock):
+        activity = Activity()
+        activity.get_trackpoints = Mock()
+        activity.generate_summary_image = Mock()
+        activity.save = Mock()
+        summary = Mock(count=2, distance=sentinel.dist,
+                       max_speed=sentinel.max_speed,
+                       sustained_speed=sentinel.sustained_speed,
+                       start=sentinel.start, end=sentinel.end,
+                       points=sentinel.points)
+
+        activity.compute_stats(summary)
+
+        stats_mock.assert_not_called()
+        activity.get_trackpoints.assert_not_called()
+        activity.generate_summary_image.assert_called_once_with(
+            sentinel.points,
+            save_model=False
+        )
+        assert activity.distance == sentinel.dist
+        assert activity.max_speed == sentinel.max_speed
+        assert activity.sustained_speed == sentinel.sustained_speed
+        assert activity.start == sentinel.start
+        assert activity.end == sentinel.end
+        activity.save.assert_called_once_with()
+
 
 class TestActivityTrackModel:
 
@@ -468,6 +694,34 @@ class TestActivityTrackModel:
         assert track.trim_end == sentinel.end
         track.save.assert_called_once_with()
 
+    def test_reset_trim_uses_summary_for_single_track_activity(self):
+        track = ActivityTrack()
+        track._get_limits = Mock()
+        track.save = Mock()
+        activity = Mock()
+        activity.tracks.count.return_value = 1
+        track._get_activity = Mock(return_value=activity)
+        summary = Mock(start=sentinel.start, end=sentinel.end)
+
+        track.reset_trim(summary)
+
+        track._get_limits.assert_not_called()
+        assert track.trim_start == sentinel.start
+        assert track.trim_end == sentinel.end
+        activity.compute_stats.assert_called_once_with(summary)
+
+    def test_reset_trim_recomputes_multi_track_activity(self):
+        track = ActivityTrack()
+        track.save = Mock()
+        activity = Mock()
+        activity.tracks.count.return_value = 2
+        track._get_activity = Mock(return_value=activity)
+        summary = Mock(start=sentinel.start, end=sentinel.end)
+
+        track.reset_trim(summary)
+
+        activity.compute_stats.assert_called_once_with()
+
     def test_get_limits_returns_trackpoint_limits(self):
         track = ActivityTrack()
         trackpoint = Mock()
@@ -496,7 +750,7 @@ class TestActivityTrackModel:
             timepoint__range=(sentinel.start, sentinel.end)
         )
         trackpoint.filter.return_value.order_by.assert_called_once_with(
-            'timepoint'
+            'timepoint', 'id'
         )
 
     def test_get_trackpoints_returns_full_if_desired_expected(self):
@@ -511,7 +765,105 @@ class TestActivityTrackModel:
         trackpoints = track.get_trackpoints(filtered=False)
 
         assert trackpoints == sentinel.tps
-        trackpoint.order_by.assert_called_once_with('timepoint')
+        trackpoint.order_by.assert_called_once_with('timepoint', 'id')
+
+    @patch('api.models.flag_outliers')
+    def test_filter_outliers_stores_packed_mask(self, flag_mock):
+        track = ActivityTrack()
+        track.save = Mock()
+        flag_mock.return_value = np.asarray([False, True, False])
+        start = datetime(2015, 1, 1, tzinfo=pytz.UTC)
+
+        mask = track.filter_outliers((
+            (1, 2, 3),
+            (11, 22, 33),
+            (0.5, 1.5, 2.5),
+            (start, start + timedelta(seconds=1),
+             start + timedelta(seconds=3)),
+        ), max_speed=sentinel.max_speed)
+
+        assert mask.tolist() == [False, True, False]
+        args, kwargs = flag_mock.call_args
+        assert args[:3] == ((1, 2, 3), (11, 22, 33), (0.5, 1.5, 2.5))
+        assert list(args[3]) == [0, 1, 3]
+        assert kwargs == dict(max_speed=sentinel.max_speed)
+        assert track.outlier_mask == bytes([0b01000000])
+        track.save.assert_called_once_with()
+
+    @patch('api.models.flag_outliers')
+    def test_filter_outliers_reads_trackpoints_if_not_given(self, flag_mock):
+        track = ActivityTrack()
+        track.save = Mock()
+        track.get_trackpoints = Mock()
+        track.get_trackpoints.return_value.values_list.return_value = []
+
+        track.filter_outliers()
+
+        flag_mock.assert_not_called()
+        track.get_trackpoints.assert_called_once_with(filtered=False)
+        track.get_trackpoints.return_value.values_list.\
+            assert_called_once_with('lat', 'lon', 'sog', 'timepoint')
+        assert track.outlier_mask == b''
+
+    @patch('api.models.find_trim_limits')
+    def test_suggest_trim_stores_limits_of_valid_trackpoints(self,
+                                                             find_mock):
+        track = ActivityTrack()
+        track.save = Mock()
+        find_mock.return_value = (0, 1)
+        start = datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        timepoints = (start, start + timedelta(seconds=1),
+                      start + timedelta(seconds=3))
+        columns = ((1, 2, 3), (11, 22, 33), (0.5, 1.5, 2.5), timepoints)
+
+        track.suggest_trim(columns, [True, False, False])
+
+        args, _ = find_mock.call_args
+        assert args[:3] == ([2, 3], [22, 33], [1.5, 2.5])
+        assert list(args[3]) == [0, 2]
+        assert track.suggested_trim_start == timepoints[1]
+        assert track.suggested_trim_end == timepoints[2]
+        track.save.assert_called_once_with()
+
+    @patch('api.models.find_trim_limits')
+    def test_suggest_trim_clears_suggestion_if_nothing_found(self,
+                                                             find_mock):
+        track = ActivityTrack()
+        track.save = Mock()
+        track.suggested_trim_start = sentinel.start
+        track.suggested_trim_end = sentinel.end
+        find_mock.return_value = None
+
+        track.suggest_trim(((1,), (11,), (0.5,), (datetime(2015, 1, 1),)),
+                           [False])
+
+        assert track.suggested_trim_start is None
+        assert track.suggested_trim_end is None
+
+    def test_get_outlier_mask_without_mask_is_all_valid(self):
+        track = ActivityTrack()
+        track.get_trackpoints = Mock()
+        track.get_trackpoints.return_value.count.return_value = 3
+
+        mask = track.get_outlier_mask()
+
+        assert mask.tolist() == [False, False, False]
+
+    def test_get_outlier_mask_skips_trimmed_trackpoints(self):
+        track = ActivityTrack()
+        track.trim_start = sentinel.start
+        track.outlier_mask = bytes([0b01100100])
+        track.get_trackpoints = Mock()
+        track.get_trackpoints.return_value.count.return_value = 3
+        trackpoints = Mock()
+        trackpoints.filter.return_value.count.return_value = 2
+        track._get_trackpoints = Mock(return_value=trackpoints)
+
+        mask = track.get_outlier_mask()
+
+        assert mask.tolist() == [True, False, False]
+        trackpoints.filter.assert_called_once_with(
+            timepoint__lt=sentinel.start)
 
     @patch('api.models.ActivityTrackpoint')
     @patch('api.models.ActivityTrack.objects')
@@ -539,7 +891,8 @@ class TestActivityTrackModel:
         )
         upfile.seek.assert_called_once_with(0)
         tps_mock.create_trackpoints.assert_called_once_with(new_track, upfile)
-        new_track.reset_trim.assert_called_once_with()
+        new_track.reset_trim.assert_called_once_with(
+            tps_mock.create_trackpoints.return_value)
 
 
 class TestActivityTrackFileModel:
@@ -567,32 +920,82 @@ class TestActivityTrackpointModel:
     @patch('api.models.sirf')
     @patch('api.models.ActivityTrackpoint.objects')
     def test_creates_sirf_trackpoints_and_saves(self, object_mock, sirf_mock):
-        sirf_mock.create_trackpoints.return_value = sentinel.trackpoints
+        later = Mock(timepoint=2, lat=1.0, lon=1.0, sog=3.0)
+        earlier = Mock(timepoint=1, lat=0.0, lon=0.0, sog=2.0)
+        trackpoints = [later, earlier]
+        sirf_mock.create_trackpoints.return_value = trackpoints
+        track = Mock()
+        track.filter_outliers.return_value = np.asarray([False, False])
 
         up_file = Mock()
         up_file.name = 'test.Sbn'
 
-        ActivityTrackpoint.create_trackpoints(sentinel.track, up_file)
+        summary = ActivityTrackpoint.create_trackpoints(track, up_file)
 
         sirf_mock.create_trackpoints.assert_called_once_with(
-            sentinel.track, up_file, ActivityTrackpoint
+            track, up_file, ActivityTrackpoint
         )
-        object_mock.bulk_create.assert_called_once_with(sentinel.trackpoints)
+        object_mock.bulk_create.assert_called_once_with([earlier, later])
+        track.filter_outliers.assert_called_once_with(
+            ((0.0, 1.0), (0.0, 1.0), (2.0, 3.0), (1, 2)))
+        track.suggest_trim.assert_called_once_with(
+            track.filter_outliers.call_args[0][0],
+            track.filter_outliers.return_value)
+        assert (earlier.detail, later.detail) == (3, 3)
+        assert summary.count == 2
+        assert summary.start == 1
+        assert summary.end == 2
+        assert summary.max_speed == 3.0
 
     @patch('api.models.gpx')
     @patch('api.models.ActivityTrackpoint.objects')
     def test_creates_gpx_trackpoints_and_saves(self, object_mock, gpx_mock):
-        gpx_mock.create_trackpoints.return_value = sentinel.trackpoints
+        later = Mock(timepoint=2, lat=1.0, lon=1.0, sog=3.0)
+        earlier = Mock(timepoint=1, lat=0.0, lon=0.0, sog=2.0)
+        trackpoints = [later, earlier]
+        gpx_mock.create_trackpoints.return_value = trackpoints
+        track = Mock()
+        track.filter_outliers.return_value = np.asarray([False, False])
 
         up_file = Mock()
         up_file.name = 'test.GPx'
 
-        ActivityTrackpoint.create_trackpoints(sentinel.track, up_file)
+        summary = ActivityTrackpoint.create_trackpoints(track, up_file)
 
         gpx_mock.create_trackpoints.assert_called_once_with(
-            sentinel.track, up_file, ActivityTrackpoint
+            track, up_file, ActivityTrackpoint
         )
-        object_mock.bulk_create.assert_called_once_with(sentinel.trackpoints)
+        object_mock.bulk_create.assert_called_once_with([earlier, later])
+        track.filter_outliers.assert_called_once_with(
+            ((0.0, 1.0), (0.0, 1.0), (2.0, 3.0), (1, 2)))
+        track.suggest_trim.assert_called_once_with(
+            track.filter_outliers.call_args[0][0],
+            track.filter_outliers.return_value)
+        assert (earlier.detail, later.detail) == (3, 3)
+        assert summary.count == 2
+        assert summary.start == 1
+        assert summary.end == 2
+        assert summary.max_speed == 3.0
+
+    @patch('api.models.INGEST_CHUNK_SIZE', 1)
+    @patch('api.models.gpx')
+    @patch('api.models.ActivityTrackpoint.objects')
+    def test_saves_trackpoints_in_chunks(self, object_mock, gpx_mock):
+        later = Mock(timepoint=2, lat=1.0, lon=1.0, sog=3.0)
+        earlier = Mock(timepoint=1, lat=0.0, lon=0.0, sog=2.0)
+        gpx_mock.create_trackpoints.return_value = [later, earlier]
+        track = Mock()
+        track.filter_outliers.return_value = np.asarray([False, False])
+
+        up_file = Mock()
+        up_file.name = 'test.gpx'
+
+        summary = ActivityTrackpoint.create_trackpoints(track, up_file)
+
+        assert object_mock.bulk_create.call_args_list == [
+            call([earlier]), call([later])]
+        assert summary.count == 2
+        assert summary.max_speed == 3.0
 
     def test_raises_with_unsupported_filetype(self):
         up_file = Mock()
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from api.periods import period_key, period_keys, period_range
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=pytz.UTC)
+
+
+class TestPeriods:
+
+    def test_period_keys(self):
+        assert period_keys(utc(2017, 1, 18, 12)) == {
+            'all': 'all', 'week': '2017-W03', 'month': '2017-01',
+            'season': '2017-winter'}
+
+    def test_activity_without_start_is_all_time_only(self):
+        assert period_keys(None) == {'all': 'all'}
+
+    @pytest.mark.parametrize('start, key', [
+        (utc(2016, 12, 1), '2017-winter'),
+        (utc(2017, 2, 28), '2017-winter'),
+        (utc(2017, 3, 1), '2017-spring'),
+        (utc(2017, 7, 4), '2017-summer'),
+        (utc(2017, 11, 30), '2017-autumn'),
+    ])
+    def test_seasons(self, start, key):
+        assert period_key('season', start) == key
+
+    def test_week_uses_iso_year(self):
+        assert period_key('week', utc(2016, 1, 1)) == '2015-W53'
+
+    def test_keys_are_in_utc(self):
+        start = pytz.timezone('US/Central').localize(datetime(2017, 1, 31,
+                                                              22))
+        assert period_key('month', start) == '2017-02'
+
+    def test_unknown_period(self):
+        with pytest.raises(ValueError):
+            period_key('day', utc(2017, 1, 1))
+
+    @pytest.mark.parametrize('period, key, start, end', [
+        ('week', '2015-W53', utc(2015, 12, 28), utc(2016, 1, 4)),
+        ('month', '2017-12', utc(2017, 12, 1), utc(2018, 1, 1)),
+        ('season', '2017-winter', utc(2016, 12, 1), utc(2017, 3, 1)),
+        ('season', '2017-autumn', utc(2017, 9, 1), utc(2017, 12, 1)),
+    ])
+    def test_period_range(self, period, key, start, end):
+        assert period_range(period, key) == (start, end)
+
+    def test_range_contains_its_keys(self):
+        for period in ('week', 'month', 'season'):
+            key = period_key(period, utc(2017, 5, 14, 8))
+            start, end = period_range(period, key)
+            assert period_key(period, start) == key
+            assert period_key(period, end) != key
+
+    @pytest.mark.parametrize('period, key', [
+        ('week', '2017-01'),
+        ('month', '2017-00'),
+        ('season', '2017-monsoon'),
+        ('all', 'all'),
+    ])
+    def test_bad_range_key(self, period, key):
+        with pytest.raises(ValueError):
+            period_range(period, key)
@@ -0,0 +1,371 @@
+from datetime import datetime
+
+import pytest
+import pytz
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+
+from api.helper import (ACTIVITY_LIST, LEADERS, activity_page_namespace,
+                        versioned_cache)
+from api.helper import get_activities_for_user
+from api.models import FeedEntry, LeaderboardEntry, SitemapPage, \
+    UserCategorySummary
+from api.tests.factories import ActivityFactory
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.integration
+class TestLeaderboardSignals(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory.create(username='test1')
+        self.other = UserFactory.create(username='test2')
+        self.fast = ActivityFactory.create(max_speed=10, user=self.user)
+        self.slow = ActivityFactory.create(max_speed=5, user=self.user)
+
+    def entry(self, user=None, category='SL', period='all', key='all',
+              metric='max_speed'):
+        return LeaderboardEntry.objects.filter(
+            user=user or self.user, category=category, period=period,
+            period_key=key, metric=metric).first()
+
+    def test_new_activity_creates_entry(self):
+        entry = self.entry()
+
+        assert entry.value == 10
+        assert entry.activity == self.fast
+
+    def test_faster_activity_replaces_entry(self):
+        faster = ActivityFactory.create(max_speed=12, user=self.user)
+
+        assert self.entry().activity == faster
+        assert LeaderboardEntry.objects.count() == 1
+
+    def test_entries_for_each_period_and_metric(self):
+        start = datetime(2017, 1, 18, 12, tzinfo=pytz.UTC)
+        activity = ActivityFactory.create(
+            max_speed=12, sustained_speed=8, distance=2000, start=start,
+            user=self.other)
+
+        entries = LeaderboardEntry.objects.filter(user=self.other)
+        assert sorted((x.period, x.period_key) for x in entries
+                      if x.metric == 'max_speed') == [
+                          ('all', 'all'), ('month', '2017-01'),
+                          ('season', '2017-winter'), ('week', '2017-W03')]
+        assert entries.count() == 12
+        assert self.entry(self.other, period='week', key='2017-W03',
+                          metric='distance').value == 2000
+        assert self.entry(self.other, period='month', key='2017-01',
+                          metric='sustained_speed').activity == activity
+
+    def test_best_in_each_period_is_kept(self):
+        january = datetime(2017, 1, 18, tzinfo=pytz.UTC)
+        ActivityFactory.create(max_speed=9, start=january, user=self.other)
+        ActivityFactory.create(max_speed=4, start=january.replace(month=2),
+                               user=self.other)
+
+        assert self.entry(self.other).value == 9
+        assert self.entry(self.other, period='month',
+                          key='2017-02').value == 4
+        assert self.entry(self.other, period='season',
+                          key='2017-winter').value == 9
+
+    def test_start_change_moves_entries(self):
+        activity = ActivityFactory.create(
+            max_speed=9, start=datetime(2017, 1, 18, tzinfo=pytz.UTC),
+            user=self.other)
+
+        activity.start = datetime(2017, 3, 1, tzinfo=pytz.UTC)
+        activity.save()
+
+        assert self.entry(self.other, period='month', key='2017-01') is None
+        assert self.entry(self.other, period='season',
+                          key='2017-spring').value == 9
+
+    def test_new_stats_update_entry(self):
+        self.fast.max_speed = 4
+        self.fast.save()
+
+        assert self.entry().activity == self.slow
+
+    def test_private_activity_is_dropped(self):
+        self.fast.private = True
+        self.fast.save()
+
+        assert self.entry().value == 5
+
+        self.slow.private = True
+        self.slow.save()
+
+        assert self.entry() is None
+
+    def test_category_change_moves_entry(self):
+        self.fast.category = 'WS'
+        self.fast.save()
+
+        assert self.entry().value == 5
+        assert self.entry(category='WS').value == 10
+
+    def test_activity_without_stats_is_not_counted(self):
+        ActivityFactory.create(user=self.other)
+
+        assert self.entry(user=self.other) is None
+
+    def test_deleted_activity_falls_back_to_next_best(self):
+        self.fast.delete()
+
+        assert self.entry().activity == self.slow
+
+    def test_board_breaks_ties_by_user(self):
+        third = UserFactory.create(username='test3')
+        ActivityFactory.create(max_speed=10, user=third)
+        ActivityFactory.create(max_speed=10, user=self.other)
+
+        board = LeaderboardEntry.board().filter(category='SL')
+
+        assert [x.user for x in board] == [self.user, self.other, third]
+
+    def test_rank(self):
+        ActivityFactory.create(max_speed=11, user=self.other)
+
+        assert LeaderboardEntry.rank(self.other, 'SL') == 1
+        assert LeaderboardEntry.rank(self.user, 'SL') == 2
+        assert LeaderboardEntry.rank(self.user, 'WS') is None
+        assert LeaderboardEntry.rank(self.user, 'SL',
+                                     metric='distance') is None
+
+    def test_rebuild(self):
+        LeaderboardEntry.objects.all().delete()
+        ActivityFactory.create(max_speed=3, distance=100, user=self.other,
+                               category='WS')
+
+        assert LeaderboardEntry.rebuild() == 3
+
+        assert self.entry().activity == self.fast
+        assert self.entry(user=self.other, category='WS').value == 3
+        assert self.entry(user=self.other, category='WS',
+                          metric='distance').value == 100
+
+
+@pytest.mark.integration
+class TestCacheSignals(TestCase):
+
+    def setUp(self):
+        self.activity = ActivityFactory.create(max_speed=10)
+        self.leaders = versioned_cache.version(LEADERS)
+        self.lists = versioned_cache.version(ACTIVITY_LIST)
+
+    def test_leaderboard_change_bumps_both(self):
+        self.activity.max_speed = 12
+        self.activity.save()
+
+        assert versioned_cache.version(LEADERS) == self.leaders + 1
+        assert versioned_cache.version(ACTIVITY_LIST) == self.lists + 1
+
+    def test_other_change_only_bumps_activity_lists(self):
+        self.activity.name = 'Renamed'
+        self.activity.save()
+
+        assert versioned_cache.version(LEADERS) == self.leaders
+        assert versioned_cache.version(ACTIVITY_LIST) == self.lists + 1
+
+    def test_delete_bumps_both(self):
+        self.activity.delete()
+
+        assert versioned_cache.version(LEADERS) == self.leaders + 1
+        assert versioned_cache.version(ACTIVITY_LIST) == self.lists + 1
+
+    def test_activity_change_purges_its_pages(self):
+        namespace = activity_page_namespace(self.activity.pk)
+        other = activity_page_namespace(self.activity.pk + 1)
+        page, other_page = (versioned_cache.version(namespace),
+                            versioned_cache.version(other))
+
+        self.activity.name = 'Renamed'
+        self.activity.save()
+
+        assert versioned_cache.version(namespace) == page + 1
+        assert versioned_cache.version(other) == other_page
+
+
+@pytest.mark.integration
+class TestSummarySignals(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory.create(username='test1')
+        self.fast = ActivityFactory.create(max_speed=10, distance=1000,
+                                           user=self.user)
+        self.hidden = ActivityFactory.create(max_speed=12, distance=500,
+                                             private=True, user=self.user)
+
+    def summary(self, category='SL'):
+        return UserCategorySummary.objects.filter(
+            user=self.user, category=category).first()
+
+    def test_public_and_private_totals(self):
+        summary = self.summary()
+
+        assert (summary.public_count, summary.public_max_speed,
+                summary.public_distance) == (1, 10, 1000)
+        assert (summary.private_count, summary.private_max_speed,
+                summary.private_distance) == (1, 12, 500)
+        assert summary.totals(False) == dict(
+            category='SL', count=1, max_speed=10, total_dist=1000)
+        assert summary.totals(True) == dict(
+            category='SL', count=2, max_speed=12, total_dist=1500)
+
+    def test_new_activity_without_stats_is_counted(self):
+        ActivityFactory.create(user=self.user)
+
+        assert self.summary().public_count == 2
+        assert self.summary().public_max_speed == 10
+
+    def test_privacy_change_moves_totals(self):
+        self.hidden.private = False
+        self.hidden.save()
+
+        summary = self.summary()
+        assert (summary.public_count, summary.private_count) == (2, 0)
+        assert summary.private_max_speed is None
+        assert summary.private_distance == 0
+
+    def test_category_change_moves_totals(self):
+        self.fast.category = 'WS'
+        self.fast.save()
+
+        assert self.summary().public_count == 0
+        assert self.summary('WS').public_distance == 1000
+
+    def test_stats_change_updates_max_speed(self):
+        self.fast.max_speed = 4
+        self.fast.save()
+
+        assert self.summary().public_max_speed == 4
+
+    def test_deleting_last_activity_drops_summary(self):
+        self.fast.delete()
+        assert self.summary().public_count == 0
+
+        self.hidden.delete()
+        assert self.summary() is None
+
+    def test_rebuild(self):
+        UserCategorySummary.objects.all().delete()
+
+        assert UserCategorySummary.rebuild() == 1
+
+        assert self.summary().totals(True)['count'] == 2
+
+
+@pytest.mark.integration
+class TestFeedSignals(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory.create(username='test1')
+        self.other = UserFactory.create(username='test2')
+        self.start = datetime(2017, 1, 18, tzinfo=pytz.UTC)
+        self.activity = ActivityFactory.create(user=self.user,
+                                               start=self.start)
+
+    def feed(self, user):
+        return list(get_activities_for_user(user))
+
+    def test_unfinalized_activity_is_not_on_feed(self):
+        self.activity.private = True
+        self.activity.save()
+        ActivityFactory.create(user=self.other, start=self.start)
+
+        assert not FeedEntry.objects.exists()
+        assert self.feed(self.user) == []
+        assert self.feed(self.other) == []
+        assert self.feed(AnonymousUser()) == []
+
+    def test_finalized_activity_is_added(self):
+        self.activity.name = 'Sail'
+        self.activity.save()
+
+        entry = FeedEntry.objects.get()
+        assert (entry.activity, entry.start, entry.owner) == \
+            (self.activity, self.start, None)
+        assert self.feed(AnonymousUser()) == [self.activity]
+
+    def test_private_activity_is_only_on_owners_feed(self):
+        self.activity.name = 'Sail'
+        self.activity.private = True
+        self.activity.save()
+
+        assert FeedEntry.objects.get().owner == self.user
+        assert self.feed(self.user) == [self.activity]
+        assert self.feed(self.other) == []
+        assert self.feed(AnonymousUser()) == []
+
+    def test_start_change_moves_entry(self):
+        self.activity.name = 'Sail'
+        self.activity.save()
+        later = datetime(2017, 2, 1, tzinfo=pytz.UTC)
+
+        self.activity.start = later
+        self.activity.save()
+
+        assert FeedEntry.objects.get().start == later
+
+    def test_deleted_activity_is_removed(self):
+        self.activity.name = 'Sail'
+        self.activity.save()
+
+        self.activity.delete()
+
+        assert not FeedEntry.objects.exists()
+
+
+@pytest.mark.integration
+class TestSitemapSignals(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory.create(username='test1')
+        self.activity = ActivityFactory.create(user=self.user)
+        SitemapPage.objects.update(stale=False)
+
+    def stale(self):
+        return set(SitemapPage.objects.filter(stale=True).values_list(
+            'section', 'page'))
+
+    def test_new_activities_and_users_are_marked(self):
+        SitemapPage.objects.all().delete()
+
+        ActivityFactory.create(user=UserFactory.create(username='test2'))
+
+        assert self.stale() == {('activities', 0), ('users', 0)}
+
+    def test_public_activity_changes_are_marked(self):
+        self.activity.name = 'Sail'
+        self.activity.save()
+
+        assert self.stale() == {('activities', 0)}
+
+    def test_private_activity_changes_are_not_marked(self):
+        self.activity.private = True
+        self.activity.save()
+        SitemapPage.objects.update(stale=False)
+
+        self.activity.name = 'Sail'
+        self.activity.save()
+
+        assert self.stale() == set()
+
+    def test_deleted_public_activity_is_marked(self):
+        self.activity.delete()
+
+        assert self.stale() == {('activities', 0)}
+
+    def test_user_logins_are_not_marked(self):
+        self.user.last_login = datetime(2017, 1, 18, tzinfo=pytz.UTC)
+        self.user.save()
+
+        assert self.stale() == set()
+
+    def test_deactivated_user_is_marked(self):
+        self.user.is_active = False
+        self.user.save()
+
+        assert self.stale() == {('users', 0)}
@@ -1,12 +1,16 @@
 import unittest
+from datetime import datetime, timedelta
 from unittest.mock import Mock, sentinel, patch, MagicMock
 
 import pytest
-from django.core.exceptions import PermissionDenied
+import pytz
+from django.core.exceptions import PermissionDenied, SuspiciousOperation
 
 from api.views import WindDirection, JSONResponseMixin, BaseJSONView, \
     ActivityJSONView, TrackJSONView, DeleteActivityView, BaseTrackView, \
-    DeleteTrackView, TrimView, UntrimView, TrackJSONMixin, FullTrackJSONView
+    DeleteTrackView, TrimView, UntrimView, TrackJSONMixin, \
+    FullTrackJSONView, SpeedChartMixin, ActivitySpeedChartView, \
+    TrackSpeedChartView, FullTrackSpeedChartView
 
 
 class TestWindDirection(unittest.TestCase):
@@ -239,6 +243,7 @@ class TestTrackJSONMixin:
     def test_return_json_returns_helper_call(self, helper_mock: MagicMock):
         # Given a mixin with mock get_trackpoints
         mixin = TrackJSONMixin()
+        mixin.request = Mock(GET={})
         mixin.get_trackpoints = Mock(return_value=sentinel.tps)
 
         # and helper mock that returns sentinel json
@@ -251,6 +256,160 @@ class TestTrackJSONMixin:
         assert json == sentinel.json
         helper_mock.assert_called_once_with(sentinel.tps)
 
+    def test_get_window_parses_query_params(self):
+        mixin = TrackJSONMixin()
+        mixin.request = Mock(GET=dict(start='2015-01-01T00:00:00+0000',
+                                      end='', every='2', max_points='10'))
+
+        window = mixin.get_window()
+
+        assert window == dict(
+            start=datetime(2015, 1, 1, tzinfo=pytz.UTC),
+            every=2,
+            max_points=10
+        )
+
+    def test_get_window_parses_level_of_detail_params(self):
+        mixin = TrackJSONMixin()
+        mixin.request = Mock(GET=dict(zoom='12', tolerance='25.5',
+                                      bbox='-90,43,-89,44'))
+
+        window = mixin.get_window()
+
+        assert window == dict(zoom=12, tolerance=25.5,
+                              bbox=[-90, 43, -89, 44])
+
+    @pytest.mark.parametrize('params', [
+        dict(start='yesterday'),
+        dict(end='2015-01-01'),
+        dict(every='often'),
+        dict(max_points='0'),
+        dict(tolerance='-1'),
+        dict(zoom='close'),
+        dict(bbox='1,2,3'),
+        dict(bbox='-89,43,-90,44'),
+    ])
+    def test_get_window_raises_on_bad_query_params(self, params):
+        mixin = TrackJSONMixin()
+        mixin.request = Mock(GET=params)
+
+        with pytest.raises(SuspiciousOperation):
+            mixin.get_window()
+
+    @patch('api.views.make_json_from_trackpoints')
+    def test_return_json_filters_to_window(self, helper_mock: MagicMock):
+        # Given a mixin with a windowed request
+        start = datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        end = datetime(2015, 1, 2, tzinfo=pytz.UTC)
+        mixin = TrackJSONMixin()
+        mixin.get_window = Mock(return_value=dict(start=start, end=end))
+        mixin.get_trackpoints = Mock(side_effect=[[1, 2, 3], [4, 5]])
+        helper_mock.return_value = dict(time=[1, 2, 3, 4])
+
+        # When returning json
+        json = mixin.return_json()
+
+        # Then the window is pushed down, and one more trackpoint is used
+        # for the bearings, but not returned
+        assert json == dict(time=[1, 2, 3])
+        assert mixin.get_trackpoints.call_args_list[0][1] == dict(
+            timepoint__gte=start, timepoint__lte=end)
+        assert mixin.get_trackpoints.call_args_list[1][1]['timepoint__gt'] \
+            == end
+        helper_mock.assert_called_once_with([1, 2, 3, 4])
+
+    def test_get_region_filters_from_tolerance_and_bbox(self):
+        filters = TrackJSONMixin.get_region_filters(
+            dict(tolerance=60, bbox=[-90, 43, -89, 44]))
+
+        assert filters == dict(detail__gte=2, lat__range=(43, 44),
+                               lon__range=(-90, -89))
+
+    def test_get_region_filters_from_zoom(self):
+        # Around 19m pixels at zoom 13
+        filters = TrackJSONMixin.get_region_filters(dict(zoom=13))
+
+        assert filters == dict(detail__gte=1)
+
+    def test_get_region_filters_at_full_resolution(self):
+        assert TrackJSONMixin.get_region_filters(dict(tolerance=1)) == {}
+        assert TrackJSONMixin.get_region_filters(dict(every=2)) == {}
+
+    @patch('api.views.make_json_from_trackpoints')
+    def test_return_json_applies_region_to_lookahead(self, helper_mock):
+        end = datetime(2015, 1, 2, tzinfo=pytz.UTC)
+        mixin = TrackJSONMixin()
+        mixin.get_window = Mock(return_value=dict(end=end, tolerance=60))
+        mixin.get_trackpoints = Mock(side_effect=[[1], [2]])
+        helper_mock.return_value = dict(time=[1, 2])
+
+        json = mixin.return_json()
+
+        assert json == dict(time=[1])
+        for call in mixin.get_trackpoints.call_args_list:
+            assert call[1]['detail__gte'] == 2
+
+    @patch('api.views.make_json_from_trackpoints')
+    def test_return_json_subsamples(self, helper_mock: MagicMock):
+        mixin = TrackJSONMixin()
+        mixin.get_window = Mock(return_value=dict(every=2, max_points=3))
+        mixin.get_trackpoints = Mock(return_value=list(range(10)))
+        helper_mock.return_value = dict(time=list(range(10)))
+
+        json = mixin.return_json()
+
+        assert json == dict(time=[0, 4, 8])
+        mixin.get_trackpoints.assert_called_once_with()
+
+    def test_return_json_with_empty_window(self):
+        mixin = TrackJSONMixin()
+        mixin.get_window = Mock(return_value=dict(every=2))
+        mixin.get_trackpoints = Mock(return_value=[])
+
+        json = mixin.return_json()
+
+        assert json['time'] == []
+
+    @pytest.mark.parametrize('get, accept, expected', [
+        ({}, '', False),
+        ({}, 'application/json', False),
+        ({'format': 'binary'}, '', True),
+        ({}, 'application/vnd.sailtrail.track', True),
+    ])
+    def test_wants_binary(self, get, accept, expected):
+        mixin = TrackJSONMixin()
+        mixin.request = Mock(GET=get, META=dict(HTTP_ACCEPT=accept))
+
+        assert mixin.wants_binary() is expected
+
+    @patch('api.views.encode_track')
+    def test_render_to_response_encodes_binary(self, encode_mock):
+        class TestView(TrackJSONMixin, BaseJSONView):
+            data_field = 'pos'
+
+        view = TestView()
+        view.wants_binary = Mock(return_value=True)
+        encode_mock.return_value = b'encoded'
+
+        response = view.render_to_response(dict(pos=sentinel.data))
+
+        encode_mock.assert_called_once_with(sentinel.data)
+        assert response.content == b'encoded'
+        assert response['Content-Type'] == 'application/vnd.sailtrail.track'
+        assert response['Vary'] == 'Accept'
+
+    def test_render_to_response_defaults_to_json(self):
+        class TestView(TrackJSONMixin, BaseJSONView):
+            data_field = 'pos'
+
+        view = TestView()
+        view.wants_binary = Mock(return_value=False)
+
+        response = view.render_to_response(dict(pos=dict(time=[])))
+
+        assert response['Content-Type'] == 'application/json'
+        assert response['Vary'] == 'Accept'
+
 
 class TestActivityJSONView:
 
@@ -290,6 +449,20 @@ class TestTrackJSONView:
         trackpoints.get_trackpoints.return_value.values.\
             assert_called_once_with('sog', 'lat', 'lon', 'timepoint')
 
+    def test_get_trackpoints_applies_filters(self):
+        track = Mock()
+        filtered = track.get_trackpoints.return_value.filter.return_value
+        filtered.values.return_value = [sentinel.tp1]
+
+        view = TrackJSONView()
+        view.get_object = Mock(return_value=track)
+
+        tps = view.get_trackpoints(timepoint__gte=sentinel.start)
+
+        assert tps == [sentinel.tp1]
+        track.get_trackpoints.return_value.filter.assert_called_once_with(
+            timepoint__gte=sentinel.start)
+
 
 class TestFullTrackJSONView:
 
@@ -312,6 +485,141 @@ class TestFullTrackJSONView:
             assert_called_once_with('sog', 'lat', 'lon', 'timepoint')
 
 
+def make_chart_view(**params):
+    view = TrackSpeedChartView()
+    view.request = Mock(GET=params)
+    view.object = Mock(pk=1, trim_start=1, trim_end=2)
+    return view
+
+
+def make_speed_trackpoints(speeds):
+    start = datetime(2015, 1, 1, tzinfo=pytz.UTC)
+    return [dict(sog=x, timepoint=start + timedelta(seconds=i))
+            for i, x in enumerate(speeds)]
+
+
+class TestSpeedChartMixin:
+
+    def test_get_trim_state_raises(self):
+        with pytest.raises(NotImplementedError):
+            SpeedChartMixin().get_trim_state()
+
+    def test_never_binary(self):
+        assert SpeedChartMixin().wants_binary() is False
+
+    def test_get_chart_params_defaults(self):
+        view = make_chart_view()
+
+        assert view.get_chart_params() == dict(width=1000, method='lttb',
+                                               start=None, end=None)
+
+    def test_get_chart_params(self):
+        view = make_chart_view(width='500', method='minmax',
+                               start='2015-01-01T00:00:00+0000')
+
+        assert view.get_chart_params() == dict(
+            width=500, method='minmax',
+            start=datetime(2015, 1, 1, tzinfo=pytz.UTC), end=None)
+
+    @pytest.mark.parametrize('params', [
+        dict(width='wide'),
+        dict(width='0'),
+        dict(width='100000'),
+        dict(method='average'),
+    ])
+    def test_get_chart_params_raises_on_bad_params(self, params):
+        view = make_chart_view(**params)
+
+        with pytest.raises(SuspiciousOperation):
+            view.get_chart_params()
+
+    @patch('api.views.cache')
+    def test_return_json_caches_by_trim_state(self, cache_mock):
+        view = make_chart_view()
+        view.make_chart = Mock(return_value=sentinel.chart)
+        cache_mock.get.return_value = None
+
+        chart = view.return_json()
+
+        assert chart == sentinel.chart
+        key = cache_mock.get.call_args[0][0]
+        assert key.startswith('speed-chart:ActivityTrack:1:')
+        cache_mock.set.assert_called_once_with(key, sentinel.chart,
+                                               60 * 60 * 24)
+
+    @patch('api.views.cache')
+    def test_return_json_key_changes_with_trim_state(self, cache_mock):
+        view = make_chart_view()
+        view.make_chart = Mock()
+        cache_mock.get.return_value = None
+
+        view.return_json()
+        view.object.trim_end = 3
+        view.return_json()
+
+        first, second = cache_mock.get.call_args_list
+        assert first != second
+
+    @patch('api.views.cache')
+    def test_return_json_uses_cached_chart(self, cache_mock):
+        view = make_chart_view()
+        view.make_chart = Mock()
+        cache_mock.get.return_value = sentinel.chart
+
+        assert view.return_json() == sentinel.chart
+        view.make_chart.assert_not_called()
+
+    def test_make_chart_lttb(self):
+        view = make_chart_view()
+        view.get_trackpoints = Mock(return_value=make_speed_trackpoints(
+            [1, 1, 5, 1, 1]))
+
+        chart = view.make_chart(3, 'lttb', end=sentinel.end)
+
+        view.get_trackpoints.assert_called_once_with(
+            timepoint__lte=sentinel.end)
+        assert chart['speed'] == [1.94, 9.72, 1.94]
+        assert chart['time'][1] == '2015-01-01T00:00:02+0000'
+
+    def test_make_chart_minmax(self):
+        view = make_chart_view()
+        view.get_trackpoints = Mock(return_value=make_speed_trackpoints(
+            [1, 2, 3, 4, 5]))
+
+        chart = view.make_chart(2, 'minmax')
+
+        assert chart['time'] == ['2015-01-01T00:00:00+0000',
+                                 '2015-01-01T00:00:02+0000']
+        assert chart['min'] == [1.94, 5.83]
+        assert chart['max'] == [3.89, 9.72]
+        assert chart['mean'] == [2.92, 7.78]
+
+
+class TestSpeedChartViews:
+
+    def test_activity_trim_state_covers_all_tracks(self):
+        view = ActivitySpeedChartView()
+        view.object = Mock()
+        view.object.tracks.all.return_value = [
+            Mock(id=1, trim_start=2, trim_end=3),
+            Mock(id=4, trim_start=5, trim_end=6),
+        ]
+
+        assert view.get_trim_state() == '1:2:3,4:5:6'
+
+    def test_track_trim_state(self):
+        view = TrackSpeedChartView()
+        view.object = Mock(trim_start=2, trim_end=3)
+
+        assert view.get_trim_state() == '2:3'
+
+    def test_full_track_trim_state_ignores_trim(self):
+        view = FullTrackSpeedChartView()
+        view.object = Mock(trim_start=2, trim_end=3)
+
+        assert view.get_trim_state() == 'full'
+
+
 class TestDeleteActivityView:
 
     @patch('api.views.BaseDetailView.get_object')
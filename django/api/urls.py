@@ -24,6 +24,12 @@ urlpatterns = [
     url(r'activity/(?P<activity_id>\d+)/tracks/(?P<pk>\d+)/full_json$',
         views.FullTrackJSONView.as_view(),
         name="full_track_json"),
+    url(r'activity/(?P<activity_id>\d+)/tracks/(?P<pk>\d+)/speed_chart$',
+        views.TrackSpeedChartView.as_view(),
+        name="track_speed_chart"),
+    url(r'activity/(?P<activity_id>\d+)/tracks/(?P<pk>\d+)/full_speed_chart$',
+        views.FullTrackSpeedChartView.as_view(),
+        name="full_track_speed_chart"),
 
     url(r'activity/(?P<pk>\d+)/delete$',
         login_required(views.DeleteActivityView.as_view()),
@@ -32,6 +38,9 @@ urlpatterns = [
     url(r'activity/(?P<pk>\d+)/json$',
         views.ActivityJSONView.as_view(),
         name='activity_json'),
+    url(r'activity/(?P<pk>\d+)/speed_chart$',
+        views.ActivitySpeedChartView.as_view(),
+        name='activity_speed_chart'),
 
 
     url(r'activities/(?P<pk>\d+)/wind_direction$',
@@ -1,20 +1,41 @@
 """Activity view module"""
+import hashlib
 import json
+from datetime import datetime as dt, timedelta
 
-from django.core.exceptions import PermissionDenied
+import numpy as np
+
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, SuspiciousOperation
 from django.http import HttpResponse, HttpRequest, JsonResponse
 from django.shortcuts import redirect
+from django.utils.cache import patch_vary_headers
 from django.views.generic.detail import BaseDetailView
 
-from analysis.track_analysis import make_json_from_trackpoints
+from analysis.downsample import bucket_aggregates, lttb
+from analysis.filters import seconds_since_start
+from analysis.pyramid import detail_for_tolerance, zoom_to_tolerance
+from analysis.track_analysis import (format_timepoints,
+                                     make_json_from_trackpoints,
+                                     speed_factor)
+from analysis.track_encoding import CONTENT_TYPE, encode_track
 from api.helper import verify_private_owner
 from api.models import Activity, ActivityTrack
+from core import DATETIME_FORMAT_STR
 from core.forms import (ERROR_NO_UPLOAD_FILE_SELECTED,
                         ERROR_UNSUPPORTED_FILE_TYPE)
 
 ERRORS = dict(no_file=ERROR_NO_UPLOAD_FILE_SELECTED,
               bad_file_type=ERROR_UNSUPPORTED_FILE_TYPE)
 
+# How far past the end of a time window to look for the trackpoint needed
+# to compute the bearing of the final trackpoint in the window
+WINDOW_LOOKAHEAD = timedelta(minutes=1)
+
+DEFAULT_CHART_WIDTH = 1000  # px
+MAX_CHART_WIDTH = 10000  # px
+SPEED_CHART_CACHE_TIMEOUT = 60 * 60 * 24  # s
+
 
 class WindDirection(BaseDetailView):
     """Wind direction handler"""
@@ -83,15 +104,137 @@ class BaseJSONView(JSONResponseMixin, BaseDetailView):
 
 
 class TrackJSONMixin(object):
-    """Mixin to handle the conversion of trackpoint data to desired output"""
+    """Mixin to handle the conversion of trackpoint data to desired output
+
+    The output can be limited to a window of the track with the optional
+    query parameters:
+
+    start, end
+        Only include trackpoints in this time range, formatted like the
+        times in the output
+    every
+        Only include every n-th trackpoint
+    max_points
+        Include at most this many trackpoints, evenly spaced
+    tolerance
+        Only include the precomputed level of detail (see `analysis.pyramid`)
+        that is simplified to within this many meters
+    zoom
+        As tolerance, with the tolerance set to the size of a pixel at this
+        map zoom level
+    bbox
+        Only include trackpoints in this min_lon,min_lat,max_lon,max_lat
+        bounding box
+
+    The response is JSON, unless the binary track encoding (see
+    `analysis.track_encoding`) is asked for with the Accept header, or
+    format=binary.
+    """
+
+    def get_trackpoints(self, **filters):
+        """Return the specific trackpoints to include
 
-    def get_trackpoints(self):
-        """Return the specific trackpoints to include"""
+        Parameters
+        ----------
+        filters
+            Optional lookups to filter the trackpoints by, e.g. timepoint__gte
+        """
         raise NotImplementedError("Sub-classes must implement this method")
 
+    def get_window(self) -> dict:
+        """Parse the window query parameters, omitting any not given"""
+        window = {}
+        params = self.request.GET
+        try:
+            for name in ('start', 'end'):
+                if params.get(name):
+                    window[name] = dt.strptime(params[name],
+                                               DATETIME_FORMAT_STR)
+            for name in ('every', 'max_points'):
+                if params.get(name):
+                    window[name] = int(params[name])
+                    if window[name] < 1:
+                        raise ValueError('{} must be positive'.format(name))
+            for name in ('tolerance', 'zoom'):
+                if params.get(name):
+                    window[name] = float(params[name])
+            if window.get('tolerance', 0) < 0:
+                raise ValueError('tolerance must not be negative')
+            if params.get('bbox'):
+                window['bbox'] = [float(x) for x in params['bbox'].split(',')]
+                if (len(window['bbox']) != 4 or
+                        window['bbox'][0] > window['bbox'][2] or
+                        window['bbox'][1] > window['bbox'][3]):
+                    raise ValueError('bbox must be min_lon,min_lat,'
+                                     'max_lon,max_lat')
+        except ValueError as err:
+            raise SuspiciousOperation('Bad track window ({})'.format(err))
+        return window
+
+    @staticmethod
+    def get_region_filters(window: dict) -> dict:
+        """Get the trackpoint lookups for the level of detail and bbox"""
+        filters = {}
+        lat = 0.0
+        if 'bbox' in window:
+            min_lon, min_lat, max_lon, max_lat = window['bbox']
+            filters['lat__range'] = (min_lat, max_lat)
+            filters['lon__range'] = (min_lon, max_lon)
+            lat = (min_lat + max_lat) / 2
+
+        tolerance = window.get('tolerance')
+        if tolerance is None and 'zoom' in window:
+            tolerance = zoom_to_tolerance(window['zoom'], lat)
+        if tolerance is not None and detail_for_tolerance(tolerance):
+            filters['detail__gte'] = detail_for_tolerance(tolerance)
+        return filters
+
     def return_json(self) -> dict:
         """Helper method to return JSON data for trackpoints"""
-        return make_json_from_trackpoints(self.get_trackpoints())
+        window = self.get_window()
+        if not window:
+            return make_json_from_trackpoints(self.get_trackpoints())
+
+        region = self.get_region_filters(window)
+        filters = dict(region)
+        if 'start' in window:
+            filters['timepoint__gte'] = window['start']
+        if 'end' in window:
+            filters['timepoint__lte'] = window['end']
+        trackpoints = self.get_trackpoints(**filters)
+
+        count = len(trackpoints)
+        if 'end' in window:
+            # Include the trackpoint after the window, so the final bearing
+            # is the same as it is in the unwindowed output
+            trackpoints.extend(self.get_trackpoints(
+                timepoint__gt=window['end'],
+                timepoint__lte=window['end'] + WINDOW_LOOKAHEAD,
+                **region)[:1])
+
+        step = window.get('every', 1)
+        if 'max_points' in window:
+            step = max(step, -(-count // window['max_points']))
+
+        data = make_json_from_trackpoints(trackpoints)
+        return {key: values[:count:step] for key, values in data.items()}
+
+    def wants_binary(self) -> bool:
+        """Whether the client asked for the binary track encoding"""
+        return (self.request.GET.get('format') == 'binary' or
+                CONTENT_TYPE in self.request.META.get('HTTP_ACCEPT', ''))
+
+    def render_to_response(self, context, **response_kwargs):
+        """Render to the binary track encoding if asked for, else JSON"""
+        if self.wants_binary():
+            response = HttpResponse(encode_track(self.get_data(context)),
+                                    content_type=CONTENT_TYPE,
+                                    **response_kwargs)
+        else:
+            response = super(TrackJSONMixin, self).render_to_response(
+                context, **response_kwargs)
+        patch_vary_headers(response, ['Accept'])
+        return response
 
 
 class ActivityJSONView(TrackJSONMixin, BaseJSONView):
@@ -99,9 +242,9 @@ class ActivityJSONView(TrackJSONMixin, BaseJSONView):
     model = Activity
     data_field = 'pos'
 
-    def get_trackpoints(self):
+    def get_trackpoints(self, **filters):
         """Get the activity trackpoints"""
-        return self.get_object().get_trackpoints()
+        return self.get_object().get_trackpoints(**filters)
 
 
 class TrackJSONView(TrackJSONMixin, BaseJSONView):
@@ -109,12 +252,12 @@ class TrackJSONView(TrackJSONMixin, BaseJSONView):
     model = ActivityTrack
     data_field = 'pos'
 
-    def get_trackpoints(self):
+    def get_trackpoints(self, **filters):
         """Get the track trackpoints"""
-        return list(self.get_object().get_trackpoints().values('sog',
-                                                               'lat',
-                                                               'lon',
-                                                               'timepoint'))
+        trackpoints = self.get_object().get_trackpoints()
+        if filters:
+            trackpoints = trackpoints.filter(**filters)
+        return list(trackpoints.values('sog', 'lat', 'lon', 'timepoint'))
 
 
 class FullTrackJSONView(TrackJSONMixin, BaseJSONView):
@@ -122,12 +265,124 @@ class FullTrackJSONView(TrackJSONMixin, BaseJSONView):
     model = ActivityTrack
     data_field = 'pos'
 
-    def get_trackpoints(self):
+    def get_trackpoints(self, **filters):
         """Get the track trackpoints"""
         trackpoints = self.get_object().get_trackpoints(filtered=False)
+        if filters:
+            trackpoints = trackpoints.filter(**filters)
         return list(trackpoints.values('sog', 'lat', 'lon', 'timepoint'))
 
 
+class SpeedChartMixin(object):
+    """Mixin to serve the speed over time, downsampled for a chart
+
+    Takes the optional query parameters:
+
+    width
+        Width of the chart in pixels, the number of points (or buckets)
+        returned
+    start, end
+        Only include this time range, formatted like the times in the output
+    method
+        'lttb' (default) to return the time and speed of a representative
+        trackpoint per pixel, or 'minmax' to return the time of the first
+        trackpoint, and the min, max and mean speed, of each pixel
+
+    Results are cached per trim state, so they are recomputed after a trim.
+    """
+
+    def get_trim_state(self) -> str:
+        """Describe the trim state of the object, for the cache key"""
+        raise NotImplementedError("Sub-classes must implement this method")
+
+    def wants_binary(self) -> bool:
+        """The binary track encoding doesn't apply to the chart data"""
+        return False
+
+    def get_chart_params(self) -> dict:
+        """Parse the chart query parameters, filling in the defaults"""
+        params = self.request.GET
+        window = self.get_window()
+        try:
+            width = int(params.get('width') or DEFAULT_CHART_WIDTH)
+        except ValueError as err:
+            raise SuspiciousOperation('Bad chart width ({})'.format(err))
+        method = params.get('method') or 'lttb'
+        if not 1 <= width <= MAX_CHART_WIDTH or \
+                method not in ('lttb', 'minmax'):
+            raise SuspiciousOperation('Bad chart parameters')
+        return dict(width=width, method=method, start=window.get('start'),
+                    end=window.get('end'))
+
+    def return_json(self) -> dict:
+        """Return the downsampled chart data, from the cache if possible"""
+        params = self.get_chart_params()
+        # Hash the variable parts, to keep the key short and memcached safe
+        state = '{}|{}'.format(self.get_trim_state(), sorted(params.items()))
+        key = 'speed-chart:{}:{}:{}'.format(
+            self.model.__name__, self.object.pk,
+            hashlib.md5(state.encode()).hexdigest())
+        data = cache.get(key)
+        if data is None:
+            data = self.make_chart(**params)
+            cache.set(key, data, SPEED_CHART_CACHE_TIMEOUT)
+        return data
+
+    def make_chart(self, width, method, start=None, end=None) -> dict:
+        """Downsample the speeds of the trackpoints"""
+        filters = {}
+        if start is not None:
+            filters['timepoint__gte'] = start
+        if end is not None:
+            filters['timepoint__lte'] = end
+        trackpoints = self.get_trackpoints(**filters)
+
+        timepoints = [x['timepoint'] for x in trackpoints]
+        seconds = seconds_since_start(timepoints)
+        speeds = np.asarray([x['sog'] for x in trackpoints],
+                            dtype=float) * speed_factor()
+
+        if method == 'minmax':
+            buckets = bucket_aggregates(seconds, speeds, width)
+            return dict(time=format_timepoints(
+                            [timepoints[x] for x in buckets['index']]),
+                        min=np.round(buckets['min'], 2).tolist(),
+                        max=np.round(buckets['max'], 2).tolist(),
+                        mean=np.round(buckets['mean'], 2).tolist())
+
+        kept = lttb(seconds, speeds, width)
+        return dict(time=format_timepoints([timepoints[x] for x in kept]),
+                    speed=np.round(speeds[kept], 2).tolist())
+
+
+class ActivitySpeedChartView(SpeedChartMixin, ActivityJSONView):
+    """Activity speed chart JSON view"""
+    data_field = 'chart'
+
+    def get_trim_state(self) -> str:
+        """Describe the trim of every track of the activity"""
+        return ','.join('{}:{}:{}'.format(x.id, x.trim_start, x.trim_end)
+                        for x in self.object.tracks.all())
+
+
+class TrackSpeedChartView(SpeedChartMixin, TrackJSONView):
+    """Track speed chart JSON view"""
+    data_field = 'chart'
+
+    def get_trim_state(self) -> str:
+        """Describe the trim of the track"""
+        return '{}:{}'.format(self.object.trim_start, self.object.trim_end)
+
+
+class FullTrackSpeedChartView(SpeedChartMixin, FullTrackJSONView):
+    """Untrimmed track speed chart JSON view"""
+    data_field = 'chart'
+
+    def get_trim_state(self) -> str:
+        """The untrimmed chart doesn't change with the trim"""
+        return 'full'
+
+
 class DeleteActivityView(BaseDetailView):
     """Delete activity view"""
     model = Activity
@@ -0,0 +1,12 @@
+import pytest
+from django.core.cache import caches
+
+from images.storage_urls import resolver
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches, they outlive test transactions"""
+    for cache in caches.all():
+        cache.clear()
+    resolver.clear()
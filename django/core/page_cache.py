@@ -0,0 +1,85 @@
+"""Whole page caching for anonymous visitors
+
+Shared links bring many anonymous visitors to the public pages, who all
+see the same page, so their responses are kept in the versioned cache (see
+api.helper.VersionedCache).  Signed in visitors see their own navigation
+and private activities, so always get a freshly rendered page.
+"""
+import hashlib
+from functools import wraps
+from typing import Callable, Union
+
+from django.core.files.storage import default_storage
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import cc_delim_re, patch_vary_headers
+
+from api.helper import versioned_cache
+from images.storage_urls import url_lifetime
+
+PAGE_CACHE_TIMEOUT = 600  # s
+
+
+def _cacheable(request: HttpRequest, response: HttpResponse) -> bool:
+    """Check the response is the same for every anonymous visitor"""
+    if response.status_code != 200 or response.streaming or \
+            response.cookies or request.META.get('CSRF_COOKIE_USED') or \
+            response.has_header('Set-Cookie'):
+        return False
+    # Only a Vary on Cookie is safe, as every visitor here has the same
+    vary = cc_delim_re.split(response.get('Vary', ''))
+    return all(header.lower() in ('', 'cookie') for header in vary)
+
+
+def cache_anonymous_page(namespace: Union[str, Callable[..., str]],
+                         version: Callable[..., str] = None,
+                         timeout: float = PAGE_CACHE_TIMEOUT) -> Callable:
+    """View decorator caching the whole page for anonymous visitors
+
+    Pages are kept by their full URL, and the version if given, in the
+    namespace of the versioned cache, which the signal handlers bump to
+    purge the pages when their data changes.  Only plain 200 responses
+    are kept, which Vary on Cookie so shared caches don't pass them on to
+    signed in visitors.
+
+    Parameters
+    ----------
+    namespace : str or callable
+        Namespace of the pages, or a function of the request and the view
+        arguments giving it
+    version : callable
+        Function of the request and the view arguments giving the version
+        of the page's data, such as the modified time of its object, or None
+        to skip the cache (such as when the object is missing)
+    timeout : float
+        Most time (s) to keep pages for, capped by the lifetime of the
+        storage URLs they hold
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapped(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            page_version = '' if version is None else \
+                version(request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD') or \
+                    request.user.is_authenticated or page_version is None:
+                return view(request, *args, **kwargs)
+
+            rendered = []
+
+            def render() -> HttpResponse:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+                patch_vary_headers(response, ('Cookie',))
+                rendered.append(response)
+                return response if _cacheable(request, response) else None
+
+            name = namespace(request, *args, **kwargs) \
+                if callable(namespace) else namespace
+            key = 'page:{}'.format(hashlib.md5('{}:{}'.format(
+                request.get_full_path(), page_version).encode()).hexdigest())
+            response = versioned_cache.get_or_set(
+                name, key, render,
+                timeout=min(timeout, url_lifetime(default_storage)))
+            return rendered[0] if rendered else response
+        return wrapped
+    return decorator
@@ -0,0 +1,203 @@
+"""Keyset (cursor) pagination for the activity feeds
+
+Pages are found by seeking past the (start, id) of the last activity shown,
+newest first, rather than counting past an OFFSET, so every page costs the
+same single indexed query.  No COUNT(*) is run, but the total can be
+estimated from the query planner's statistics.
+
+Activities without a start, such as those still being processed or with an
+empty track, sort as newer than any with one, so are listed first.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(start: Optional[datetime], pk: int) -> str:
+    """Get the opaque cursor of the position of an activity"""
+    data = json.dumps([None if start is None else start.isoformat(),
+                       pk]).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Get the (start, pk) position of a cursor
+
+    Raises ValueError for cursors not made by `encode_cursor`."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        text, pk = json.loads(data.decode())
+        start = None if text is None else parse_datetime(text)
+    except (TypeError, ValueError, UnicodeDecodeError) as error:
+        raise ValueError('Bad cursor: {}'.format(cursor)) from error
+    if (start is None and text is not None) or not isinstance(pk, int):
+        raise ValueError('Bad cursor: {}'.format(cursor))
+    return start, pk
+
+
+def estimate_count(queryset: QuerySet) -> Optional[int]:
+    """Estimate the number of rows, from the planner statistics
+
+    Only PostgreSQL keeps the statistics, None is returned elsewhere."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """A page of activities, with the cursors of its neighbours"""
+
+    def __init__(self, object_list: list, next_cursor: str = None,
+                 previous_cursor: str = None, estimated_count: int = None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_count = estimated_count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        """Check for older activities"""
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        """Check for newer activities"""
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        """Check for any other pages"""
+        return self.has_next() or self.has_previous()
+
+
+def _merge(querysets: list, newest_first: bool) -> list:
+    """Get the rows of the querysets, in (start, pk) order"""
+    rows = [row for queryset in querysets for row in queryset]
+    return sorted(rows, key=lambda x: (x.start is None, x.start, x.pk),
+                  reverse=newest_first)
+
+
+def _seek(queryset: QuerySet, keyset: tuple, cursor: Optional[tuple],
+          older: bool) -> list:
+    """Get the activities past the cursor, as querysets in page order
+
+    The activities with and without a start are seeked separately, each
+    on its own range of the index."""
+    start_field, pk_field = keyset
+    dated = queryset.filter(**{start_field + '__isnull': False})
+    undated = queryset.filter(**{start_field + '__isnull': True})
+    if cursor is not None:
+        start, pk = cursor
+        past = '__lt' if older else '__gt'
+        if start is None:
+            undated = undated.filter(**{pk_field + past: pk})
+            dated = dated if older else None
+        else:
+            # The redundant bound starts the index scan at the cursor, as
+            # the OR alone is only a filter on a scan from the end
+            bound = '__lte' if older else '__gte'
+            dated = dated.filter(Q(**{start_field + bound: start}) & (
+                Q(**{start_field + past: start}) |
+                Q(**{start_field: start, pk_field + past: pk})))
+            undated = None if older else undated
+    order = '-' if older else ''
+    return [x.order_by(order + start_field, order + pk_field)
+            for x in (undated, dated) if x is not None]
+
+
+def paginate_keyset(queryset: QuerySet, per_page: int, after: str = None,
+                    before: str = None, keyset: tuple = ('start', 'pk'),
+                    ranges: Sequence[Q] = None) -> KeysetPage:
+    """Get a page of the activities, newest first
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        The activities
+    per_page : int
+        Most activities on the page
+    after : str
+        Cursor of the last activity of the previous (newer) page
+    before : str
+        Cursor of the first activity of the next (older) page
+    keyset : tuple
+        The fields to order and seek on, holding the start and pk of the
+        activities, such as the copies in a table with a matching index
+    ranges : sequence of Q
+        Filters splitting the activities into ranges of the index, such as
+        one per leading column value.  Each range is seeked separately, and
+        the pages merged, so an OR of them doesn't need a sort of them all
+
+    Raises
+    ------
+    ValueError
+        If a cursor is bad
+    """
+    parts = [queryset] if ranges is None else \
+        [queryset.filter(x) for x in ranges]
+    newest_first = before is None
+    cursor = after if newest_first else before
+    if cursor is not None:
+        cursor = decode_cursor(cursor)
+    rows = _merge([seeked[:per_page + 1] for part in parts
+                   for seeked in _seek(part, keyset, cursor, newest_first)],
+                  newest_first=newest_first)
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if newest_first:
+        newer, older = after is not None, more
+    else:
+        rows = rows[::-1]
+        newer, older = more, True
+
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1].start, rows[-1].pk)
+        if older and rows else None,
+        previous_cursor=encode_cursor(rows[0].start, rows[0].pk)
+        if newer and rows else None)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin paging on (start, id) cursors rather than page numbers
+
+    Pages are picked by the `after` and `before` cursor query parameters.
+    Set `keyset` to seek on other copies of the start and pk, and
+    `estimate_count` to add the planner's estimate of the total.  Override
+    `get_keyset_ranges` to seek ranges of the index separately."""
+    keyset = ('start', 'pk')
+    estimate_count = False
+
+    def get_keyset_ranges(self) -> Optional[Sequence[Q]]:
+        """Get the index ranges to seek separately, None for one"""
+        return None
+
+    def paginate_queryset(self, queryset: QuerySet, page_size: int) -> tuple:
+        """Get the page of the request, in the form ListView expects"""
+        try:
+            page = paginate_keyset(queryset, page_size,
+                                   after=self.request.GET.get('after'),
+                                   before=self.request.GET.get('before'),
+                                   keyset=self.keyset,
+                                   ranges=self.get_keyset_ranges())
+        except ValueError:
+            raise Http404('Invalid page')
+        if self.estimate_count:
+            page.estimated_count = estimate_count(queryset)
+        return None, page, page.object_list, page.has_other_pages()
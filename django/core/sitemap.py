@@ -1,8 +1,40 @@
 """Sitemap related data"""
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Max, QuerySet
+
+SITEMAP_PAGE_SIZE = 5000  # pks per page, each page is a sitemap file
+
+
+def sitemap_page(pk: int) -> int:
+    """Get the page of the sitemap files that lists the object with the pk"""
+    return (pk - 1) // SITEMAP_PAGE_SIZE
 
 
 class SailtrailSitemap(Sitemap):
-    """Base sitemap settings"""
+    """Base sitemap settings
+
+    Sections with many objects are `paged`, split by pk range into pages
+    of SITEMAP_PAGE_SIZE, so a change to an object only rewrites the file
+    of its page.  The items of a paged section are limited to the `page`
+    given, if any, by `page_items`."""
     priority = 0.5
     protocol = 'https'
+    paged = False
+
+    def __init__(self, page: int = None):
+        self.page = page
+
+    def page_items(self, items: QuerySet) -> QuerySet:
+        """Limit the items to the pk range of the page, if set"""
+        if self.page is None:
+            return items
+        return items.filter(pk__gt=self.page * SITEMAP_PAGE_SIZE,
+                            pk__lte=(self.page + 1) * SITEMAP_PAGE_SIZE
+                            ).order_by('pk')
+
+    def pages(self) -> range:
+        """Get the pages of the section"""
+        if not self.paged:
+            return range(1)
+        last = self.items().aggregate(last=Max('pk'))['last']
+        return range(0 if last is None else sitemap_page(last) + 1)
@@ -0,0 +1,114 @@
+"""Static, gzipped sitemap files
+
+Rather than listing every public activity and user on each crawler hit,
+the sitemap is written to storage as a file per page of each section (see
+core.sitemap), with an index of the files.  Only the pages marked stale
+(see api.models.SitemapPage) are rewritten, by `update_sitemaps`, which the
+update_sitemaps command runs.
+"""
+import gzip
+import posixpath
+
+from django.contrib.sites.models import Site
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage, default_storage
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from activities.sitemap import ActivitySitemap
+from api.models import SitemapPage
+from core.sitemap import SailtrailSitemap
+from leaders.sitemap import LeaderboardSitemap
+from users.sitemap import UsersSitemap
+
+SITEMAPS = {'activities': ActivitySitemap,
+            'leaderboards': LeaderboardSitemap,
+            'users': UsersSitemap,
+            }
+INDEX = 'index'  # section of the index, which has the one page
+SITEMAP_DIR = 'sitemaps'
+
+
+def sitemap_path(section: str, page: int = 0) -> str:
+    """Get the storage name of the file of a page of a section"""
+    if section == INDEX:
+        return posixpath.join(SITEMAP_DIR, 'sitemap.xml.gz')
+    return posixpath.join(SITEMAP_DIR, '{}-{}.xml.gz'.format(section, page))
+
+
+def sitemap_url(site: Site, section: str, page: int = 0) -> str:
+    """Get the full URL of a page of a section"""
+    if section == INDEX:
+        path = reverse('sitemap')
+    else:
+        path = reverse('sitemap_page', args=[section, page])
+    return '{}://{}{}'.format(SailtrailSitemap.protocol, site.domain, path)
+
+
+def _write(storage: Storage, name: str, content: str = None) -> None:
+    """Replace the named file with the gzipped content, delete if None"""
+    if storage.exists(name):
+        storage.delete(name)
+    if content is not None:
+        storage.save(name, ContentFile(gzip.compress(content.encode())))
+
+
+def write_page(page: SitemapPage, site: Site,
+               storage: Storage = default_storage) -> None:
+    """Rewrite the file of the page, deleting it if the page is empty"""
+    # Clear the mark first, so changes made while writing mark it again
+    SitemapPage.objects.filter(pk=page.pk).update(stale=False)
+    sitemap = SITEMAPS[page.section](page=page.page)
+    urls = sitemap.get_urls(site=site)
+    _write(storage, sitemap_path(page.section, page.page),
+           render_to_string('sitemap.xml', {'urlset': urls})
+           if urls else None)
+
+    page.stale = False
+    page.count = len(urls)
+    page.lastmod = getattr(sitemap, 'latest_lastmod', None)
+    page.written = timezone.now()
+    page.save(update_fields=['stale', 'count', 'lastmod', 'written'])
+
+
+def write_index(site: Site, storage: Storage = default_storage) -> None:
+    """Rewrite the index of the files of the non-empty pages"""
+    pages = [dict(location=sitemap_url(site, page.section, page.page),
+                  lastmod=page.written)
+             for page in SitemapPage.objects.filter(count__gt=0).exclude(
+                 section=INDEX).order_by('section', 'page')]
+    _write(storage, sitemap_path(INDEX),
+           render_to_string('sitemap_files_index.xml', {'pages': pages}))
+    SitemapPage.objects.update_or_create(
+        section=INDEX, page=0, defaults=dict(
+            stale=False, count=len(pages), written=timezone.now()))
+
+
+def update_sitemaps(rebuild: bool = False,
+                    storage: Storage = default_storage) -> int:
+    """Rewrite the stale pages, and the index if any were
+
+    Parameters
+    ----------
+    rebuild : bool
+        Rewrite every page of every section, rather than only stale pages
+    storage : Storage
+        Where the files are written
+
+    Returns the number of pages written.
+    """
+    if rebuild:
+        SitemapPage.objects.update(stale=True)
+        for section, sitemap in SITEMAPS.items():
+            for page in sitemap().pages():
+                SitemapPage.mark_stale(section, page)
+
+    site = Site.objects.get_current()
+    stale = list(SitemapPage.objects.filter(stale=True).exclude(
+        section=INDEX))
+    for page in stale:
+        write_page(page, site, storage)
+    if stale or not SitemapPage.objects.filter(section=INDEX).exists():
+        write_index(site, storage)
+    return len(stale)
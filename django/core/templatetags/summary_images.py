@@ -0,0 +1,46 @@
+"""Template tag helpers for showing activity summary images"""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from images.storage_urls import resolver
+from images.variants import variant_name, variant_srcset
+
+register = template.Library()
+
+SUMMARY_MAP_SIZE = 100  # px, as shown in the activity lists
+
+
+def summary_map(activity, size=SUMMARY_MAP_SIZE):
+    """Show the summary image of an activity, at size px
+
+    Lists the image variants in srcsets, WebP first, so browsers fetch the
+    smallest one that is sharp at that size.  Images of public activities
+    may be served unsigned, see images.storage_urls."""
+    alt = '{} summary map'.format(activity.name)
+    if not activity.summary_image:
+        return format_html(
+            '<img src="{}" alt="{}" class="activity-summary-map">',
+            static('activities/gray.jpg'), alt)
+
+    storage = activity.summary_image.storage
+    name = activity.summary_image.name
+    public = not activity.private
+    if not activity.summary_variants:
+        # Made before the variants, until regenerate_summary_images is run
+        return format_html(
+            '<img src="{}" alt="{}" class="activity-summary-map">',
+            resolver.url(storage, name, public), alt)
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" alt="{}" class="activity-summary-map">'
+        '</picture>',
+        variant_srcset(storage, name, 'webp', size, public),
+        resolver.url(storage, variant_name(name, 'small', 'png'), public),
+        variant_srcset(storage, name, 'png', size, public),
+        alt)
+
+
+register.simple_tag(summary_map)
@@ -0,0 +1,55 @@
+"""Template tag for caching page fragments in the versioned cache"""
+import hashlib
+
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.safestring import mark_safe
+
+from api.helper import versioned_cache
+from images.storage_urls import url_lifetime
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    """Render the contents from the versioned cache, if possible"""
+
+    def __init__(self, nodelist, namespace, vary_on):
+        self.nodelist = nodelist
+        self.namespace = namespace
+        self.vary_on = vary_on
+
+    def render(self, context):
+        namespace = self.namespace.resolve(context)
+        # Hash the variable parts, to keep the key short and memcached safe
+        vary_on = ':'.join(str(x.resolve(context)) for x in self.vary_on)
+        key = 'fragment:{}'.format(
+            hashlib.md5(vary_on.encode()).hexdigest())
+        # Fragments hold storage URLs, so must not outlive their signatures
+        return mark_safe(versioned_cache.get_or_set(
+            namespace, key, lambda: self.nodelist.render(context),
+            timeout=url_lifetime(default_storage)))
+
+
+def versioned_cache_tag(parser, token):
+    """Cache the contents in a namespace of the versioned cache
+
+    Usage::
+
+        {% versioned_cache "namespace" [vary_on ...] %}
+            ...
+        {% endversioned_cache %}
+
+    The contents are cached separately for each value of the vary_on
+    variables, and go stale when the namespace version is bumped."""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            "'{}' tag requires at least 1 argument.".format(bits[0]))
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    return VersionedCacheNode(nodelist, parser.compile_filter(bits[1]),
+                              [parser.compile_filter(x) for x in bits[2:]])
+
+
+register.tag('versioned_cache', versioned_cache_tag)
@@ -0,0 +1,161 @@
+from unittest.mock import Mock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from api.helper import versioned_cache
+from api.models import Activity
+from api.tests.factories import ActivityFactory
+from core.page_cache import cache_anonymous_page
+from users.tests.factories import UserFactory
+
+
+class TestCacheAnonymousPage:
+
+    def setup_method(self):
+        self.factory = RequestFactory()
+        self.calls = 0
+
+    def view(self, request, status=200, **headers):
+        self.calls += 1
+        response = HttpResponse('page {}'.format(self.calls), status=status)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def get(self, view, path='/page', user=None, **kwargs):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        return view(request, **kwargs)
+
+    def test_anonymous_pages_are_cached(self):
+        view = cache_anonymous_page('pages')(self.view)
+
+        assert self.get(view).content == b'page 1'
+        response = self.get(view)
+
+        assert response.content == b'page 1'
+        assert response['Vary'] == 'Cookie'
+        assert self.calls == 1
+
+    def test_pages_are_cached_by_url(self):
+        view = cache_anonymous_page('pages')(self.view)
+
+        self.get(view, '/page?page=1')
+        self.get(view, '/page?page=2')
+
+        assert self.calls == 2
+
+    def test_signed_in_visitors_are_not_cached(self):
+        view = cache_anonymous_page('pages')(self.view)
+        user = Mock(is_authenticated=True)
+
+        self.get(view, user=user)
+        response = self.get(view, user=user)
+
+        assert response.content == b'page 2'
+        assert not response.has_header('Vary')
+
+    def test_bump_purges_pages(self):
+        view = cache_anonymous_page('pages')(self.view)
+        self.get(view)
+
+        versioned_cache.bump('pages')
+
+        assert self.get(view).content == b'page 2'
+
+    def test_pages_are_cached_by_version(self):
+        versions = iter(['a', 'a', 'b'])
+        view = cache_anonymous_page(
+            lambda request, pk: 'page-{}'.format(pk),
+            version=lambda request, pk: next(versions))(self.view)
+
+        assert self.get(view, pk=1).content == b'page 1'
+        assert self.get(view, pk=1).content == b'page 1'
+        assert self.get(view, pk=1).content == b'page 2'
+
+    def test_pages_without_a_version_are_not_cached(self):
+        view = cache_anonymous_page(
+            'pages', version=lambda request: None)(self.view)
+
+        self.get(view)
+        self.get(view)
+
+        assert self.calls == 2
+
+    def test_errors_are_not_cached(self):
+        view = cache_anonymous_page('pages')(
+            lambda request: self.view(request, status=404))
+
+        self.get(view)
+        response = self.get(view)
+
+        assert response.status_code == 404
+        assert self.calls == 2
+
+    def test_pages_varying_on_other_headers_are_not_cached(self):
+        view = cache_anonymous_page('pages')(
+            lambda request: self.view(request, Vary='Accept-Language'))
+
+        self.get(view)
+        response = self.get(view)
+
+        assert response['Vary'] == 'Accept-Language, Cookie'
+        assert self.calls == 2
+
+    def test_pages_using_the_csrf_token_are_not_cached(self):
+        def view(request):
+            request.META['CSRF_COOKIE_USED'] = True
+            return self.view(request)
+        view = cache_anonymous_page('pages')(view)
+
+        self.get(view)
+        self.get(view)
+
+        assert self.calls == 2
+
+    def test_template_responses_are_rendered(self):
+        view = cache_anonymous_page('pages')(
+            lambda request: SimpleTemplateResponse(
+                engines['django'].from_string('rendered')))
+
+        self.get(view)
+
+        assert self.get(view).content == b'rendered'
+
+
+@pytest.mark.integration
+class TestUserPageCache(TestCase):
+
+    def setUp(self):
+        self.activity = ActivityFactory.create(name='Regatta',
+                                               start=timezone.now())
+        self.url = '/users/{}/'.format(self.activity.user.username)
+
+    def test_anonymous_page_is_purged_on_change(self):
+        assert b'Regatta' in self.client.get(self.url).content
+
+        # Changes skipping the signals leave the cached page
+        Activity.objects.filter(pk=self.activity.pk).update(name='Skipped')
+        assert b'Regatta' in self.client.get(self.url).content
+
+        self.activity.name = 'Crossing'
+        self.activity.save()
+
+        assert b'Crossing' in self.client.get(self.url).content
+
+    def test_private_activities_are_only_shown_to_the_owner(self):
+        self.activity.private = True
+        self.activity.save()
+        assert b'Regatta' not in self.client.get(self.url).content
+
+        self.client.force_login(self.activity.user)
+        assert b'Regatta' in self.client.get(self.url).content
+
+        self.client.force_login(UserFactory.create(username='other'))
+        assert b'Regatta' not in self.client.get(self.url).content
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import pytest
+import pytz
+from django.db.models import Q
+from django.http import Http404
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Activity
+from api.tests.factories import ActivityFactory
+from core.pagination import (KeysetPaginationMixin, decode_cursor,
+                             encode_cursor, estimate_count, paginate_keyset)
+
+START = datetime(2017, 1, 18, 12, tzinfo=pytz.UTC)
+
+
+class TestCursors:
+
+    def test_round_trip(self):
+        cursor = encode_cursor(START, 42)
+
+        assert '=' not in cursor
+        assert decode_cursor(cursor) == (START, 42)
+
+    def test_round_trip_without_start(self):
+        assert decode_cursor(encode_cursor(None, 42)) == (None, 42)
+
+    @pytest.mark.parametrize('cursor', ['', 'nonsense', '!!', 'WzEsMl0',
+                                        encode_cursor(START, 1)[:-4]])
+    def test_bad_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestKeysetPaginationMixin:
+
+    @patch('core.pagination.paginate_keyset')
+    def test_bad_cursor_is_not_found(self, paginate_mock):
+        paginate_mock.side_effect = ValueError
+        view = KeysetPaginationMixin()
+        view.request = Mock(GET=dict(after='bad'))
+
+        with pytest.raises(Http404):
+            view.paginate_queryset(Mock(), 10)
+
+    @patch('core.pagination.estimate_count')
+    @patch('core.pagination.paginate_keyset')
+    def test_returns_page_for_list_view(self, paginate_mock, estimate_mock):
+        page = paginate_mock.return_value
+        view = KeysetPaginationMixin()
+        view.estimate_count = True
+        view.request = Mock(GET=dict(after='cursor'))
+
+        result = view.paginate_queryset(Mock(), 10)
+
+        assert result == (None, page, page.object_list,
+                          page.has_other_pages.return_value)
+        assert page.estimated_count == estimate_mock.return_value
+        assert paginate_mock.call_args[1] == dict(
+            after='cursor', before=None, keyset=('start', 'pk'), ranges=None)
+
+
+@pytest.mark.integration
+class TestPaginateKeyset(TestCase):
+
+    def setUp(self):
+        # Two activities share each start, to check ties are kept in order
+        self.activities = [
+            ActivityFactory.create(start=START - timedelta(hours=x // 2))
+            for x in range(7)]
+        # Those without a start are listed first
+        self.undated = [ActivityFactory.create(start=None) for _ in range(2)]
+        self.newest_first = self.undated[::-1] + sorted(
+            self.activities, key=lambda x: (x.start, x.pk), reverse=True)
+
+    def test_pages_cover_every_activity_once(self):
+        seen = []
+        page = paginate_keyset(Activity.objects.all(), 3)
+        assert not page.has_previous()
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = paginate_keyset(Activity.objects.all(), 3,
+                                   after=page.next_cursor)
+
+        assert seen == self.newest_first
+        assert page.has_previous()
+
+    def test_previous_page(self):
+        first = paginate_keyset(Activity.objects.all(), 3)
+        second = paginate_keyset(Activity.objects.all(), 3,
+                                 after=first.next_cursor)
+
+        back = paginate_keyset(Activity.objects.all(), 3,
+                               before=second.previous_cursor)
+
+        assert list(back) == list(first)
+        assert not back.has_previous()
+        assert back.next_cursor == first.next_cursor
+
+    def test_ranges_are_merged(self):
+        everything = self.activities + self.undated
+        ranges = [Q(pk__in=[x.pk for x in everything[::2]]),
+                  Q(pk__in=[x.pk for x in everything[1::2]])]
+        seen = []
+        page = paginate_keyset(Activity.objects.all(), 3, ranges=ranges)
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            last = page
+            page = paginate_keyset(Activity.objects.all(), 3,
+                                   after=page.next_cursor, ranges=ranges)
+
+        assert seen == self.newest_first
+        back = paginate_keyset(Activity.objects.all(), 3,
+                               before=page.previous_cursor, ranges=ranges)
+        assert list(back) == list(last)
+
+    def test_seek_is_bounded_by_the_cursor_start(self):
+        cursor = encode_cursor(START, 42)
+
+        for page, bound in ((dict(after=cursor), '<='),
+                            (dict(before=cursor), '>=')):
+            with CaptureQueriesContext(connection) as queries:
+                paginate_keyset(Activity.objects.all(), 3, **page)
+
+            sql = ' '.join(x['sql'] for x in queries)
+            assert '"api_activity"."start" {} '.format(bound) in sql
+
+    def test_single_page(self):
+        page = paginate_keyset(Activity.objects.all(), 10)
+
+        assert len(page) == 9
+        assert not page.has_other_pages()
+
+    def test_pages_between_undated_activities(self):
+        first = paginate_keyset(Activity.objects.all(), 1)
+        second = paginate_keyset(Activity.objects.all(), 1,
+                                 after=first.next_cursor)
+        third = paginate_keyset(Activity.objects.all(), 1,
+                                after=second.next_cursor)
+
+        assert list(first) + list(second) + list(third) == \
+            self.newest_first[:3]
+        back = paginate_keyset(Activity.objects.all(), 1,
+                               before=third.previous_cursor)
+        assert list(back) == list(second)
+        back = paginate_keyset(Activity.objects.all(), 1,
+                               before=second.previous_cursor)
+        assert list(back) == list(first)
+        assert not back.has_previous()
+
+    def test_estimate_needs_planner_statistics(self):
+        assert estimate_count(Activity.objects.all()) is None
@@ -0,0 +1,30 @@
+from unittest.mock import Mock
+
+from core.sitemap import SailtrailSitemap, sitemap_page
+
+
+class TestSailtrailSitemap:
+
+    def test_sitemap_page(self):
+        assert sitemap_page(1) == 0
+        assert sitemap_page(5000) == 0
+        assert sitemap_page(5001) == 1
+
+    def test_unpaged_sections_have_one_page(self):
+        assert SailtrailSitemap().pages() == range(1)
+
+    def test_pages_cover_the_last_item(self):
+        sitemap = SailtrailSitemap()
+        sitemap.paged = True
+        sitemap.items = Mock()
+        sitemap.items.return_value.aggregate.return_value = dict(last=12000)
+
+        assert sitemap.pages() == range(3)
+
+    def test_paged_section_without_items(self):
+        sitemap = SailtrailSitemap()
+        sitemap.paged = True
+        sitemap.items = Mock()
+        sitemap.items.return_value.aggregate.return_value = dict(last=None)
+
+        assert sitemap.pages() == range(0)
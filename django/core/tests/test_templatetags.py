@@ -1,3 +1,11 @@
+from unittest.mock import Mock, patch
+
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import override_settings
+import pytest
+
+from api.helper import versioned_cache
+from core.templatetags.summary_images import summary_map
 from core.templatetags.unit_conversions import distance, speed, category
 
 
@@ -32,3 +40,99 @@ class TestUnitConversions:
 
     def test_category_returns_no_param_category(self):
         assert category() == "error"
+
+
+class TestSummaryImages:
+
+    def test_summary_map_without_image(self):
+        activity = Mock(summary_image=None)
+        activity.name = 'Race'
+
+        html = summary_map(activity)
+
+        assert html.startswith('<img src="')
+        assert 'gray.jpg' in html
+        assert 'alt="Race summary map"' in html
+
+    def test_summary_map_lists_variants(self):
+        activity = Mock()
+        activity.name = 'Race'
+        activity.summary_image.name = 'summary_images/1-abc.png'
+        activity.summary_image.storage.url.side_effect = \
+            lambda name: '/media/' + name
+        activity.summary_image.storage.querystring_auth = False
+
+        html = summary_map(activity)
+
+        assert html.startswith('<picture><source type="image/webp" '
+                               'srcset="/media/summary_images/1-abc-small.webp'
+                               ' 1x, ')
+        assert 'src="/media/summary_images/1-abc-small.png"' in html
+        assert '/media/summary_images/1-abc-large.png 4x' in html
+        assert 'class="activity-summary-map"' in html
+
+    def test_summary_map_without_variants_shows_image(self):
+        activity = Mock(summary_variants=False)
+        activity.name = 'Race'
+        activity.summary_image.name = 'summary_images/1-abc.png'
+        activity.summary_image.storage.url.side_effect = \
+            lambda name: '/media/' + name
+        activity.summary_image.storage.querystring_auth = False
+
+        html = summary_map(activity)
+
+        assert html == ('<img src="/media/summary_images/1-abc.png" '
+                        'alt="Race summary map" class="activity-summary-map">')
+
+    @override_settings(PUBLIC_MEDIA_URL='https://cdn.example.com/')
+    def test_summary_map_of_public_activity_is_unsigned(self):
+        activity = Mock(private=False)
+        activity.name = 'Race'
+        activity.summary_image.name = 'summary_images/2-abc.png'
+        activity.summary_image.storage.querystring_auth = False
+
+        html = summary_map(activity)
+
+        assert 'src="https://cdn.example.com/summary_images/2-abc-small.png"' \
+            in html
+        activity.summary_image.storage.url.assert_not_called()
+
+
+class TestVersionedCache:
+
+    template = Template('{% load versioned_cache %}'
+                        '{% versioned_cache "ns" page %}'
+                        '{{ name }}{% endversioned_cache %}')
+
+    def render(self, **context):
+        return self.template.render(Context(context))
+
+    def test_fragment_is_cached(self):
+        assert self.render(page=1, name='<b>') == '&lt;b&gt;'
+        assert self.render(page=1, name='other') == '&lt;b&gt;'
+
+    def test_fragment_varies_on_arguments(self):
+        self.render(page=1, name='first')
+
+        assert self.render(page=2, name='second') == 'second'
+
+    def test_bump_makes_fragment_stale(self):
+        self.render(page=1, name='first')
+
+        versioned_cache.bump('ns')
+
+        assert self.render(page=1, name='second') == 'second'
+
+    @patch('core.templatetags.versioned_cache.default_storage',
+           Mock(querystring_auth=True, querystring_expire=3600))
+    @patch('core.templatetags.versioned_cache.versioned_cache')
+    def test_fragment_expires_before_signed_urls(self, cache_mock):
+        cache_mock.get_or_set.return_value = 'cached'
+
+        assert self.render(page=1, name='first') == 'cached'
+        assert cache_mock.get_or_set.call_args[1] == dict(timeout=1800)
+
+    def test_namespace_is_required(self):
+        with pytest.raises(TemplateSyntaxError):
+            Template('{% load versioned_cache %}'
+                     '{% versioned_cache %}{% endversioned_cache %}')
@@ -1,9 +1,18 @@
+import gzip
+import shutil
+import tempfile
 import unittest
 
-from django.test import RequestFactory
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
 from django.views.generic import TemplateView
 
 from core.forms import UploadFileForm
+from api.models import SitemapPage
 from core.views import UploadFormMixin, ErrorTemplateView
 
 
@@ -44,3 +53,54 @@ class TestErrorTemplateView:
 
         # Then the response includes the status code from the error view
         assert response.status_code == 113
+
+
+@pytest.mark.integration
+class TestSitemapFile(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.written = timezone.now().replace(microsecond=0)
+        SitemapPage.objects.create(section='activities', page=1, count=1,
+                                   stale=False, written=self.written)
+        default_storage.save('sitemaps/activities-1.xml.gz',
+                             ContentFile(gzip.compress(b'<urlset/>')))
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_serves_file(self):
+        response = self.client.get('/sitemaps/activities-1.xml.gz')
+
+        assert response.status_code == 200
+        assert gzip.decompress(response.content) == b'<urlset/>'
+        assert response['Last-Modified'] == \
+            http_date(self.written.timestamp())
+        assert 'max-age=3600' in response['Cache-Control']
+
+    def test_unchanged_file_is_not_sent(self):
+        response = self.client.get(
+            '/sitemaps/activities-1.xml.gz',
+            HTTP_IF_MODIFIED_SINCE=http_date(self.written.timestamp()))
+
+        assert response.status_code == 304
+        assert response.content == b''
+
+    def test_missing_and_empty_pages_are_not_found(self):
+        SitemapPage.objects.create(section='activities', page=2, count=0,
+                                   stale=False, written=self.written)
+
+        assert self.client.get(
+            '/sitemaps/activities-2.xml.gz').status_code == 404
+        assert self.client.get(
+            '/sitemaps/activities-3.xml.gz').status_code == 404
+        assert self.client.get('/sitemap.xml.gz').status_code == 404
+
+    def test_old_sitemap_url_redirects(self):
+        response = self.client.get('/sitemap.xml')
+
+        assert response.status_code == 301
+        assert response['Location'] == '/sitemap.xml.gz'
@@ -1,7 +1,18 @@
 """Shared view mixins"""
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import Http404, HttpRequest, HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic import TemplateView
 
+from api.models import SitemapPage
 from core.forms import UploadFileForm
+from core.sitemap_files import INDEX, sitemap_path
+
+SITEMAP_MAX_AGE = 3600  # s
 
 
 class UploadFormMixin(object):
@@ -52,3 +63,24 @@ class InternalServerErrorView(ErrorTemplateView):
     """Standard 500 page view"""
     template_name = "500.html"
     status_code = 500
+
+
+def _sitemap_written(request: HttpRequest, section: str = INDEX,
+                     page: str = '0') -> datetime:
+    """Get when the sitemap file was written, None if there is no file"""
+    return SitemapPage.objects.filter(
+        Q(count__gt=0) | Q(section=INDEX), section=section, page=int(page),
+        written__isnull=False).values_list('written', flat=True).first()
+
+
+@cache_control(public=True, max_age=SITEMAP_MAX_AGE)
+@condition(last_modified_func=_sitemap_written)
+def sitemap_file(request: HttpRequest, section: str = INDEX,
+                 page: str = '0') -> HttpResponse:
+    """Serve a static sitemap file, see core.sitemap_files
+
+    Crawlers that send If-Modified-Since get a 304 if it is unchanged."""
+    if _sitemap_written(request, section, page) is None:
+        raise Http404('No such sitemap')
+    with default_storage.open(sitemap_path(section, int(page))) as sitemap:
+        return HttpResponse(sitemap.read(), content_type='application/x-gzip')
@@ -1,6 +1,15 @@
+import json
 from unittest.mock import patch, Mock, sentinel
 
-from healthcheck.views import check_db, HealthcheckView
+import pytest
+from django.core.exceptions import PermissionDenied
+from django.test import TestCase
+from django.urls import reverse
+
+from api.helper import versioned_cache
+from healthcheck.views import check_db, HealthcheckView, MetricsView
+from images import fetch
+from users.tests.factories import UserFactory
 
 
 class TestCheckDb:
@@ -37,3 +46,50 @@ class TestHealthCheckView:
         response = view.get(Mock())
 
         assert response == sentinel.response
+
+
+class TestMetricsView:
+
+    def test_non_staff_is_denied(self):
+        view = MetricsView()
+
+        with pytest.raises(PermissionDenied):
+            view.get(Mock(user=Mock(is_staff=False)))
+
+    @patch('healthcheck.views.fetch')
+    @patch('healthcheck.views.versioned_cache')
+    def test_staff_get_snapshots(self, cache_mock, fetch_mock):
+        cache_mock.snapshot.return_value = {'leaders': {'hits': 1}}
+        fetch_mock.metrics.snapshot.return_value = {'requests': 2}
+
+        view = MetricsView()
+        response = view.get(Mock(user=Mock(is_staff=True)))
+
+        assert json.loads(response.content.decode()) == dict(
+            versioned_cache={'leaders': {'hits': 1}},
+            image_fetch={'requests': 2})
+
+
+@pytest.mark.integration
+class TestMetricsViewIntegration(TestCase):
+
+    def tearDown(self):
+        versioned_cache.reset()
+        fetch.metrics.reset()
+
+    def test_anonymous_user_is_denied(self):
+        response = self.client.get(reverse('healthcheck_metrics'))
+
+        assert response.status_code == 403
+
+    def test_staff_user_gets_metrics(self):
+        UserFactory.create(username='staff', is_staff=True)
+        self.client.login(username='staff', password='password')
+        versioned_cache.get_or_set('leaders', 'key', lambda: 1)
+
+        response = self.client.get(reverse('healthcheck_metrics'))
+
+        assert response.status_code == 200
+        metrics = response.json()
+        assert metrics['versioned_cache']['leaders']['misses'] == 1
+        assert metrics['image_fetch']['requests'] == 0
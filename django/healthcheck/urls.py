@@ -1,8 +1,9 @@
 """Routing for healthcheck related pages"""
 from django.conf.urls import url
 
-from healthcheck.views import HealthcheckView
+from healthcheck.views import HealthcheckView, MetricsView
 
 urlpatterns = [
     url(r'^$', HealthcheckView.as_view(), name='healthcheck'),
+    url(r'^metrics$', MetricsView.as_view(), name='healthcheck_metrics'),
 ]
@@ -3,10 +3,13 @@ Simple healthchecks to provide site health to monitoring tools.
 """
 import traceback
 
-from django.http import HttpResponse, HttpResponseServerError
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, HttpResponseServerError, JsonResponse
 from django.views.generic import View
 
+from api.helper import versioned_cache
 from healthcheck.models import Healthcheck
+from images import fetch
 
 
 def check_db():
@@ -38,3 +41,20 @@ class HealthcheckView(View):
 
         response = HttpResponse if site_ok else HttpResponseServerError
         return response("\n".join(status), content_type="text/plain")
+
+
+class MetricsView(View):
+    """Staff only view of the cache and image fetch metrics"""
+
+    def get(self, request):
+        """Get request for the metrics
+
+        The counts are kept by each process, so only cover the requests
+        served by the process answering this one.
+        """
+        if not request.user.is_staff:
+            raise PermissionDenied
+
+        return JsonResponse(dict(
+            versioned_cache=versioned_cache.snapshot(),
+            image_fetch=fetch.metrics.snapshot()))
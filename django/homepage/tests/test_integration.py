@@ -2,6 +2,7 @@ import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from api.models import Activity, ActivityTrack
 from api.tests.factories import (ActivityFactory, ActivityTrackFactory,
@@ -43,6 +44,52 @@ class TestHomepageViewIntegration(FileDeleter, TestCase):
         self.assertContains(response, 'First snowkite of the season')
         self.assertContains(response, 'Snowkite lesson:')
 
+    def test_home_page_shows_changes_to_cached_activities(self):
+        a = ActivityFactory.create(name="Morning sail", start=timezone.now())
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Morning sail')
+
+        a.name = "Evening sail"
+        a.save()
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Evening sail')
+        self.assertNotContains(response, 'Morning sail')
+
+    def test_home_page_pages_with_cursors(self):
+        for x in range(26):
+            ActivityFactory.create(name='Sail {}'.format(x),
+                                   start=timezone.now())
+
+        response = self.client.get(reverse('home'))
+        page = response.context['page_obj']
+        assert len(page) == 25
+        self.assertContains(response, '?after={}'.format(page.next_cursor))
+
+        response = self.client.get(reverse('home'),
+                                   dict(after=page.next_cursor))
+        self.assertContains(response, 'Sail 0<')
+        assert response.context['page_obj'].has_previous()
+
+    def test_home_page_merges_own_private_activities(self):
+        user = UserFactory.create(username='owner')
+        other = UserFactory.create(username='other')
+        for x in range(4):
+            ActivityFactory.create(user=user if x % 2 else other,
+                                   private=bool(x % 2),
+                                   name='Sail {}'.format(x),
+                                   start=timezone.now())
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('home'))
+
+        assert [x.name for x in response.context['activities']] == \
+            ['Sail 3', 'Sail 2', 'Sail 1', 'Sail 0']
+
+    def test_home_page_with_bad_cursor_is_not_found(self):
+        response = self.client.get(reverse('home'), dict(after='bad'))
+        assert response.status_code == 404
+
     def test_home_page_does_not_show_activities_without_details(self):
         with self.settings(MEDIA_ROOT=self.temp_dir):
             a = Activity.objects.create(user=UserFactory.create())
@@ -22,6 +22,21 @@ class TestHomepageView:
         # and the mock will have been called with the current user
         mock_helper.assert_called_once_with(sentinel.user)
 
+    @patch('homepage.views.get_feed_ranges')
+    def test_pages_each_feed_range(self, mock_helper: Mock):
+        # Given a mock get_feed_ranges that returns a sentinel
+        mock_helper.return_value = sentinel.ranges
+
+        view = HomePageView()
+        view.request = Mock(user=sentinel.user)
+
+        # When getting the keyset ranges for the view
+        ranges = view.get_keyset_ranges()
+
+        # Then the sentinel will be returned, for the current user
+        assert ranges == sentinel.ranges
+        mock_helper.assert_called_once_with(sentinel.user)
+
     @patch('homepage.views.get_leaders')
     @patch('homepage.views.ListView.get_context_data')
     def test_get_context_data_populates_leaders(self,
@@ -30,7 +45,8 @@ class TestHomepageView:
         # Given a mock get_leaders that returns a sentinel
         get_leaders_mock.return_value = sentinel.leaders
 
-        get_context_mock.return_value = dict(super=sentinel.super)
+        get_context_mock.return_value = dict(super=sentinel.super,
+                                             activities=sentinel.activities)
 
         view = HomePageView()
 
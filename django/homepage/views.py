@@ -2,8 +2,10 @@
 from django.db.models import QuerySet
 from django.views.generic import ListView
 
-from api.helper import get_leaders, get_activities_for_user
+from api.helper import FEED_KEYSET, get_leaders, get_activities_for_user, \
+    get_feed_ranges
 from api.models import Activity
+from core.pagination import KeysetPaginationMixin
 from core.views import UploadFormMixin
 from core.forms import (ERROR_NO_UPLOAD_FILE_SELECTED,
                         ERROR_UNSUPPORTED_FILE_TYPE)
@@ -12,12 +14,14 @@ ERRORS = dict(no_file=ERROR_NO_UPLOAD_FILE_SELECTED,
               bad_file_type=ERROR_UNSUPPORTED_FILE_TYPE)
 
 
-class HomePageView(UploadFormMixin, ListView):
+class HomePageView(KeysetPaginationMixin, UploadFormMixin, ListView):
     """Handle logged-in user home page"""
     model = Activity
     template_name = 'home.html'
     context_object_name = 'activities'
     paginate_by = 25
+    keyset = FEED_KEYSET
+    estimate_count = True
 
     def get_queryset(self) -> QuerySet:
         """Overridden queryset to return activities
@@ -25,6 +29,10 @@ class HomePageView(UploadFormMixin, ListView):
         Includes current users private activities"""
         return get_activities_for_user(self.request.user)
 
+    def get_keyset_ranges(self) -> list:
+        """Page the public and the user's private entries separately"""
+        return get_feed_ranges(self.request.user)
+
     def get_context_data(self, **kwargs) -> dict:
         """Update the context with addition homepage data"""
         context = super(HomePageView, self).get_context_data(**kwargs)
@@ -1,14 +1,18 @@
-import uuid
+import hashlib
 from typing import List
-from urllib import request
-from urllib.error import HTTPError
 
 from django.conf import settings
 from django.core.files.base import ContentFile
 
 from analysis.simplify import simplify_to_specific_length
+from images.fetch import FetchError, fetch_url
+from images.render import render_track_image, track_digest
 from tests.assets import get_test_file_data
 
+# Visvalingam Whyatt avoids the spikes Douglas Peucker leaves on tacks
+IMAGE_SIMPLIFY_METHOD = 'visvalingam_whyatt'
+IMAGE_POINT_COUNT = 500  # points drawn by the local renderer
+
 
 def make_image_url(trackpoints: List, best_fit):
     line = ','.join(["{0},{1}".format(x['lat'], x['lon'])
@@ -53,36 +57,61 @@ def compute_best_fit(trackpoints):
 
 
 def get_image_from_url(url):
-    """Get raw image data from a url"""
+    """Get raw image data from a url, or None if it couldn't be fetched"""
     try:
-        with request.urlopen(url) as remote_image:
-            if remote_image.status != 200:
-                # For now just return None if request failed
-                return None
-            return remote_image.read()
-    except HTTPError:
+        return fetch_url(url)
+    except FetchError:
         return None
 
 
-def make_image_for_track(trackpoints: List) -> ContentFile:
-    """Generate a summary image for the given track"""
+def image_points(trackpoints: List) -> List:
+    """Get the simplified track drawn by the local renderer"""
+    return simplify_to_specific_length(trackpoints, IMAGE_POINT_COUNT,
+                                       method=IMAGE_SIMPLIFY_METHOD)
+
+
+def summary_image_name(points: List) -> str:
+    """Get the content addressed file name of a track's summary image
+
+    The name is a hash of the image source and of what is drawn, the
+    simplified track from `image_points`, so the same track always maps to
+    the same image."""
+    source = getattr(settings, 'REMOTE_MAP_SOURCE', 'fake')
+    digest = hashlib.sha1('{}:{}'.format(
+        source, track_digest(points)).encode())
+    return '{}.png'.format(digest.hexdigest())
+
+
+def make_image_for_track(trackpoints: List, name: str = None,
+                         points: List = None) -> ContentFile:
+    """Generate a summary image for the given track
+
+    The image is named by `summary_image_name`, unless a name is given.
+    The simplified track is taken from `points`, if already made with
+    `image_points`.  Returns None if the image couldn't be made."""
 
     # For now faking here.  In the future, create a test only endpoint
     # that returns the fake image, so this module doesn't need to know
     # anything about whether it is hitting a fake or not, and just get's
     # a URL to use.
-    try:
-        fake = settings.REMOTE_MAP_SOURCE != 'mapquest'
-    except AttributeError:
-        fake = True
+    source = getattr(settings, 'REMOTE_MAP_SOURCE', 'fake')
+    if points is None and (source == 'local' or name is None):
+        points = image_points(trackpoints)
 
-    if fake:
-        image = get_test_file_data('fake_map.png')
-    else:
+    if source == 'local':
+        image = render_track_image(points)
+    elif source == 'mapquest':
         best_fit = compute_best_fit(trackpoints)
-        points = simplify_to_specific_length(trackpoints)
+        points = simplify_to_specific_length(
+            trackpoints, method=IMAGE_SIMPLIFY_METHOD)
 
         url = make_image_url(points, best_fit)
         image = get_image_from_url(url)
+    else:
+        image = get_test_file_data('fake_map.png')
 
-    return ContentFile(image, name="{}.png".format(uuid.uuid4()))
+    if image is None:
+        return None
+    if name is None:
+        name = summary_image_name(points)
+    return ContentFile(image, name=name)
@@ -0,0 +1,215 @@
+"""
+Fetch images from a remote map provider, without letting it stall uploads
+
+Requests have separate connect and read timeouts, and failed requests are
+retried a bounded number of times, with jittered exponential backoff.  A
+circuit breaker stops requests to a provider that keeps failing, so they
+fail fast until it has had time to recover.  Latency and failure counts are
+kept in `metrics`.
+"""
+import http.client
+import random
+import time
+from urllib.parse import urlsplit
+
+CONNECT_TIMEOUT = 3.0  # s
+READ_TIMEOUT = 10.0  # s
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.2  # s, doubled for each retry
+FAILURE_THRESHOLD = 5  # consecutive failures to open the breaker
+RESET_TIMEOUT = 60.0  # s, before letting a trial request through
+
+
+class FetchError(Exception):
+    """The image couldn't be fetched"""
+
+
+class RetryableFetchError(FetchError):
+    """The image couldn't be fetched, but a retry may succeed"""
+
+
+class CircuitOpenError(FetchError):
+    """The provider has been failing, so the request wasn't made"""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, until the reset timeout passes
+
+    Closed, requests are allowed, and consecutive failures are counted.
+    After `failure_threshold` of them the breaker opens, and requests are
+    refused for `reset_timeout` seconds.  Then a single trial request is
+    allowed (half open), and its result closes or re-opens the breaker."""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = False
+
+    @property
+    def state(self) -> str:
+        """Get the state of the breaker, 'closed', 'open' or 'half-open'"""
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Check whether a request may be made now"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self.trial_started:
+            self.trial_started = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request"""
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = False
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the breaker if needed"""
+        self.failures += 1
+        if self.trial_started or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            self.trial_started = False
+
+
+class FetchMetrics:
+    """Counts and latency of the fetches"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all of the metrics"""
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latency_total = 0.0  # s
+        self.latency_max = 0.0  # s
+
+    def record(self, latency: float, success: bool) -> None:
+        """Record a single request"""
+        self.requests += 1
+        if success:
+            self.successes += 1
+        else:
+            self.failures += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self) -> dict:
+        """Get the metrics, with the failure rate and mean latency"""
+        return dict(requests=self.requests,
+                    successes=self.successes,
+                    failures=self.failures,
+                    retries=self.retries,
+                    rejected=self.rejected,
+                    failure_rate=(self.failures / self.requests
+                                  if self.requests else 0.0),
+                    latency_mean=(self.latency_total / self.requests
+                                  if self.requests else 0.0),
+                    latency_max=self.latency_max)
+
+
+breaker = CircuitBreaker()
+metrics = FetchMetrics()
+
+
+def request_once(url: str, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT) -> bytes:
+    """Make a single GET request, returning the body
+
+    Raises RetryableFetchError for timeouts, connection errors and server
+    errors, and FetchError for any other non-200 response."""
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection \
+        if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.hostname, parts.port,
+                                  timeout=connect_timeout)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    try:
+        connection.connect()
+        connection.sock.settimeout(read_timeout)
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = response.read()
+    except (OSError, http.client.HTTPException) as error:
+        # Covers socket timeouts, refused connections and bad responses
+        raise RetryableFetchError(str(error)) from error
+    finally:
+        connection.close()
+
+    if response.status >= 500:
+        raise RetryableFetchError('Server error {}'.format(response.status))
+    if response.status != 200:
+        raise FetchError('Unexpected status {}'.format(response.status))
+    return body
+
+
+def fetch_url(url: str, max_attempts: int = MAX_ATTEMPTS,
+              backoff_base: float = BACKOFF_BASE, sleep=time.sleep,
+              circuit: CircuitBreaker = None, **timeouts) -> bytes:
+    """Fetch the body of the url, with retries, behind the circuit breaker
+
+    Parameters
+    ----------
+    url : str
+        The url to GET
+    max_attempts : int
+        Most requests to make, including the first
+    backoff_base : float
+        Longest wait (s) before the first retry, doubling for each retry.
+        The actual wait is random, up to that (full jitter).
+    sleep : callable
+        Used to wait between attempts
+    circuit : CircuitBreaker
+        The breaker to use, the module breaker by default
+    timeouts
+        connect_timeout and read_timeout (s) for each request
+
+    Raises
+    ------
+    FetchError
+        If the fetch failed, or CircuitOpenError if it wasn't attempted
+    """
+    circuit = circuit if circuit is not None else breaker
+    for attempt in range(max_attempts):
+        if not circuit.allow():
+            metrics.rejected += 1
+            raise CircuitOpenError('Map provider is unavailable')
+        if attempt:
+            metrics.retries += 1
+
+        start = time.monotonic()
+        try:
+            body = request_once(url, **timeouts)
+        except RetryableFetchError:
+            metrics.record(time.monotonic() - start, success=False)
+            circuit.record_failure()
+            if attempt == max_attempts - 1:
+                raise
+            sleep(random.uniform(0, backoff_base * 2 ** attempt))
+        except FetchError:
+            # The provider answered, so it isn't unhealthy
+            metrics.record(time.monotonic() - start, success=False)
+            circuit.record_success()
+            raise
+        else:
+            metrics.record(time.monotonic() - start, success=True)
+            circuit.record_success()
+            return body
+    raise FetchError('No attempts made')
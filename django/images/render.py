@@ -0,0 +1,166 @@
+"""
+Render summary images of tracks locally, with Pillow
+
+Draws the simplified track, colored by speed, with a scale bar, so making
+a summary image needs no network access.
+"""
+import hashlib
+import io
+import math
+from typing import List
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from analysis.simplify import project_to_plane
+
+RENDER_VERSION = 1  # bump when changing how images are drawn
+IMAGE_SIZE = 400  # px
+SPEED_LEVELS = 24  # distinct colors, consecutive segments are drawn together
+SUPERSAMPLE = 2  # drawn at this multiple of the size, then reduced
+MARGIN = 20  # px
+LINE_WIDTH = 3  # px
+BACKGROUND = (224, 236, 244)
+SCALE_BAR_COLOR = (60, 60, 60)
+# Colors for the slowest to the fastest speeds, interpolated in between
+SPEED_RAMP = np.array([(49, 54, 149), (69, 117, 180), (116, 173, 209),
+                       (254, 224, 144), (244, 109, 67), (165, 0, 38)],
+                      dtype=float)
+
+
+def speed_levels(speeds: np.ndarray, levels: int = SPEED_LEVELS) -> \
+        np.ndarray:
+    """Quantize speeds, scaled to the fastest, to levels 0 to levels - 1"""
+    speeds = np.asarray(speeds, dtype=float)
+    top = np.max(speeds) if len(speeds) else 0
+    scaled = speeds / top if top > 0 else np.zeros(len(speeds))
+    return np.minimum(np.floor(scaled * levels), levels - 1).astype(int)
+
+
+def level_colors(levels: int = SPEED_LEVELS) -> List[tuple]:
+    """Get the color of each speed level, interpolated along the ramp"""
+    position = np.linspace(0, len(SPEED_RAMP) - 1, levels)
+    lower = np.minimum(np.floor(position).astype(int), len(SPEED_RAMP) - 2)
+    fraction = (position - lower)[:, np.newaxis]
+    colors = (SPEED_RAMP[lower] * (1 - fraction) +
+              SPEED_RAMP[lower + 1] * fraction)
+    return [tuple(x) for x in np.round(colors).astype(int).tolist()]
+
+
+def scale_bar_length(max_length: float) -> float:
+    """Get the longest round (1, 2 or 5 x 10^n) length within max_length"""
+    magnitude = 10 ** math.floor(math.log10(max_length))
+    for step in (5, 2, 1):
+        if step * magnitude <= max_length:
+            return step * magnitude
+    return magnitude
+
+
+def format_length(length: float) -> str:
+    """Format a scale bar length (m)"""
+    if length >= 1000:
+        return '{:g} km'.format(length / 1000)
+    return '{:g} m'.format(length)
+
+
+def layout_track(trackpoints: List, size: int) -> tuple:
+    """Get the pixel positions and speed levels for drawing the track
+
+    Returns the x and y pixel positions of each trackpoint, the speed level
+    of each segment between them, and the pixels per meter, for an image of
+    the given size (px)."""
+    x_vals, y_vals = project_to_plane([x['lat'] for x in trackpoints],
+                                      [x['lon'] for x in trackpoints])
+    x_vals -= np.min(x_vals)
+    y_vals -= np.min(y_vals)
+    extent = max(np.max(x_vals), np.max(y_vals), 1.0)
+    pixels_per_meter = (size - 2 * MARGIN * SUPERSAMPLE) / extent
+
+    # Center the track, with north up
+    x_px = (x_vals - np.max(x_vals) / 2) * pixels_per_meter + size / 2
+    y_px = size / 2 - (y_vals - np.max(y_vals) / 2) * pixels_per_meter
+
+    speeds = np.array([x['sog'] for x in trackpoints], dtype=float)
+    levels = speed_levels((speeds[:-1] + speeds[1:]) / 2)
+    return x_px, y_px, levels, pixels_per_meter
+
+
+def track_digest(trackpoints: List, size: int = IMAGE_SIZE) -> str:
+    """Get a hash of everything drawn by `render_track_image`
+
+    The track is reduced to the pixels and colors it is drawn with, so
+    changes to the track too small to change the image (including trims
+    that don't move its bounds) give the same hash."""
+    digest = hashlib.sha1(repr((
+        RENDER_VERSION, size, SUPERSAMPLE, MARGIN, LINE_WIDTH, BACKGROUND,
+        SPEED_LEVELS, SPEED_RAMP.tolist())).encode())
+    if trackpoints:
+        x_px, y_px, levels, pixels_per_meter = layout_track(
+            trackpoints, size * SUPERSAMPLE)
+        length = scale_bar_length(size * SUPERSAMPLE / 4 / pixels_per_meter)
+        digest.update(repr((length,
+                            round(length * pixels_per_meter))).encode())
+
+        # Only keep the points that move to a new pixel, with the color of
+        # the segment to them
+        drawn = np.column_stack((np.round(x_px), np.round(y_px),
+                                 np.append(-1, levels))).astype(np.int32)
+        moved = np.append(True,
+                          (np.diff(drawn[:, :2], axis=0) != 0).any(axis=1))
+        digest.update(drawn[moved].tobytes())
+    return digest.hexdigest()
+
+
+def render_track_image(trackpoints: List, size: int = IMAGE_SIZE) -> bytes:
+    """Render a PNG summary image of the track
+
+    Parameters
+    ----------
+    trackpoints : list of dict
+        The track, with lat, lon and sog for each trackpoint.  Every
+        trackpoint is drawn, so pass a simplified or decimated track.
+    size : int
+        Width and height of the image (px)
+
+    Returns
+    -------
+    bytes
+        The PNG image data
+    """
+    scale = SUPERSAMPLE
+    image = Image.new('RGB', (size * scale, size * scale), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    if trackpoints:
+        x_px, y_px, levels, pixels_per_meter = layout_track(
+            trackpoints, size * scale)
+        pixels = list(zip(x_px.tolist(), y_px.tolist()))
+
+        # Draw each run of segments in the same color as a single line
+        colors = level_colors()
+        breaks = np.flatnonzero(np.diff(levels)) + 1
+        starts = np.append(0, breaks) if len(levels) else []
+        for start, end in zip(starts, np.append(breaks, len(levels))):
+            draw.line(pixels[start:end + 1], fill=colors[levels[start]],
+                      width=LINE_WIDTH * scale)
+
+        draw_scale_bar(draw, size * scale, pixels_per_meter, scale)
+
+    image = image.resize((size, size), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def draw_scale_bar(draw: ImageDraw.ImageDraw, size: int,
+                   pixels_per_meter: float, scale: int) -> None:
+    """Draw a scale bar, up to a quarter of the image wide, bottom left"""
+    length = scale_bar_length(size / 4 / pixels_per_meter)
+    left = MARGIN * scale / 2
+    bottom = size - MARGIN * scale / 2
+    right = left + length * pixels_per_meter
+    tick = 4 * scale
+    draw.line([(left, bottom - tick), (left, bottom), (right, bottom),
+               (right, bottom - tick)], fill=SCALE_BAR_COLOR, width=scale)
+    draw.text((left + tick, bottom - tick - 12), format_length(length),
+              fill=SCALE_BAR_COLOR, font=ImageFont.load_default())
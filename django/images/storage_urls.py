@@ -0,0 +1,89 @@
+"""
+Resolve the storage URLs of summary images, with an in-process cache
+
+Signing a URL for a private S3 bucket costs an HMAC in Python, and every
+activity in a list shows several image variants, so the URLs are kept for
+half of their lifetime and reused.  Images of public activities can
+instead be served unsigned, from the PUBLIC_MEDIA_URL (such as a CDN in
+front of the bucket), when that is set.
+
+URLs are resolved as the templates render, so pages and fragments served
+from the cache resolve none.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.utils.encoding import filepath_to_uri
+
+URL_CACHE_SIZE = 10000  # URLs
+REUSE_FRACTION = 0.5  # of the lifetime of a signed URL
+UNSIGNED_LIFETIME = 24 * 3600.0  # s, for URLs that don't expire
+
+
+def url_lifetime(storage: Storage) -> float:
+    """Get how long (s) the storage's URLs can be reused for
+
+    Signed URLs (S3 query string auth) are reused for a fraction of their
+    lifetime, so they are never served close to expiring."""
+    if getattr(storage, 'querystring_auth', False):
+        return storage.querystring_expire * REUSE_FRACTION
+    return UNSIGNED_LIFETIME
+
+
+def public_url(name: str) -> str:
+    """Get the unsigned URL of a public image, or None if not configured"""
+    base = getattr(settings, 'PUBLIC_MEDIA_URL', None)
+    if not base:
+        return None
+    return base.rstrip('/') + '/' + filepath_to_uri(name)
+
+
+class UrlResolver:
+    """Storage URLs, cached until shortly before they expire
+
+    The least recently used URLs are dropped once `max_size` are cached.
+    """
+
+    def __init__(self, max_size: int = URL_CACHE_SIZE, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self._urls = OrderedDict()  # (storage, name, public): (url, expiry)
+        self._lock = threading.Lock()
+
+    def url(self, storage: Storage, name: str, public: bool = False) -> str:
+        """Get the URL of the named file in the storage
+
+        Parameters
+        ----------
+        storage : Storage
+            The storage holding the file
+        name : str
+            Name of the file in the storage
+        public : bool
+            Whether the file may be served unsigned, from PUBLIC_MEDIA_URL
+        """
+        key = (storage, name, public)
+        now = self.clock()
+        with self._lock:
+            cached = self._urls.get(key)
+            if cached is not None and cached[1] > now:
+                self._urls.move_to_end(key)
+                return cached[0]
+
+        url = (public and public_url(name)) or storage.url(name)
+        with self._lock:
+            self._urls[key] = (url, now + url_lifetime(storage))
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.max_size:
+                self._urls.popitem(last=False)
+        return url
+
+    def clear(self) -> None:
+        """Drop every cached URL"""
+        with self._lock:
+            self._urls.clear()
+
+
+resolver = UrlResolver()
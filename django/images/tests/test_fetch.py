@@ -0,0 +1,192 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import Mock
+
+import pytest
+
+from images.fetch import (CircuitBreaker, CircuitOpenError, FetchError,
+                          FetchMetrics, RetryableFetchError, fetch_url,
+                          request_once)
+import images.fetch
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Replies with the next of the server's queued responses
+
+    Each response is a (status, body) tuple, or a delay (s) to wait before
+    replying 200."""
+
+    def do_GET(self):  # noqa: N802
+        self.server.paths.append(self.path)
+        response = self.server.responses.pop(0) \
+            if self.server.responses else (200, b'IMAGE')
+        if not isinstance(response, tuple):
+            time.sleep(response)
+            response = (200, b'SLOW')
+        status, body = response
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    server.responses = []
+    server.paths = []
+    server.url = 'http://127.0.0.1:{}/map?size=400'.format(
+        server.server_port)
+    thread = threading.Thread(target=server.serve_forever,
+                              kwargs=dict(poll_interval=0.01), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(images.fetch, 'metrics', FetchMetrics())
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, clock=lambda: 0)
+
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == 'open'
+        assert not breaker.allow()
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, clock=lambda: 0)
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == 'closed'
+
+    def test_half_open_allows_single_trial(self):
+        clock = Mock(return_value=0)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10,
+                                 clock=clock)
+        breaker.record_failure()
+
+        clock.return_value = 10
+        assert breaker.state == 'half-open'
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == 'closed'
+
+    def test_failed_trial_reopens(self):
+        clock = Mock(return_value=0)
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10,
+                                 clock=clock)
+        for _ in range(3):
+            breaker.record_failure()
+
+        clock.return_value = 10
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == 'open'
+        assert not breaker.allow()
+
+
+class TestFetchMetrics:
+
+    def test_snapshot(self):
+        metrics = FetchMetrics()
+        metrics.record(0.1, success=True)
+        metrics.record(0.3, success=False)
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot['requests'] == 2
+        assert snapshot['failure_rate'] == 0.5
+        assert snapshot['latency_mean'] == pytest.approx(0.2)
+        assert snapshot['latency_max'] == 0.3
+
+    def test_empty_snapshot(self):
+        assert FetchMetrics().snapshot()['failure_rate'] == 0.0
+
+
+class TestFetch:
+
+    def test_request_once_returns_body(self, stub_server):
+        assert request_once(stub_server.url) == b'IMAGE'
+        assert stub_server.paths == ['/map?size=400']
+
+    def test_request_once_times_out_slow_reads(self, stub_server):
+        stub_server.responses = [0.5]
+
+        with pytest.raises(RetryableFetchError):
+            request_once(stub_server.url, read_timeout=0.1)
+
+    def test_request_once_connection_refused(self):
+        with pytest.raises(RetryableFetchError):
+            request_once('http://127.0.0.1:1/map')
+
+    def test_request_once_client_error(self, stub_server):
+        stub_server.responses = [(404, b'')]
+
+        with pytest.raises(FetchError) as error:
+            request_once(stub_server.url)
+        assert not isinstance(error.value, RetryableFetchError)
+
+    def test_fetch_retries_server_errors(self, stub_server):
+        stub_server.responses = [(503, b''), (500, b'')]
+        sleep = Mock()
+
+        body = fetch_url(stub_server.url, sleep=sleep,
+                         circuit=CircuitBreaker())
+
+        assert body == b'IMAGE'
+        assert sleep.call_count == 2
+        # Full jitter, up to the doubling backoff
+        assert 0 <= sleep.call_args_list[0][0][0] <= 0.2
+        assert 0 <= sleep.call_args_list[1][0][0] <= 0.4
+        snapshot = images.fetch.metrics.snapshot()
+        assert snapshot['requests'] == 3
+        assert snapshot['failures'] == 2
+        assert snapshot['retries'] == 2
+
+    def test_fetch_gives_up_after_max_attempts(self, stub_server):
+        stub_server.responses = [(503, b'')] * 3
+
+        with pytest.raises(RetryableFetchError):
+            fetch_url(stub_server.url, max_attempts=2, sleep=Mock(),
+                      circuit=CircuitBreaker())
+        assert len(stub_server.paths) == 2
+
+    def test_fetch_does_not_retry_client_errors(self, stub_server):
+        stub_server.responses = [(400, b'')]
+        breaker = CircuitBreaker(failure_threshold=1)
+
+        with pytest.raises(FetchError):
+            fetch_url(stub_server.url, sleep=Mock(), circuit=breaker)
+        assert len(stub_server.paths) == 1
+        assert breaker.state == 'closed'
+
+    def test_fetch_fails_fast_when_circuit_open(self, stub_server):
+        stub_server.responses = [(503, b'')] * 2
+        breaker = CircuitBreaker(failure_threshold=2)
+
+        with pytest.raises(CircuitOpenError):
+            fetch_url(stub_server.url, sleep=Mock(), circuit=breaker)
+        with pytest.raises(CircuitOpenError):
+            fetch_url(stub_server.url, sleep=Mock(), circuit=breaker)
+
+        assert len(stub_server.paths) == 2
+        assert images.fetch.metrics.snapshot()['rejected'] == 2
@@ -1,10 +1,11 @@
-from unittest.mock import patch, sentinel, MagicMock
-from urllib.error import HTTPError
+from unittest.mock import patch, sentinel
 
 from django.core.files.base import ContentFile
 
 from images import make_image_for_track, make_image_url, compute_best_fit, \
-    get_image_from_url
+    get_image_from_url, image_points, summary_image_name, IMAGE_POINT_COUNT, \
+    IMAGE_SIMPLIFY_METHOD
+from images.fetch import FetchError
 
 
 class TestImages:
@@ -35,45 +36,39 @@ class TestImages:
                {"lat": -1, "lon": -11}]
         assert compute_best_fit(pos) == [3, 33, -1, -11]
 
-    @patch('images.request')
-    def test_get_image_for_url_returns_none_if_not_200(self, request_mock):
-        response = MagicMock(status=201)
-        request_mock.urlopen.return_value.__enter__.return_value = response
+    @patch('images.fetch_url')
+    def test_get_image_for_url_returns_none_if_fetch_fails(self, fetch_mock):
+        fetch_mock.side_effect = FetchError('bad')
 
         image = get_image_from_url(sentinel.url)
 
         assert image is None
 
-        request_mock.urlopen.assert_called_once_with(sentinel.url)
+        fetch_mock.assert_called_once_with(sentinel.url)
 
-    @patch('images.request')
-    def test_get_image_for_url_returns_none_if_request_throws(self,
-                                                              request_mock):
-        request_mock.urlopen.side_effect = HTTPError(sentinel.url, 400, "bad",
-                                                     [], [])
+    @patch('images.fetch_url')
+    def test_get_image_for_url_returns_image_data(self, fetch_mock):
+        fetch_mock.return_value = sentinel.data
 
         image = get_image_from_url(sentinel.url)
 
-        assert image is None
-
-        request_mock.urlopen.assert_called_once_with(sentinel.url)
-
-    @patch('images.request')
-    def test_get_image_for_url_returns_image_data(self,
-                                                  request_mock):
-        response = MagicMock()
-        response.status = 200
-        response.read.return_value = sentinel.data
+        assert image == sentinel.data
 
-        request_mock.urlopen.return_value.__enter__.return_value = response
+        fetch_mock.assert_called_once_with(sentinel.url)
 
-        image = get_image_from_url(sentinel.url)
+    @patch('images.get_image_from_url')
+    @patch('images.make_image_url')
+    @patch('images.settings')
+    def test_make_image_for_track_returns_none_without_image(
+            self, settings_mock, make_url_mock, get_image_mock):
+        settings_mock.REMOTE_MAP_SOURCE = 'mapquest'
+        get_image_mock.return_value = None
 
-        assert image == sentinel.data
+        image = make_image_for_track([{"lat": 1, "lon": 1, "sog": 1}] * 2)
 
-        request_mock.urlopen.assert_called_once_with(sentinel.url)
+        assert image is None
 
-    @patch('images.uuid')
+    @patch('images.summary_image_name')
     @patch('images.get_image_from_url')
     @patch('images.make_image_url')
     @patch('images.simplify_to_specific_length')
@@ -83,12 +78,12 @@ class TestImages:
                                                        simplify_mock,
                                                        make_url_mock,
                                                        get_image_mock,
-                                                       uuid_mock):
+                                                       name_mock):
         best_fit_mock.return_value = sentinel.best_fit
         simplify_mock.return_value = sentinel.points
         make_url_mock.return_value = sentinel.url
         get_image_mock.return_value = b"XXXX"
-        uuid_mock.uuid4.return_value = "1234"
+        name_mock.return_value = "1234.png"
 
         # When making an image for track
         image = make_image_for_track(sentinel.trackpoints)
@@ -99,24 +94,70 @@ class TestImages:
         assert image.read() == b"XXXX"
 
         best_fit_mock.assert_called_once_with(sentinel.trackpoints)
-        simplify_mock.assert_called_once_with(sentinel.trackpoints)
+        simplify_mock.assert_called_once_with(sentinel.trackpoints,
+                                              method='visvalingam_whyatt')
         make_url_mock.assert_called_once_with(sentinel.points,
                                               sentinel.best_fit)
         get_image_mock.assert_called_once_with(sentinel.url)
 
-    @patch('images.uuid')
+    @patch('images.summary_image_name')
+    @patch('images.simplify_to_specific_length')
+    @patch('images.render_track_image')
+    @patch('images.settings')
+    def test_make_image_for_track_renders_locally(self, settings_mock,
+                                                  render_mock,
+                                                  simplify_mock, name_mock):
+        settings_mock.REMOTE_MAP_SOURCE = 'local'
+        render_mock.return_value = b'ZZZZ'
+        name_mock.return_value = "1234.png"
+
+        image = make_image_for_track(sentinel.trackpoints)
+
+        assert image.name == "1234.png"
+        assert image.read() == b"ZZZZ"
+        # The simplified track is drawn
+        simplify_mock.assert_called_once_with(
+            sentinel.trackpoints, IMAGE_POINT_COUNT,
+            method=IMAGE_SIMPLIFY_METHOD)
+        render_mock.assert_called_once_with(simplify_mock.return_value)
+        name_mock.assert_called_once_with(simplify_mock.return_value)
+
+    @patch('images.summary_image_name')
+    @patch('images.simplify_to_specific_length')
+    @patch('images.render_track_image')
+    @patch('images.settings')
+    def test_make_image_for_track_draws_given_points(self, settings_mock,
+                                                     render_mock,
+                                                     simplify_mock,
+                                                     name_mock):
+        settings_mock.REMOTE_MAP_SOURCE = 'local'
+        render_mock.return_value = b'ZZZZ'
+        name_mock.return_value = "1234.png"
+
+        image = make_image_for_track(sentinel.trackpoints,
+                                     points=sentinel.points)
+
+        # The track isn't simplified again
+        assert image.name == "1234.png"
+        simplify_mock.assert_not_called()
+        render_mock.assert_called_once_with(sentinel.points)
+        name_mock.assert_called_once_with(sentinel.points)
+
+    @patch('images.image_points')
+    @patch('images.summary_image_name')
     @patch('images.get_test_file_data')
     @patch('images.settings')
     def test_make_image_for_track_returns_content_file_for_fake(
         self,
         settings_mock,
         get_data_mock,
-        uuid_mock
+        name_mock,
+        points_mock
     ):
 
         settings_mock.REMOTE_MAP_SOURCE = 'other'
         get_data_mock.return_value = b'YYYY'
-        uuid_mock.uuid4.return_value = "1234"
+        name_mock.return_value = "1234.png"
 
         # When making an image for track
         image = make_image_for_track(sentinel.trackpoints)
@@ -125,3 +166,43 @@ class TestImages:
         assert isinstance(image, ContentFile)
         assert image.name == "1234.png"
         assert image.read() == b"YYYY"
+
+    @patch('images.settings')
+    def test_summary_image_name_is_content_addressed(self, settings_mock):
+        settings_mock.REMOTE_MAP_SOURCE = 'local'
+        pos = [{"lat": 1, "lon": 1, "sog": 1}, {"lat": 2, "lon": 2, "sog": 2}]
+        moved = [pos[0], {"lat": 2, "lon": 3, "sog": 2}]
+
+        name = summary_image_name(image_points(pos))
+
+        assert name.endswith('.png')
+        assert summary_image_name(image_points(list(pos))) == name
+        assert summary_image_name(image_points(moved)) != name
+
+        settings_mock.REMOTE_MAP_SOURCE = 'mapquest'
+        assert summary_image_name(image_points(pos)) != name
+
+    @patch('images.settings')
+    def test_summary_image_name_ignores_points_simplified_away(
+            self, settings_mock):
+        settings_mock.REMOTE_MAP_SOURCE = 'local'
+        pos = [{"lat": x / 1000, "lon": (x % 2) / 1000, "sog": 1}
+               for x in range(IMAGE_POINT_COUNT)]
+        # A point on the straight line between two others adds nothing
+        extra = pos[:1] + [{"lat": 0.0005, "lon": 0.0005, "sog": 1}] + pos[1:]
+
+        assert summary_image_name(image_points(extra)) == \
+            summary_image_name(image_points(pos))
+
+    @patch('images.get_test_file_data')
+    @patch('images.summary_image_name')
+    @patch('images.settings')
+    def test_make_image_for_track_uses_given_name(self, settings_mock,
+                                                  name_mock, get_data_mock):
+        settings_mock.REMOTE_MAP_SOURCE = 'fake'
+        get_data_mock.return_value = b'YYYY'
+
+        image = make_image_for_track(sentinel.trackpoints, name='abc.png')
+
+        assert image.name == 'abc.png'
+        name_mock.assert_not_called()
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from images.render import (BACKGROUND, format_length, level_colors,
+                           render_track_image, scale_bar_length,
+                           speed_levels, SPEED_RAMP, track_digest)
+
+
+def make_track(count=50):
+    return [dict(lat=45 + i * 1e-4, lon=-93 + (i % 5) * 1e-4, sog=i / 10)
+            for i in range(count)]
+
+
+class TestRender:
+
+    def test_speed_levels_scale_to_fastest(self):
+        levels = speed_levels([0, 1, 2, 4], levels=4)
+
+        assert levels.tolist() == [0, 1, 2, 3]
+
+    def test_speed_levels_when_stationary(self):
+        assert speed_levels([0, 0], levels=4).tolist() == [0, 0]
+
+    def test_level_colors_span_ramp(self):
+        colors = level_colors(10)
+
+        assert len(colors) == 10
+        assert colors[0] == tuple(SPEED_RAMP[0])
+        assert colors[-1] == tuple(SPEED_RAMP[-1])
+
+    def test_scale_bar_length(self):
+        assert scale_bar_length(7) == 5
+        assert scale_bar_length(450) == 200
+        assert scale_bar_length(1000) == 1000
+        assert scale_bar_length(0.3) == 0.2
+
+    def test_format_length(self):
+        assert format_length(200) == '200 m'
+        assert format_length(5000) == '5 km'
+
+    def test_render_track_image_returns_png(self):
+        data = render_track_image(make_track(), size=200)
+
+        image = Image.open(io.BytesIO(data))
+        assert image.format == 'PNG'
+        assert image.size == (200, 200)
+
+    def test_render_track_image_draws_track(self):
+        data = render_track_image(make_track(), size=200)
+
+        pixels = np.asarray(Image.open(io.BytesIO(data)).convert('RGB'))
+        # The track is drawn in the middle of the image
+        assert (pixels[90:110, :] != BACKGROUND).any()
+        assert (pixels[0, 0] == BACKGROUND).all()
+
+    def test_render_track_image_with_single_point(self):
+        data = render_track_image(make_track(1), size=100)
+
+        assert Image.open(io.BytesIO(data)).size == (100, 100)
+
+    def test_render_track_image_without_trackpoints(self):
+        data = render_track_image([], size=100)
+
+        pixels = np.asarray(Image.open(io.BytesIO(data)).convert('RGB'))
+        assert (pixels == BACKGROUND).all()
+
+    def test_track_digest_ignores_changes_smaller_than_a_pixel(self):
+        track = make_track()
+        jittered = [dict(x, lat=x['lat'] + 1e-9) for x in track]
+
+        assert track_digest(jittered) == track_digest(track)
+
+    def test_track_digest_ignores_repeated_points(self):
+        track = make_track()
+
+        assert track_digest(track[:1] + track) == track_digest(track)
+
+    def test_track_digest_changes_with_track_speeds_and_size(self):
+        track = make_track()
+        reversed_speeds = [dict(x, sog=y['sog'])
+                           for x, y in zip(track, reversed(track))]
+
+        digest = track_digest(track)
+        assert track_digest(track[:-10]) != digest
+        assert track_digest(reversed_speeds) != digest
+        assert track_digest(track, size=200) != digest
+
+    def test_track_digest_without_trackpoints(self):
+        assert track_digest([]) == track_digest([])
@@ -0,0 +1,107 @@
+from unittest.mock import Mock
+
+from django.test import override_settings
+
+from images.storage_urls import (UrlResolver, public_url, url_lifetime,
+                                 UNSIGNED_LIFETIME)
+
+
+def make_storage(signed=True, expire=3600):
+    storage = Mock(querystring_auth=signed, querystring_expire=expire)
+    storage.url.side_effect = lambda name: 'https://s3/{}?sig'.format(name)
+    return storage
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestUrlLifetime:
+
+    def test_signed_urls_are_reused_for_half_their_life(self):
+        assert url_lifetime(make_storage(expire=3600)) == 1800
+
+    def test_unsigned_urls(self):
+        assert url_lifetime(make_storage(signed=False)) == UNSIGNED_LIFETIME
+        assert url_lifetime(object()) == UNSIGNED_LIFETIME
+
+
+class TestPublicUrl:
+
+    def test_not_configured(self):
+        assert public_url('summary_images/a.png') is None
+
+    @override_settings(PUBLIC_MEDIA_URL='https://cdn.example.com/media/')
+    def test_configured(self):
+        assert public_url('summary_images/a b.png') == \
+            'https://cdn.example.com/media/summary_images/a%20b.png'
+
+
+class TestUrlResolver:
+
+    def test_urls_are_signed_once(self):
+        storage = make_storage()
+        resolver = UrlResolver()
+
+        assert resolver.url(storage, 'a.png') == 'https://s3/a.png?sig'
+        assert resolver.url(storage, 'a.png') == 'https://s3/a.png?sig'
+
+        storage.url.assert_called_once_with('a.png')
+
+    def test_urls_expire(self):
+        storage = make_storage(expire=100)
+        clock = Clock()
+        resolver = UrlResolver(clock=clock)
+        resolver.url(storage, 'a.png')
+
+        clock.now = 49
+        resolver.url(storage, 'a.png')
+        assert storage.url.call_count == 1
+
+        clock.now = 51
+        resolver.url(storage, 'a.png')
+        assert storage.url.call_count == 2
+
+    def test_least_recently_used_are_dropped(self):
+        storage = make_storage()
+        resolver = UrlResolver(max_size=2)
+        resolver.url(storage, 'a.png')
+        resolver.url(storage, 'b.png')
+        resolver.url(storage, 'a.png')
+
+        resolver.url(storage, 'c.png')
+        resolver.url(storage, 'a.png')
+        resolver.url(storage, 'b.png')
+
+        names = [args[0][0] for args in storage.url.call_args_list]
+        assert names == ['a.png', 'b.png', 'c.png', 'b.png']
+
+    @override_settings(PUBLIC_MEDIA_URL='https://cdn.example.com/')
+    def test_public_urls_are_unsigned(self):
+        storage = make_storage()
+        resolver = UrlResolver()
+
+        assert resolver.url(storage, 'a.png', public=True) == \
+            'https://cdn.example.com/a.png'
+        assert resolver.url(storage, 'a.png') == 'https://s3/a.png?sig'
+
+    def test_public_urls_are_signed_without_a_public_media_url(self):
+        storage = make_storage()
+
+        assert UrlResolver().url(storage, 'a.png', public=True) == \
+            'https://s3/a.png?sig'
+
+    def test_clear(self):
+        storage = make_storage()
+        resolver = UrlResolver()
+        resolver.url(storage, 'a.png')
+
+        resolver.clear()
+        resolver.url(storage, 'a.png')
+
+        assert storage.url.call_count == 2
@@ -0,0 +1,79 @@
+import io
+from unittest.mock import Mock
+
+from PIL import Image
+
+from images.render import render_track_image
+from images.variants import (make_variants, save_variants, variant_name,
+                             variant_names, variant_srcset)
+
+
+def make_png(size=400):
+    output = io.BytesIO()
+    Image.new('RGB', (size, size), (10, 20, 30)).save(output, format='PNG')
+    return output.getvalue()
+
+
+class TestVariants:
+
+    def test_variant_name(self):
+        assert variant_name('summary_images/1-abc.png', 'small', 'webp') == \
+            'summary_images/1-abc-small.webp'
+
+    def test_variant_names(self):
+        names = list(variant_names('summary_images/1-abc.png'))
+
+        assert len(names) == 6
+        assert 'summary_images/1-abc-medium.png' in names
+        assert 'summary_images/1-abc-large.webp' in names
+
+    def test_make_variants_sizes_and_formats(self):
+        variants = make_variants(make_png())
+
+        assert len(variants) == 6
+        for (variant, extension), data in variants.items():
+            image = Image.open(io.BytesIO(data))
+            assert image.format == extension.upper()
+            assert image.size == {'small': (100, 100),
+                                  'medium': (200, 200),
+                                  'large': (400, 400)}[variant]
+
+    def test_make_variants_are_smaller(self):
+        original = render_track_image(
+            [dict(lat=45 + i * 1e-4, lon=-93 + (i % 5) * 1e-4, sog=i)
+             for i in range(50)])
+
+        variants = make_variants(original)
+
+        assert len(variants[('small', 'webp')]) < len(original)
+        assert len(variants[('small', 'png')]) < len(original)
+
+    def test_save_variants_skips_stored_variants(self):
+        storage = Mock()
+        storage.exists.side_effect = lambda name: name.endswith('.png')
+
+        save_variants(storage, 'summary_images/1-abc.png', make_png())
+
+        saved = [x[0][0] for x in storage.save.call_args_list]
+        assert sorted(saved) == ['summary_images/1-abc-large.webp',
+                                 'summary_images/1-abc-medium.webp',
+                                 'summary_images/1-abc-small.webp']
+
+    def test_variant_srcset_lists_densities(self):
+        storage = Mock()
+        storage.url.side_effect = lambda name: '/media/' + name
+        storage.querystring_auth = False
+
+        srcset = variant_srcset(storage, 'a.png', 'webp', 100)
+
+        assert srcset == ('/media/a-small.webp 1x, /media/a-medium.webp 2x, '
+                          '/media/a-large.webp 4x')
+
+    def test_variant_srcset_skips_too_small_variants(self):
+        storage = Mock()
+        storage.url.side_effect = lambda name: name
+        storage.querystring_auth = False
+
+        srcset = variant_srcset(storage, 'a.png', 'png', 200)
+
+        assert srcset == 'a-medium.png 1x, a-large.png 2x'
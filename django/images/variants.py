@@ -0,0 +1,77 @@
+"""
+Smaller and WebP variants of the summary images
+
+Each summary image is resized to each of the variant sizes, and saved as
+PNG and WebP, next to the original.  A variant of summary_images/abc.png is
+named like summary_images/abc-small.webp.
+"""
+import io
+import posixpath
+from typing import Iterator
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from PIL import Image
+
+from images.storage_urls import resolver
+
+VARIANT_SIZES = (('small', 100), ('medium', 200), ('large', 400))  # px
+VARIANT_FORMATS = (('webp', 'WEBP'), ('png', 'PNG'))  # extension, format
+WEBP_QUALITY = 80
+
+
+def variant_name(name: str, variant: str, extension: str) -> str:
+    """Get the storage name of a variant of the image"""
+    root = posixpath.splitext(name)[0]
+    return '{}-{}.{}'.format(root, variant, extension)
+
+
+def variant_names(name: str) -> Iterator[str]:
+    """Get the storage names of all of the variants of the image"""
+    for variant, _ in VARIANT_SIZES:
+        for extension, _ in VARIANT_FORMATS:
+            yield variant_name(name, variant, extension)
+
+
+def make_variants(data: bytes) -> dict:
+    """Make every variant of the image
+
+    Returns the encoded data of each variant, keyed by (variant, extension).
+    """
+    original = Image.open(io.BytesIO(data))
+    original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+
+    variants = {}
+    for variant, size in VARIANT_SIZES:
+        resized = original if original.size == (size, size) else \
+            original.resize((size, size), Image.LANCZOS)
+        for extension, image_format in VARIANT_FORMATS:
+            output = io.BytesIO()
+            resized.save(output, format=image_format, quality=WEBP_QUALITY)
+            variants[(variant, extension)] = output.getvalue()
+    return variants
+
+
+def save_variants(storage: Storage, name: str, data: bytes) -> None:
+    """Store every variant of the image stored as name"""
+    for (variant, extension), encoded in make_variants(data).items():
+        path = variant_name(name, variant, extension)
+        if not storage.exists(path):
+            storage.save(path, ContentFile(encoded))
+
+
+def variant_srcset(storage: Storage, name: str, extension: str,
+                   display_size: int, public: bool = False) -> str:
+    """Get a srcset of the variants, for an image shown at display_size px
+
+    Each variant is listed with the pixel density it suits, so browsers
+    pick the smallest that is sharp on their screen.  The URLs come from
+    the resolver, unsigned if public, see images.storage_urls."""
+    return ', '.join(
+        '{} {:g}x'.format(
+            resolver.url(storage, variant_name(name, variant, extension),
+                         public),
+            size / display_size)
+        for variant, size in VARIANT_SIZES if size >= display_size)
@@ -10,7 +10,7 @@ class LeaderboardSitemap(SailtrailSitemap):
 
     def items(self) -> list:
         """Get items to appear in this sitemap section"""
-        return ['leaderboards']
+        return ['leaders:leaderboards']
 
     def location(self, obj) -> str:
         """Get location for these entries"""
@@ -1,4 +1,7 @@
+from datetime import datetime
+
 import pytest
+import pytz
 
 from django.test import TestCase
 from django.urls import reverse
@@ -32,10 +35,10 @@ class TestLeaderboardViewIntegration(TestCase):
         assert 2 == len(sailing['leaders'])
         leader = sailing['leaders'][0]
         assert 'test1' == leader['user__username']
-        assert 10.0 == leader['max_speed']
+        assert 10.0 == leader['value']
         second = sailing['leaders'][1]
         assert 'test2' == second['user__username']
-        assert 7.0 == second['max_speed']
+        assert 7.0 == second['value']
 
     def test_leaderboard_does_not_contain_private_high_speeds(self):
         self.activity.private = True
@@ -48,7 +51,26 @@ class TestLeaderboardViewIntegration(TestCase):
         assert 2 == len(sailing['leaders'])
         leader = sailing['leaders'][0]
         assert 'test2' == leader['user__username']
-        assert 7.0 == leader['max_speed']
+        assert 7.0 == leader['value']
         second = sailing['leaders'][1]
         assert 'test1' == second['user__username']
-        assert 5.0 == second['max_speed']
+        assert 5.0 == second['value']
+
+    def test_leaderboard_for_a_period_and_metric(self):
+        ActivityFactory.create(
+            distance=1500, user=self.user2,
+            start=datetime(2017, 1, 18, tzinfo=pytz.UTC))
+
+        response = self.client.get(reverse('leaders:leaderboards'), dict(
+            period='month', key='2017-01', metric='distance'))
+
+        leaders = response.context['leaders']
+        assert 1 == len(leaders)
+        assert [('test2', 1500)] == [(x['user__username'], x['value'])
+                                     for x in leaders[0]['leaders']]
+        self.assertContains(response, 'Distance')
+
+    def test_unknown_leaderboard_is_not_found(self):
+        response = self.client.get(reverse('leaders:leaderboards'),
+                                   dict(period='fortnight'))
+        assert 404 == response.status_code
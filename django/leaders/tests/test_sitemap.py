@@ -15,7 +15,7 @@ class TestLeaderboardSitemap(unittest.TestCase):
 
         # Then there is 1 item returned
         assert len(items) == 1
-        assert items[0] == 'leaderboards'
+        assert items[0] == 'leaders:leaderboards'
 
     @patch('leaders.sitemap.reverse')
     def test_location_uses_django_reverse(self, reverse_mock: MagicMock):
@@ -1,10 +1,20 @@
-from unittest.mock import patch, MagicMock, sentinel
+from unittest.mock import patch, MagicMock, Mock, sentinel
 
+import pytest
+from django.http import Http404
+
+from api.helper import LEADERBOARD_SIZE
 from leaders.views import LeaderboardView
 
 
 class TestLeaderboardView:
 
+    @staticmethod
+    def make_view(**params):
+        view = LeaderboardView()
+        view.request = Mock(GET=params)
+        return view
+
     @patch('leaders.views.get_leaders')
     @patch('leaders.views.TemplateView.get_context_data')
     def test_get_context_data_calls_helper(self,
@@ -15,9 +25,39 @@ class TestLeaderboardView:
         get_context_mock.return_value = dict(super=sentinel.super)
 
         # When getting the context data for a new view
-        view = LeaderboardView()
+        view = self.make_view()
         context = view.get_context_data()
 
-        # Then the context includes the sentinel
+        # Then the context includes the sentinel, for the default board
         assert context['leaders'] == sentinel.leaders
         assert context['super'] == sentinel.super
+        assert context['metric_name'] == 'Max Speed'
+        get_leaders_mock.assert_called_once_with('all', 'all', 'max_speed',
+                                                 size=LEADERBOARD_SIZE)
+
+    @patch('leaders.views.period_key')
+    def test_board_defaults_to_current_key(self, period_key_mock):
+        period_key_mock.return_value = '2017-W03'
+        view = self.make_view(period='week', metric='distance')
+
+        assert view.get_board() == ('week', '2017-W03', 'distance')
+
+    def test_board_from_query(self):
+        view = self.make_view(period='season', key='2017-winter',
+                              metric='sustained_speed')
+
+        assert view.get_board() == ('season', '2017-winter',
+                                    'sustained_speed')
+
+    @pytest.mark.parametrize('params', [
+        dict(period='day'),
+        dict(metric='name'),
+        dict(period='month', key='2017-13'),
+        dict(period='week', key='2017-01'),
+        dict(key='2017-01'),
+    ])
+    def test_unknown_board_is_not_found(self, params):
+        view = self.make_view(**params)
+
+        with pytest.raises(Http404):
+            view.get_board()
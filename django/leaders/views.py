@@ -1,16 +1,61 @@
 """Activity view module"""
+from django.http import Http404, HttpRequest
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 
-from api.helper import get_leaders
+from api.helper import LEADERBOARD_SIZE, LEADERS, get_leaders
+from api.models import MAX_SPEED, METRIC_CHOICES
+from api.periods import ALL_TIME, PERIOD_CHOICES, period_key, period_range
+from core.page_cache import cache_anonymous_page
 from core.views import UploadFormMixin
 
 
+def _leaderboard_page_version(request: HttpRequest) -> str:
+    """Get the version of the page, the day picks the default keys"""
+    return timezone.now().date().isoformat()
+
+
+@method_decorator(cache_anonymous_page(
+    LEADERS, version=_leaderboard_page_version), name='dispatch')
 class LeaderboardView(UploadFormMixin, TemplateView):
-    """Leaderboard view"""
+    """Leaderboard view
+
+    Shows the board picked by the period, key and metric query parameters,
+    by default the all time max speeds.  The key defaults to the current
+    one for the period.  Cached for anonymous visitors."""
     template_name = 'leaderboards.html'
 
+    def get_board(self) -> tuple:
+        """Get the period, key and metric of the requested board"""
+        period = self.request.GET.get('period', ALL_TIME)
+        metric = self.request.GET.get('metric', MAX_SPEED)
+        if period not in dict(PERIOD_CHOICES) or \
+                metric not in dict(METRIC_CHOICES):
+            raise Http404('No such leaderboard')
+
+        key = self.request.GET.get('key') or period_key(period,
+                                                        timezone.now())
+        if period == ALL_TIME:
+            if key != ALL_TIME:
+                raise Http404('No such leaderboard')
+        else:
+            try:
+                period_range(period, key)
+            except ValueError:
+                raise Http404('No such leaderboard')
+        return period, key, metric
+
     def get_context_data(self, **kwargs) -> dict:
         """Update the context with leaders"""
         context = super(LeaderboardView, self).get_context_data(**kwargs)
-        context['leaders'] = get_leaders()
+        period, key, metric = self.get_board()
+        context['leaders'] = get_leaders(period, key, metric,
+                                         size=LEADERBOARD_SIZE)
+        context['period'] = period
+        context['period_key'] = key
+        context['metric'] = metric
+        context['metric_name'] = dict(METRIC_CHOICES)[metric]
+        context['periods'] = PERIOD_CHOICES
+        context['metrics'] = METRIC_CHOICES
         return context
@@ -185,5 +185,19 @@ DEFAULT_FILE_STORAGE = 'storages.backends.s3boto.S3BotoStorage'
 AWS_ACCESS_KEY_ID = 'FIXME'
 AWS_SECRET_ACCESS_KEY = 'FIXME'
 AWS_STORAGE_BUCKET_NAME = 'sailtrail-data'
+# Unsigned base URL (such as a CDN in front of the bucket) for the summary
+# images of public activities, None to sign every URL
+PUBLIC_MEDIA_URL = None
+
+# Leader lists and page fragments are kept in api.helper.versioned_cache,
+# in local memory here, point VERSIONED_CACHE at a shared cache (memcached)
+# in production, so all processes see the same versions
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+VERSIONED_CACHE = 'default'
 
-REMOTE_MAP_SOURCE = 'mapquest'
+# Summary images are rendered 'local'ly, fetched from 'mapquest', or faked
+REMOTE_MAP_SOURCE = 'local'
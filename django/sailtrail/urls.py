@@ -3,22 +3,13 @@ from django.conf.urls import include, url
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth.decorators import login_required
-from django.contrib.sitemaps.views import sitemap
-from django.views.generic.base import TemplateView
+from django.views.generic.base import RedirectView, TemplateView
 
-from activities.sitemap import ActivitySitemap
 from core.views import NotFoundView, PermissionDeniedView, BadRequestView, \
-    InternalServerErrorView
+    InternalServerErrorView, sitemap_file
 from homepage.views import HomePageView
-from leaders.sitemap import LeaderboardSitemap
-from users.sitemap import UsersSitemap
 from users.views import ChangePasswordView
 
-sitemaps = {'activities': ActivitySitemap,
-            'leaderboards': LeaderboardSitemap,
-            'users': UsersSitemap,
-            }
-
 urlpatterns = [
     url(r'^$', HomePageView.as_view(), name='home'),
 
@@ -36,8 +27,11 @@ urlpatterns = [
         template_name='about.html'),
         name='about'),
 
-    url(r'^sitemap\.xml$', sitemap, {'sitemaps': sitemaps},
-        name='django.contrib.sitemaps.views.sitemap'),
+    url(r'^sitemap\.xml\.gz$', sitemap_file, name='sitemap'),
+    url(r'^sitemaps/(?P<section>[a-z]+)-(?P<page>\d+)\.xml\.gz$',
+        sitemap_file, name='sitemap_page'),
+    url(r'^sitemap\.xml$', RedirectView.as_view(
+        pattern_name='sitemap', permanent=True)),
 
     url(r'^robots\.txt$', TemplateView.as_view(
         template_name='robots.txt',
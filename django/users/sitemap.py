@@ -10,10 +10,11 @@ from core.sitemap import SailtrailSitemap
 class UsersSitemap(SailtrailSitemap):
     """Sitemap settings for user entries"""
     changefreq = "weekly"
+    paged = True
 
     def items(self) -> QuerySet:
         """Get items to appear in this sitemap section"""
-        return get_active_users()
+        return self.page_items(get_active_users())
 
     def location(self, obj: User) -> str:
         """Get location for these entries"""
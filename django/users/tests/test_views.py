@@ -46,18 +46,19 @@ class TestUserView:
         assert activities == sentinel.activities
         mock_helper.assert_called_once_with(sentinel.user, sentinel.other)
 
-    @patch('users.views.summarize_by_category')
+    @patch('users.views.get_category_summaries')
     @patch('users.views.ListView.get_context_data')
     def test_get_context_data_populates_correctly(self, super_mock,
                                                   mock_helper):
         # Given a mock that returns a sentinel summary
         mock_helper.return_value = sentinel.summary
-        super_mock.return_value = dict(super=sentinel.super)
+        super_mock.return_value = dict(super=sentinel.super,
+                                       activities=sentinel.activities)
 
-        # and a mock queryset that returns a sentinel
+        # and a view of a user, by another
         view = UserView()
         view.user = sentinel.user
-        view.get_queryset = Mock(return_value=sentinel.activity_query_set)
+        view.request = Mock(user=sentinel.other)
 
         # When getting the context data
         context = view.get_context_data()
@@ -66,7 +67,7 @@ class TestUserView:
         assert context['summaries'] == sentinel.summary
         assert context['view_user'] == sentinel.user
         assert context['super'] == sentinel.super
-        mock_helper.assert_called_once_with(sentinel.activity_query_set)
+        mock_helper.assert_called_once_with(sentinel.user, sentinel.other)
 
     def test_includes_upload_form_mixin(self):
         # Expect the view to have the upload form in the hierarchy
@@ -4,19 +4,28 @@ from django.contrib.auth import get_user_model
 from django.db.models import QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView
 
-from api.helper import get_users_activities, summarize_by_category
+from api.helper import ACTIVITY_LIST, get_category_summaries, \
+    get_users_activities
 from api.models import Activity
+from core.page_cache import cache_anonymous_page
+from core.pagination import KeysetPaginationMixin
 from core.views import UploadFormMixin
 
 
-class UserView(UploadFormMixin, ListView):
-    """Individual user page view"""
+@method_decorator(cache_anonymous_page(ACTIVITY_LIST), name='dispatch')
+class UserView(KeysetPaginationMixin, UploadFormMixin, ListView):
+    """Individual user page view, cached for anonymous visitors
+
+    The activity lists namespace covers the page, as the summaries change
+    with the activities."""
     model = Activity
     template_name = 'user.html'
     context_object_name = 'activities'
     paginate_by = 25
+    estimate_count = True
     user = None
 
     def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
@@ -34,8 +43,8 @@ class UserView(UploadFormMixin, ListView):
         """Add additional content to the user page"""
         context = super(UserView, self).get_context_data(**kwargs)
         context['view_user'] = self.user
-        context['summaries'] = summarize_by_category(
-            self.get_queryset())
+        context['summaries'] = get_category_summaries(self.user,
+                                                      self.request.user)
         return context
 
 